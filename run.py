@@ -4,19 +4,30 @@
 """
 扫描线效果启动脚本
 提供一个交互式菜单，方便用户选择不同的扫描线效果模式
+
+OpenCV、NumPy及效果模块在显示菜单前不导入：菜单显示期间由后台线程
+导入这些模块并打开、预热摄像头，选择摄像头选项时直接复用
 """
 
+import time
+
+# 启动基准时刻，须在其他导入之前记录
+_START_TIME = time.perf_counter()
+
+import argparse
 import os
 import sys
 import platform
-import subprocess
 
 # 添加src目录到Python路径
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src')
+sys.path.insert(0, SRC_DIR)
 
-# 现在可以直接导入src目录下的模块
-from scan_effect import ScanEffect
-from advanced_scan_effect import AdvancedScanEffect
+# 只导入轻量的启动工具，重型模块在需要时才导入
+from startup import StartupTimer, CameraPrewarmer, importtime_breakdown, format_importtime
+
+startup_timer = StartupTimer(_START_TIME)
+camera_prewarmer = None
 
 def clear_screen():
     """清除终端屏幕"""
@@ -46,6 +57,39 @@ def print_menu():
     print("0. 退出")
     print("-" * 60)
 
+def adopt_prewarmed_camera():
+    """把后台预热好的摄像头交给共享会话，之后的摄像头演示不再重新打开摄像头"""
+    global camera_prewarmer
+    if camera_prewarmer is None:
+        return
+    
+    cap = camera_prewarmer.take()
+    from scan_session import get_session
+    if cap is not None:
+        get_session(0, capture=cap)
+    elif camera_prewarmer.error is not None:
+        print(f"摄像头预热失败: {camera_prewarmer.error}")
+    camera_prewarmer = None
+
+def release_prewarmed_camera():
+    """选择了视频文件时释放后台预热的摄像头，不在整个会话期间占用设备"""
+    global camera_prewarmer
+    if camera_prewarmer is None:
+        return
+    
+    camera_prewarmer.release()
+    camera_prewarmer = None
+
+def print_startup_report():
+    """打印启动耗时报告（包括首帧显示延迟）"""
+    from scan_session import get_session_effects
+    
+    for effect in get_session_effects():
+        if effect.first_display_time is not None:
+            startup_timer.mark("首帧显示", effect.first_display_time)
+            break
+    print(startup_timer.report())
+
 def run_basic_webcam():
     """运行基础摄像头扫描效果"""
     clear_screen()
@@ -54,6 +98,7 @@ def run_basic_webcam():
     print("默认启用图像翻转，使动作方向与屏幕显示一致")
     
     # 导入并运行demo.py中的摄像头演示
+    adopt_prewarmed_camera()
     from demo import demo_webcam
     demo_webcam()
 
@@ -82,6 +127,7 @@ def run_basic_video():
     
     print(f"使用视频文件: {video_path}")
     print("按ESC键退出，空格键暂停/继续，r键重置扫描线，s键保存当前帧")
+    release_prewarmed_camera()
     
     # 导入并运行demo.py中的视频演示
     from demo import demo_video
@@ -109,11 +155,13 @@ def run_advanced_demo():
             return
         
         # 导入并运行advanced_demo.py
+        release_prewarmed_camera()
         from advanced_demo import main as advanced_demo_main
         # 修改sys.argv以传递视频路径
         sys.argv = [sys.argv[0], video_path]
     else:
         # 使用摄像头
+        adopt_prewarmed_camera()
         from advanced_demo import main as advanced_demo_main
         sys.argv = [sys.argv[0]]  # 重置参数
     
@@ -122,6 +170,10 @@ def run_advanced_demo():
 
 def run_custom():
     """运行自定义扫描效果"""
+    from scan_effect import ScanEffect
+    from advanced_scan_effect import AdvancedScanEffect
+    from scan_session import get_session
+    
     clear_screen()
     print("自定义扫描效果")
     print("=" * 60)
@@ -140,8 +192,10 @@ def run_custom():
             input("按Enter键返回主菜单...")
             return
         video_source = video_path
+        release_prewarmed_camera()
     else:
         video_source = 0  # 默认摄像头
+        adopt_prewarmed_camera()
     
     # 选择扫描方向
     print("\n请选择扫描方向:")
@@ -205,19 +259,14 @@ def run_custom():
     flip_choice = input("是否启用图像翻转（适用于摄像头）[Y/n]: ")
     flip_image = flip_choice.lower() != "n"
     
-    # 构建命令参数
-    cmd_args = [
-        sys.executable,
-        os.path.join("src", "advanced_scan_effect.py" if advanced_mode else "scan_effect.py"),
-        f"--video={video_source}",
-        f"--direction={direction}",
-        f"--speed={speed}",
-        f"--line_width={line_width}",
-        f"--line_color={line_color[0]},{line_color[1]},{line_color[2]}",
-    ]
-    
-    if flip_image:
-        cmd_args.append("--flip")
+    # 构建效果参数
+    params = {
+        "direction": direction,
+        "speed": speed,
+        "line_width": line_width,
+        "line_color": line_color,
+        "flip_image": flip_image,
+    }
     
     # 高级模式特有参数
     if advanced_mode:
@@ -243,28 +292,26 @@ def run_custom():
         except (ValueError, IndexError):
             effect = effects[0]  # 默认基本效果
         
-        cmd_args.append(f"--effect={effect}")
+        params["effect_type"] = effect
         
         # 是否启用渐变效果
         gradient_choice = input("是否启用渐变效果 [y/N]: ")
-        if gradient_choice.lower() == "y":
-            cmd_args.append("--gradient")
+        params["gradient_effect"] = gradient_choice.lower() == "y"
         
         # 是否启用模糊效果
         blur_choice = input("是否启用模糊效果 [y/N]: ")
-        if blur_choice.lower() == "y":
-            cmd_args.append("--blur")
+        params["blur_effect"] = blur_choice.lower() == "y"
         
         # 设置多线条数量
         multi_line = input("请输入多线条数量 [默认: 1]: ")
         multi_line = int(multi_line) if multi_line.isdigit() and int(multi_line) > 0 else 1
-        cmd_args.append(f"--multi_line={multi_line}")
+        params["multi_line"] = multi_line
         
         if multi_line > 1:
             # 设置线条间距
             line_spacing = input("请输入线条间距 [默认: 50]: ")
             line_spacing = int(line_spacing) if line_spacing.isdigit() else 50
-            cmd_args.append(f"--line_spacing={line_spacing}")
+            params["line_spacing"] = line_spacing
         
         # 选择动画类型
         print("\n请选择动画类型:")
@@ -286,37 +333,78 @@ def run_custom():
         except (ValueError, IndexError):
             animation = animations[0]  # 默认无动画
         
-        cmd_args.append(f"--animation={animation}")
+        params["animation_type"] = animation
     
-    # 运行命令
+    # 运行扫描效果（复用视频源的共享会话，不重新打开摄像头）
     print("\n正在启动扫描效果...")
     print("按ESC键退出，空格键暂停/继续，r键重置扫描线，s键保存当前帧，f键切换图像翻转")
     print("=" * 60)
     
     try:
-        subprocess.run(cmd_args)
+        session = get_session(video_source)
+        session.run(AdvancedScanEffect if advanced_mode else ScanEffect, **params)
     except Exception as e:
         print(f"错误: {e}")
     
     input("\n按Enter键返回主菜单...")
 
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description="扫描线效果启动脚本")
+    parser.add_argument("--no-prewarm", action="store_true",
+                        help="不在后台预先打开摄像头")
+    parser.add_argument("--warmup-frames", type=int, default=5,
+                        help="后台预热时丢弃的摄像头帧数")
+    parser.add_argument("--startup-report", action="store_true",
+                        help="每次运行结束后打印启动耗时报告（导入、摄像头打开、首帧显示）")
+    parser.add_argument("--importtime", action="store_true",
+                        help="以python -X importtime方式列出导入耗时最高的模块后退出")
+    return parser.parse_args()
+
 def main():
     """主函数"""
+    global camera_prewarmer
+    args = parse_args()
+    
+    if args.importtime:
+        entries = importtime_breakdown(["scan_effect", "advanced_scan_effect", "scan_session"],
+                                       extra_path=SRC_DIR)
+        print(format_importtime(entries))
+        return
+    
+    # 菜单显示期间在后台导入重型模块并预热摄像头
+    if not args.no_prewarm:
+        camera_prewarmer = CameraPrewarmer(0, warmup_frames=args.warmup_frames, timer=startup_timer)
+        camera_prewarmer.start()
+    
+    first_menu = True
     while True:
         print_header()
         print_menu()
+        if first_menu:
+            startup_timer.mark("菜单显示")
+            first_menu = False
         
         choice = input("请输入选项编号: ")
         
-        if choice == "1":
-            run_basic_webcam()
-        elif choice == "2":
-            run_basic_video()
-        elif choice == "3":
-            run_advanced_demo()
-        elif choice == "4":
-            run_custom()
+        if choice in ("1", "2", "3", "4"):
+            if choice == "1":
+                run_basic_webcam()
+            elif choice == "2":
+                run_basic_video()
+            elif choice == "3":
+                run_advanced_demo()
+            else:
+                run_custom()
+            
+            if args.startup_report:
+                print_startup_report()
+                input("按Enter键继续...")
         elif choice == "0":
+            from scan_session import close_sessions
+            close_sessions()
+            if camera_prewarmer is not None:
+                camera_prewarmer.release()
             clear_screen()
             print("感谢使用扫描线效果生成器！再见！")
             break
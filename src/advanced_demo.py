@@ -13,6 +13,8 @@ import cv2
 from advanced_scan_effect import AdvancedScanEffect
 from scan_effect import ScanEffect
 from demo import print_demo_info, wait_for_key
+from contact_sheet import ContactSheet
+from scan_session import get_session, close_sessions
 
 def create_advanced_scan_effect(video_source=0, direction=ScanEffect.DIRECTION_LEFT_TO_RIGHT, 
                                speed=2, line_width=3, line_color=(0, 255, 0), 
@@ -21,9 +23,9 @@ def create_advanced_scan_effect(video_source=0, direction=ScanEffect.DIRECTION_L
                                multi_line=1, line_spacing=50, 
                                animation_type=AdvancedScanEffect.ANIMATION_NONE,
                                display_size=(1280, 960), flip_image=True):
-    """创建高级扫描效果实例"""
-    return AdvancedScanEffect(
-        video_source=video_source,
+    """获取高级扫描效果实例（复用视频源的共享会话，只修改参数）"""
+    return get_session(video_source).get_effect(
+        AdvancedScanEffect,
         direction=direction,
         speed=speed,
         line_width=line_width,
@@ -233,6 +235,25 @@ def demo_combined_effects(video_source=0):
     # 运行扫描效果
     scan_effect.run()
 
+def demo_contact_sheet(video_source=0):
+    """演示效果对比预览"""
+    print_demo_info(
+        "效果对比预览",
+        "这个演示在同一窗口中以网格形式同时展示所有效果类型。\n"
+        "每帧只解码一次，各效果保留独立的静态帧和扫描状态。"
+    )
+    
+    # 一次解码，同时驱动所有效果类型（共享会话中已打开的视频源）
+    sheet = ContactSheet(
+        configs=[{"effect_type": effect} for effect in AdvancedScanEffect.SUPPORTED_EFFECTS],
+        video_source=video_source,
+        flip_image=True,
+        capture=get_session(video_source).cap
+    )
+    
+    # 运行效果对比预览
+    sheet.run()
+
 def main():
     """主函数"""
     print("高级扫描线效果演示")
@@ -251,6 +272,7 @@ def main():
         print("6. 不同扫描方向")
         print("7. 组合效果")
         print("8. 使用视频文件")
+        print("9. 效果对比预览（一次解码，多种效果）")
         print("0. 退出")
         
         choice = input("请输入选项编号: ")
@@ -276,11 +298,14 @@ def main():
                 print(f"已设置视频源为: {video_path}")
             else:
                 print(f"错误: 视频文件不存在: {video_path}")
+        elif choice == "9":
+            demo_contact_sheet(video_source)
         elif choice == "0":
             break
         else:
             print("无效选项，请重新输入")
     
+    close_sessions()
     print("演示结束")
 
 if __name__ == "__main__":
@@ -14,7 +14,10 @@ import time
 import random
 import colorsys
 from datetime import datetime
-from scan_effect import ScanEffect, parse_color
+from scan_effect import ScanEffect, parse_color, add_capture_arguments, run_with_args, create_disk_cache, create_metrics_from_args
+from tile_executor import get_tile_executor, shutdown_tile_executors
+from quality import QualityController
+from motion import MotionDetector
 
 class AdvancedScanEffect(ScanEffect):
     """
@@ -52,16 +55,34 @@ class AdvancedScanEffect(ScanEffect):
         ANIMATION_BLINK
     ]
     
+    # 内存预算模式下特效条带的行数
+    BUDGET_STRIP_ROWS = 64
+    
+    # 可在运行时通过configure修改的参数
+    CONFIGURABLE_PARAMS = ScanEffect.CONFIGURABLE_PARAMS + (
+        "effect_type",
+        "gradient_effect",
+        "blur_effect",
+        "multi_line",
+        "line_spacing",
+        "animation_type"
+    )
+    
     def __init__(self, video_source=0, direction="left_to_right", speed=2, 
                  line_width=3, line_color=(0, 255, 0), effect_type="basic",
                  gradient_effect=False, blur_effect=False, multi_line=1,
                  line_spacing=50, animation_type="none", display_size=(1280, 960),
-                 flip_image=False):
+                 flip_image=False, capture=None, first_frame=None, low_latency=False,
+                 capture_size=None, loop_cache_mb=0, loop_cache_encoded=False, disk_cache=None,
+                 slit_scan_fpp=0, scan_angle=0, sweep_map=None, effect_threads=1,
+                 target_fps=0, idle_when_complete=True, metrics=None, memory_budget=False,
+                 session_record_path=None, session_compress_level=0, replay_speed=1.0, feather_width=0,
+                 motion_adaptive=False, motion_threshold=12):
         """
         初始化高级扫描线效果类
         
         参数:
-            video_source: 视频源，可以是摄像头索引或视频文件路径
+            video_source: 视频源，可以是摄像头索引、视频文件路径或采集会话文件路径
             direction: 扫描方向，可选值：left_to_right, right_to_left, top_to_bottom, bottom_to_top
             speed: 扫描速度（像素/帧）
             line_width: 扫描线宽度（像素）
@@ -74,6 +95,28 @@ class AdvancedScanEffect(ScanEffect):
             animation_type: 动画类型，可选值：none, pulse, rainbow, blink
             display_size: 显示窗口大小，(宽, 高)元组
             flip_image: 是否水平翻转图像（适用于摄像头）
+            capture: 已打开的视频捕获对象（可选），与调用方共享
+            first_frame: 初始静态帧（可选），传入时由调用方逐帧提供画面
+            low_latency: 是否启用低延迟模式（摄像头）
+            capture_size: 向摄像头请求的采集分辨率，(宽, 高)元组（可选）
+            loop_cache_mb: 循环播放视频文件时的内存帧缓存预算（MB），0表示不缓存
+            loop_cache_encoded: 帧缓存是否以压缩后的编码缓冲区存储
+            disk_cache: RawFrameCache实例（可选），视频文件以内存映射读取
+            slit_scan_fpp: 狭缝扫描模式的延迟（帧/像素），0表示不启用
+            scan_angle: angle方向的扫描前进角度（度）
+            sweep_map: custom方向的逐像素扫描时刻图
+            effect_threads: 特效分块处理的线程数，1表示在当前线程整帧处理，0表示使用CPU核数
+            target_fps: 自适应画质的目标帧率，处理跟不上时逐级降低画质，0表示不启用
+            idle_when_complete: 扫描完成后是否进入空闲模式（停止读取视频源，只重新绘制动画扫描线和随机特效）
+            metrics: MetricsRegistry实例（可选），运行时记录帧率、各阶段耗时和读取失败等指标
+            memory_budget: 内存预算模式（4K/8K视频源），特效按水平条带原地处理，不缓存整帧的彩虹叠加图和隔帧特效结果
+            session_record_path: 采集会话文件路径（可选），运行时录制读取到的原始帧和采集时刻
+            session_compress_level: 会话录制的zlib压缩级别（1-9），0表示不压缩
+            replay_speed: 回放采集会话的速度倍数，1为原始节奏，0表示尽快回放
+            feather_width: 静态与动态画面边界的羽化宽度（像素），0表示硬边界
+            motion_adaptive: 运动自适应：画面静止时复用上一次的合成和特效结果，
+                             只更新静态帧中新扫过的条带并重新绘制扫描线（需有特效或模糊，内存预算模式下不启用）
+            motion_threshold: 运动检测的像素阈值（缩小后的灰度差，0-255）
         """
         # 调用父类初始化方法
         super().__init__(
@@ -83,7 +126,24 @@ class AdvancedScanEffect(ScanEffect):
             line_width=line_width,
             line_color=line_color,
             display_size=display_size,
-            flip_image=flip_image
+            flip_image=flip_image,
+            capture=capture,
+            first_frame=first_frame,
+            low_latency=low_latency,
+            capture_size=capture_size,
+            loop_cache_mb=loop_cache_mb,
+            loop_cache_encoded=loop_cache_encoded,
+            disk_cache=disk_cache,
+            slit_scan_fpp=slit_scan_fpp,
+            scan_angle=scan_angle,
+            sweep_map=sweep_map,
+            idle_when_complete=idle_when_complete,
+            metrics=metrics,
+            memory_budget=memory_budget,
+            session_record_path=session_record_path,
+            session_compress_level=session_compress_level,
+            replay_speed=replay_speed,
+            feather_width=feather_width
         )
         
         # 高级效果参数
@@ -103,9 +163,53 @@ class AdvancedScanEffect(ScanEffect):
         self.blink_counter = 0
         self.blink_interval = 10
         
+        # 彩虹渐变色带和叠加图缓存，仅在方向或尺寸变化时重建
+        self._rainbow_line = None
+        self._rainbow_overlay = None
+        
+        # 特效分块执行器（共享线程池）
+        self.tile_executor = None if effect_threads == 1 else get_tile_executor(effect_threads)
+        
+        # 画质相关参数，由自适应画质控制器按等级调整
+        for name, value in QualityController.FULL_QUALITY.items():
+            setattr(self, name, value)
+        self.quality = QualityController(target_fps) if target_fps > 0 else None
+        self._effect_frame_counter = 0
+        self._last_effect_frame = None
+        
+        # 运动自适应：运动检测器和上一次完整渲染的扫描线之下的图层
+        self.motion_detector = None
+        if motion_adaptive and not self.memory_budget:
+            self.motion_detector = MotionDetector(pixel_threshold=motion_threshold)
+        self._motion_layer = None
+        
         # 多线条参数
         self._init_multi_lines()
     
+    def configure(self, **params):
+        """运行时修改参数（含高级效果参数），仅在需要时重建派生状态"""
+        if "effect_type" in params and params["effect_type"] not in self.SUPPORTED_EFFECTS:
+            raise ValueError(f"不支持的效果类型: {params['effect_type']}")
+        if "animation_type" in params and params["animation_type"] not in self.SUPPORTED_ANIMATIONS:
+            raise ValueError(f"不支持的动画类型: {params['animation_type']}")
+        return super().configure(**params)
+    
+    def _on_params_changed(self, changed):
+        """参数变化后重建多线条位置、彩虹叠加图和动画状态"""
+        super()._on_params_changed(changed)
+        self._reset_motion_cache()
+        if "multi_line" in changed or "line_spacing" in changed:
+            self._init_multi_lines()
+        if "direction" in changed:
+            self._rainbow_line = None
+            self._rainbow_overlay = None
+        if "effect_type" in changed or "blur_effect" in changed:
+            self._last_effect_frame = None
+        if "animation_type" in changed:
+            self.animation_counter = 0
+            self.blink_state = True
+            self.blink_counter = 0
+    
     def _init_multi_lines(self):
         """初始化多线条参数"""
         self.multi_line_positions = []
@@ -188,12 +292,26 @@ class AdvancedScanEffect(ScanEffect):
         if self.animation_type == self.ANIMATION_BLINK and not self.blink_state:
             return
         
-        # 绘制多条扫描线
-        for offset in self.multi_line_positions:
+        # 绘制多条扫描线（画质降级时只绘制最靠近主扫描线的几条）
+        offsets = self.multi_line_positions
+        if self.max_drawn_lines is not None and len(offsets) > self.max_drawn_lines:
+            offsets = sorted(offsets, key=abs)[:self.max_drawn_lines]
+        for offset in offsets:
             position = self.scan_position + offset
             
             # 检查位置是否在有效范围内
-            if self.is_horizontal_direction():
+            if self.sweep is not None:
+                # 非轴向扫描：绘制扫描前沿（斜线、圆或自定义轮廓）
+                if position < 0 or position >= self.sweep.length:
+                    continue
+                
+                self.sweep.draw_front(frame, position, current_color, current_width)
+                
+                # 添加渐变效果
+                if self.gradient_effect:
+                    self._add_sweep_gradient_effect(frame, position)
+                
+            elif self.is_horizontal_direction():
                 if position < 0 or position >= self.width:
                     continue
                 
@@ -223,9 +341,23 @@ class AdvancedScanEffect(ScanEffect):
                 if self.gradient_effect:
                     self._add_gradient_effect(frame, position, False)
     
+    def _add_sweep_gradient_effect(self, frame, position):
+        """为非轴向扫描前沿添加渐变效果"""
+        gradient_width = self.gradient_width  # 渐变宽度
+        
+        for i in range(1, gradient_width):
+            alpha = 1.0 - (i / gradient_width)
+            color = tuple(int(c * alpha) for c in self.line_color)
+            width = max(1, int(self.line_width * alpha))
+            
+            # 向前沿两侧渐变
+            for side_pos in (position - i, position + i):
+                if 0 <= side_pos < self.sweep.length:
+                    self.sweep.draw_front(frame, side_pos, color, width)
+    
     def _add_gradient_effect(self, frame, position, is_horizontal):
         """添加渐变效果"""
-        gradient_width = 20  # 渐变宽度
+        gradient_width = self.gradient_width  # 渐变宽度
         
         if is_horizontal:
             # 水平方向的渐变
@@ -260,135 +392,430 @@ class AdvancedScanEffect(ScanEffect):
                 if 0 <= bottom_pos < self.height:
                     cv2.line(frame, (0, bottom_pos), (self.width, bottom_pos), color, width)
     
+    def _plan_effect(self, width, height):
+        """
+        生成本帧特效的随机参数（在主线程中按原有顺序抽取随机数）
+        各条带共用同一份参数，分块处理与整帧处理的画面一致
+        """
+        plan = {}
+        if self.effect_type == self.EFFECT_MATRIX:
+            # 随机添加一些亮点（模拟数字），30%的帧添加
+            if random.random() < 0.3:
+                plan["dots"] = [(random.randint(0, width - 1),
+                                 random.randint(0, height - 1),
+                                 random.randint(200, 255)) for _ in range(50)]
+        elif self.effect_type == self.EFFECT_GLITCH:
+            # 随机偏移红色通道，20%的帧添加偏移
+            if random.random() < 0.2:
+                plan["offset"] = (random.randint(-10, 10), random.randint(-10, 10))
+            # 添加噪点到随机通道，30%的帧添加噪点
+            if random.random() < 0.3:
+                plan["noise_channel"] = random.randint(0, 2)
+        return plan
+    
+    def _effect_halo(self):
+        """条带处理需要的halo行数（模糊核半径）"""
+        if not self.blur_effect:
+            return 0
+        if self.effect_type == self.EFFECT_NEON:
+            return self.glow_kernel // 2  # 发光模糊
+        return self.blur_kernel // 2
+    
     def _apply_effect(self, frame):
         """应用特殊效果"""
+        height, width = frame.shape[:2]
+        return self._apply_effect_rows(frame, 0, height, self._plan_effect(width, height))
+    
+    def _apply_effect_rows(self, frame, y0, y1, plan, top=0, height=None):
+        """
+        对帧的[y0, y1)行应用特殊效果
+        
+        参数:
+            frame: 完整的输入帧（只读），可以是降低处理分辨率后的帧；
+                   条带处理时是从第top行开始、包含所需halo行的若干行
+            y0, y1: 处理的行范围（整帧中的行号）
+            plan: _plan_effect生成的本帧随机参数
+            top: frame第一行在整帧中的行号
+            height: 整帧的高度，默认为frame的高度
+        
+        返回:
+            处理后的条带，基本效果时可能是输入帧的视图
+        """
+        rows = frame[y0 - top:y1 - top]
+        width = frame.shape[1]
+        height = height or frame.shape[0]
+        
         if self.effect_type == self.EFFECT_BASIC:
             # 基本效果，不做额外处理
-            return frame
+            return rows
         
         elif self.effect_type == self.EFFECT_NEON:
             # 霓虹效果：增加亮度和对比度，添加发光效果
-            result = frame.copy()
-            
-            # 增加亮度和对比度
-            result = cv2.convertScaleAbs(result, alpha=1.2, beta=10)
+            result = cv2.convertScaleAbs(rows, alpha=1.2, beta=10)
             
             # 添加发光效果（模糊）
             if self.blur_effect:
-                glow = cv2.GaussianBlur(result, (15, 15), 0)
+                glow = cv2.GaussianBlur(result, (self.glow_kernel, self.glow_kernel), 0)
                 result = cv2.addWeighted(result, 1.0, glow, 0.5, 0)
             
             return result
         
         elif self.effect_type == self.EFFECT_MATRIX:
             # 矩阵效果：绿色色调，添加数字雨效果
-            result = frame.copy()
-            
             # 提取绿色通道并增强
-            b, g, r = cv2.split(result)
+            b, g, r = cv2.split(rows)
             g = cv2.convertScaleAbs(g, alpha=1.5, beta=10)
-            result = cv2.merge([b * 0.2, g, r * 0.2])
+            b = cv2.convertScaleAbs(b, alpha=0.2)
+            r = cv2.convertScaleAbs(r, alpha=0.2)
+            result = cv2.merge([b, g, r])
             
-            # 随机添加一些亮点（模拟数字）
-            if random.random() < 0.3:  # 30%的帧添加
-                for _ in range(50):
-                    x = random.randint(0, self.width - 1)
-                    y = random.randint(0, self.height - 1)
-                    brightness = random.randint(200, 255)
-                    cv2.circle(result, (x, y), 1, (0, brightness, 0), -1)
+            # 绘制亮点，超出条带的部分由cv2裁剪
+            for x, y, brightness in plan.get("dots", ()):
+                if y0 - 1 <= y <= y1:
+                    cv2.circle(result, (x, y - y0), 1, (0, brightness, 0), -1)
             
             return result
         
         elif self.effect_type == self.EFFECT_GLITCH:
             # 故障效果：随机偏移通道，添加噪点
-            result = frame.copy()
+            result = rows.copy()
             
-            # 随机通道偏移
-            if random.random() < 0.2:  # 20%的帧添加偏移
-                b, g, r = cv2.split(result)
-                
-                # 随机偏移红色通道
-                offset_x = random.randint(-10, 10)
-                offset_y = random.randint(-10, 10)
-                r_shifted = np.zeros_like(r)
+            if "offset" in plan:
+                offset_x, offset_y = plan["offset"]
+                r_shifted = np.zeros((y1 - y0, width), dtype=np.uint8)
                 
-                # 应用偏移
-                if offset_x >= 0 and offset_y >= 0:
-                    r_shifted[offset_y:, offset_x:] = r[:self.height-offset_y, :self.width-offset_x]
-                elif offset_x >= 0 and offset_y < 0:
-                    r_shifted[:self.height+offset_y, offset_x:] = r[-offset_y:, :self.width-offset_x]
-                elif offset_x < 0 and offset_y >= 0:
-                    r_shifted[offset_y:, :self.width+offset_x] = r[:self.height-offset_y, -offset_x:]
-                else:
-                    r_shifted[:self.height+offset_y, :self.width+offset_x] = r[-offset_y:, -offset_x:]
+                # 条带第i行取自原帧第(y0 + i - offset_y)行，超出画面的行为0
+                src_y0 = max(y0 - offset_y, 0)
+                src_y1 = min(y1 - offset_y, height)
+                if src_y1 > src_y0:
+                    dst_rows = slice(src_y0 + offset_y - y0, src_y1 + offset_y - y0)
+                    src = frame[src_y0 - top:src_y1 - top, :, 2]
+                    if offset_x >= 0:
+                        r_shifted[dst_rows, offset_x:] = src[:, :width - offset_x]
+                    else:
+                        r_shifted[dst_rows, :width + offset_x] = src[:, -offset_x:]
                 
-                result = cv2.merge([b, g, r_shifted])
+                result[:, :, 2] = r_shifted
             
-            # 添加噪点
-            if random.random() < 0.3:  # 30%的帧添加噪点
-                noise = np.zeros((self.height, self.width), dtype=np.uint8)
+            if "noise_channel" in plan:
+                noise = np.zeros((y1 - y0, width), dtype=np.uint8)
                 cv2.randu(noise, 0, 255)
                 noise = cv2.threshold(noise, 200, 255, cv2.THRESH_BINARY)[1]
                 
                 # 将噪点添加到随机通道
-                channel = random.randint(0, 2)
-                b, g, r = cv2.split(result)
-                channels = [b, g, r]
-                channels[channel] = cv2.bitwise_or(channels[channel], noise)
-                result = cv2.merge(channels)
+                channel = result[:, :, plan["noise_channel"]]
+                np.bitwise_or(channel, noise, out=channel)
             
             return result
         
         elif self.effect_type == self.EFFECT_RAINBOW:
             # 彩虹效果：根据位置添加彩虹色调
-            result = frame.copy()
-            
-            # 创建彩虹渐变
-            rainbow = np.zeros((self.height, self.width, 3), dtype=np.uint8)
-            
-            if self.is_horizontal_direction():
-                # 水平彩虹
-                for x in range(self.width):
-                    h = x / self.width
-                    r, g, b = colorsys.hsv_to_rgb(h, 1.0, 1.0)
-                    rainbow[:, x] = [b * 255, g * 255, r * 255]
-            else:
-                # 垂直彩虹
-                for y in range(self.height):
-                    h = y / self.height
-                    r, g, b = colorsys.hsv_to_rgb(h, 1.0, 1.0)
-                    rainbow[y, :] = [b * 255, g * 255, r * 255]
+            rainbow = self._get_rainbow_rows(y0, y1, width, height)
             
             # 混合原始帧和彩虹
-            result = cv2.addWeighted(result, 0.7, rainbow, 0.3, 0)
+            return cv2.addWeighted(rows, 0.7, rainbow, 0.3, 0)
+        
+        return rows
+    
+    def _has_effect_work(self):
+        """当前特效是否需要逐像素处理（基本效果且不模糊时直接使用合成结果）"""
+        return self.effect_type != self.EFFECT_BASIC or self.blur_effect
+    
+    def _apply_effect_chain(self, frame):
+        """
+        应用特殊效果和模糊
+        设置了分块执行器时按水平条带并行处理，每个条带多处理halo行使模糊结果与整帧一致；
+        画质降级时在较低分辨率下处理，或隔帧复用上一次的特效结果
+        """
+        if not self._has_effect_work():
+            return frame
+        
+        # 隔帧计算特效：其余帧复用上一次的结果（内存预算模式下不缓存整帧结果）
+        self._effect_frame_counter += 1
+        reuse = self.effect_interval > 1 and not self.memory_budget
+        if reuse:
+            if (self._effect_frame_counter % self.effect_interval != 0 and self._last_effect_frame is not None
+                    and self._last_effect_frame.shape == frame.shape):
+                return self._last_effect_frame.copy()
+        
+        if self.work_scale < 1.0:
+            small_size = (max(1, int(frame.shape[1] * self.work_scale)), max(1, int(frame.shape[0] * self.work_scale)))
+            small = cv2.resize(frame, small_size, interpolation=cv2.INTER_AREA)
+            if self.buffer_ledger is not None:
+                self.buffer_ledger.record("降分辨率特效帧", small.nbytes)
+            # 内存预算模式下放大结果直接写回工作帧
+            result = cv2.resize(self._apply_effect_bands(small), (frame.shape[1], frame.shape[0]),
+                                dst=frame if self.memory_budget else None, interpolation=cv2.INTER_LINEAR)
+        else:
+            result = self._apply_effect_bands(frame)
+        
+        if reuse:
+            # 绘制扫描线会原地修改结果，缓存一份未绘制的副本
+            self._last_effect_frame = result.copy()
+        else:
+            self._last_effect_frame = None
+        return result
+    
+    def _apply_effect_bands(self, frame):
+        """对整帧应用特效和模糊，设置了分块执行器时按水平条带并行处理"""
+        if self.memory_budget:
+            return self._apply_effect_strips(frame)
+        
+        height, width = frame.shape[:2]
+        plan = self._plan_effect(width, height)
+        halo = self._effect_halo()
+        
+        def render(y0, y1, ey0, ey1):
+            rows = self._apply_effect_rows(frame, ey0, ey1, plan)
             
-            return result
+            # 应用模糊效果（如果启用）
+            if self.blur_effect and self.effect_type != self.EFFECT_NEON:  # 霓虹效果已经包含模糊
+                rows = cv2.GaussianBlur(rows, (self.blur_kernel, self.blur_kernel), 0)
+            return rows[y0 - ey0:y1 - ey0]
         
+        if self.tile_executor is None:
+            return render(0, height, 0, height)
+        
+        result = np.empty_like(frame)
+        
+        def render_into(y0, y1, ey0, ey1):
+            result[y0:y1] = render(y0, y1, ey0, ey1)
+        
+        self.tile_executor.map_bands(render_into, height, halo)
+        return result
+    
+    def _apply_effect_strips(self, frame):
+        """
+        内存预算模式：按水平条带原地应用特效和模糊，只分配条带大小的临时缓冲区
+        条带依次处理，每个条带需要的上方halo行在上一个条带写回之前另存（halo延续）；
+        设置了分块执行器时各线程负责一段，段边界两侧的halo行在任何写回之前先保存
+        """
+        height, width = frame.shape[:2]
+        plan = self._plan_effect(width, height)
+        blur_halo = self._effect_halo()
+        # 故障效果的红色通道偏移需要读取上下offset_y行之外的原始行
+        halo = blur_halo + (abs(plan["offset"][1]) if "offset" in plan else 0)
+        strip_rows = max(self.BUDGET_STRIP_ROWS, halo)
+        
+        if self.tile_executor is None:
+            sections = [(0, height)]
+        else:
+            sections = [(y0, y1) for y0, y1, _, _ in self.tile_executor.bands(height)]
+        above = {y0: frame[max(0, y0 - halo):y0].copy() for y0, _ in sections}
+        below = {y1: frame[y1:min(height, y1 + halo)].copy() for _, y1 in sections}
+        strip_bytes = [0] * len(sections)
+        
+        def render_section(index, y0, y1):
+            carry = above[y0]
+            for s0 in range(y0, y1, strip_rows):
+                s1 = min(y1, s0 + strip_rows)
+                
+                # 原始行[top, src_end)：上方halo来自另存的行，段内的行尚未改写，段外的下方halo来自另存的行
+                src_end = min(height, s1 + halo)
+                parts = [carry, frame[s0:min(src_end, y1)]]
+                if src_end > y1:
+                    parts.append(below[y1][:src_end - y1])
+                source = np.concatenate(parts)
+                top = s0 - len(carry)
+                carry = source[max(0, s1 - halo - top):s1 - top].copy()
+                
+                # 处理加上模糊halo后的行，模糊后只写回条带本身的行
+                py0, py1 = max(0, s0 - blur_halo), min(height, s1 + blur_halo)
+                rows = self._apply_effect_rows(source, py0, py1, plan, top, height)
+                if self.blur_effect and self.effect_type != self.EFFECT_NEON:  # 霓虹效果已经包含模糊
+                    rows = cv2.GaussianBlur(rows, (self.blur_kernel, self.blur_kernel), 0)
+                frame[s0:s1] = rows[s0 - py0:s1 - py0]
+                strip_bytes[index] = max(strip_bytes[index], source.nbytes + carry.nbytes + 2 * rows.nbytes)
+        
+        if len(sections) == 1:
+            render_section(0, *sections[0])
+        else:
+            futures = [self.tile_executor.pool.submit(render_section, index, y0, y1)
+                       for index, (y0, y1) in enumerate(sections)]
+            for future in futures:
+                future.result()
+        
+        if self.buffer_ledger is not None:
+            saved = sum(rows.nbytes for rows in above.values()) + sum(rows.nbytes for rows in below.values())
+            self.buffer_ledger.record("特效条带", sum(strip_bytes) + saved)
         return frame
     
+    def _get_rainbow_line(self, width=None, height=None):
+        """获取彩虹渐变色带：水平扫描为(1, 宽, 3)，垂直扫描为(高, 1, 3)（缓存，仅在方向或尺寸变化时重建）"""
+        width = width or self.width
+        height = height or self.height
+        if self.is_horizontal_direction():
+            shape = (1, width, 3)
+        else:
+            shape = (height, 1, 3)
+        if self._rainbow_line is not None and self._rainbow_line.shape == shape:
+            return self._rainbow_line
+        
+        # 创建彩虹渐变
+        line = np.zeros(shape, dtype=np.uint8)
+        
+        if self.is_horizontal_direction():
+            # 水平彩虹
+            for x in range(width):
+                h = x / width
+                r, g, b = colorsys.hsv_to_rgb(h, 1.0, 1.0)
+                line[0, x] = [b * 255, g * 255, r * 255]
+        else:
+            # 垂直彩虹
+            for y in range(height):
+                h = y / height
+                r, g, b = colorsys.hsv_to_rgb(h, 1.0, 1.0)
+                line[y, 0] = [b * 255, g * 255, r * 255]
+        
+        self._rainbow_line = line
+        return line
+    
+    def _get_rainbow_overlay(self, width=None, height=None):
+        """获取彩虹渐变叠加图（缓存，仅在方向或尺寸变化时重建）"""
+        width = width or self.width
+        height = height or self.height
+        if self._rainbow_overlay is not None and self._rainbow_overlay.shape[:2] == (height, width):
+            return self._rainbow_overlay
+        
+        self._rainbow_overlay = np.broadcast_to(self._get_rainbow_line(width, height), (height, width, 3)).copy()
+        return self._rainbow_overlay
+    
+    def _get_rainbow_rows(self, y0, y1, width, height):
+        """彩虹叠加图的[y0, y1)行；内存预算模式下由色带展开，不缓存整帧的叠加图"""
+        if not self.memory_budget:
+            return self._get_rainbow_overlay(width, height)[y0:y1]
+        
+        line = self._get_rainbow_line(width, height)
+        if not self.is_horizontal_direction():
+            line = line[y0:y1]
+        return np.ascontiguousarray(np.broadcast_to(line, (y1 - y0, width, 3)))
+    
     def create_scan_effect(self, current_frame):
         """创建高级扫描效果"""
-        # 更新静态帧中扫描线扫过的区域为当前帧的内容
-        self.update_static_frame(current_frame, self.scan_position, self.speed)
+        start = time.perf_counter()
         
-        # 应用扫描效果
-        result = self.apply_scan_effect(current_frame, self.scan_position)
+        # 更新静态帧、合成、特效和扫描线
+        if self.motion_detector is not None:
+            result = self._create_motion_adaptive(current_frame)
+        else:
+            result = super().create_scan_effect(current_frame)
         
-        # 应用特殊效果
-        result = self._apply_effect(result)
+        # 自适应画质：根据本帧处理耗时调整画质等级
+        if self.quality is not None and self.quality.update(time.perf_counter() - start):
+            self._apply_quality_settings()
         
-        # 应用模糊效果（如果启用）
-        if self.blur_effect and self.effect_type != self.EFFECT_NEON:  # 霓虹效果已经包含模糊
-            result = cv2.GaussianBlur(result, (5, 5), 0)
+        return result
+    
+    def _create_motion_adaptive(self, current_frame):
+        """
+        运动自适应的扫描效果
+        画面相对上一次完整渲染的帧没有明显变化时，动态区域的合成和特效结果与上一次相同，
+        复用缓存的图层：本帧只把新扫过的条带写入静态帧（画面恢复变化后静态区域仍然准确），
+        并重新绘制扫描线；随机特效（矩阵、故障）和无特效时每帧完整渲染
+        """
+        detector = self.motion_detector
+        changed = detector.changed(current_frame)
+        self.update_static_frame(current_frame, self.scan_position, self.speed)
         
-        # 绘制扫描线
-        self.draw_scan_line(result)
+        reusable = self._has_effect_work() and self.effect_type not in (self.EFFECT_MATRIX, self.EFFECT_GLITCH)
+        if not changed and reusable and self._motion_layer is not None:
+            result = self._motion_layer.copy()
+            detector.mark_reused()
+        else:
+            result = self._render_effects(self.apply_scan_effect(current_frame, self.scan_position))
+            self._motion_layer = result.copy() if reusable else None
+            detector.mark_rendered()
         
+        self.draw_scan_line(result)
         return result
     
+    def _reset_motion_cache(self):
+        """丢弃运动自适应的缓存图层和参考帧（参数、扫描位置或静态帧变化后）"""
+        self._motion_layer = None
+        # 父类初始化时会先调用reset_scan_line，此时运动检测器尚未创建
+        detector = getattr(self, "motion_detector", None)
+        if detector is not None:
+            detector.reset()
+    
+    def _render_effects(self, result):
+        """在合成结果上应用特殊效果和模糊"""
+        return self._apply_effect_chain(result)
+    
+    def _has_animated_overlays(self):
+        """动画扫描线（脉冲、彩虹、闪烁）每帧变化"""
+        return self.animation_type != self.ANIMATION_NONE
+    
+    def _render_idle_frame(self):
+        """
+        扫描完成后的画面
+        扫描线和特效都不随时间变化时整帧缓存；否则只缓存静态部分，
+        每帧重新计算随机特效（矩阵、故障）并重新绘制动画扫描线
+        """
+        animated_lines = self._has_animated_overlays()
+        varying_effect = self.effect_type in (self.EFFECT_MATRIX, self.EFFECT_GLITCH)
+        if not animated_lines and not varying_effect:
+            return super()._render_idle_frame()
+        
+        if self.memory_budget:
+            # 缓存静态部分会多占一个整帧，内存预算模式下每帧由静态帧存储重新合成
+            return self._render_overlays(self._copy_static_frame())
+        
+        if self._idle_cache is None:
+            layer = self.static_frame.copy()
+            if not varying_effect:
+                layer = self._apply_effect_chain(layer)
+            layer.flags.writeable = False
+            self._idle_cache = layer
+        
+        if varying_effect:
+            frame = self._apply_effect_chain(self._idle_cache)
+        else:
+            frame = self._idle_cache.copy()
+        self.draw_scan_line(frame)
+        return frame
+    
+    def get_scan_state(self):
+        """返回当前扫描状态（含动画状态）"""
+        state = super().get_scan_state()
+        state.update(animation_counter=self.animation_counter, blink_state=self.blink_state,
+                     blink_counter=self.blink_counter)
+        return state
+    
+    def set_scan_state(self, state):
+        """恢复扫描状态（含动画状态）"""
+        super().set_scan_state(state)
+        self._reset_motion_cache()
+        self.animation_counter = state.get("animation_counter", 0)
+        self.blink_state = state.get("blink_state", True)
+        self.blink_counter = state.get("blink_counter", 0)
+    
+    @property
+    def quality_level(self):
+        """当前画质等级，0为完整画质，未启用自适应画质时始终为0"""
+        return self.quality.level if self.quality is not None else 0
+    
+    def _apply_quality_settings(self):
+        """将画质控制器当前等级的设置应用到特效参数"""
+        for name, value in self.quality.settings.items():
+            setattr(self, name, value)
+        self._last_effect_frame = None
+        self._idle_cache = None
+        self._pause_layer = None
+        self._reset_motion_cache()
+        print(self.quality.report())
+    
+    def _finish_run(self):
+        """运行结束后打印画质统计，再打印其他统计并释放资源"""
+        if self.quality is not None:
+            print(self.quality.report())
+        if self.motion_detector is not None:
+            print(self.motion_detector.report())
+        super()._finish_run()
+    
     def reset_scan_line(self):
         """重置扫描线位置和动画参数"""
         super().reset_scan_line()
+        self._reset_motion_cache()
         self.animation_counter = 0
         self.blink_state = True
         self.blink_counter = 0
@@ -398,8 +825,10 @@ def main():
     parser.add_argument("--video", type=str, default=0,
                         help="视频文件路径，默认使用摄像头")
     parser.add_argument("--direction", type=str, default=ScanEffect.DIRECTION_LEFT_TO_RIGHT,
-                        choices=ScanEffect.SUPPORTED_DIRECTIONS,
+                        choices=ScanEffect.SUPPORTED_DIRECTIONS + [ScanEffect.DIRECTION_ANGLE, ScanEffect.DIRECTION_RADIAL],
                         help="扫描方向")
+    parser.add_argument("--angle", type=float, default=30,
+                        help="angle扫描方向的前进角度（度），0为从左到右，90为从上到下")
     parser.add_argument("--speed", type=int, default=2,
                         help="扫描速度（像素/帧）")
     parser.add_argument("--line_width", type=int, default=3,
@@ -426,6 +855,15 @@ def main():
                         help="显示窗口高度")
     parser.add_argument("--flip", action="store_true",
                         help="水平翻转图像（适用于摄像头）")
+    parser.add_argument("--effect_threads", type=int, default=1,
+                        help="特效分块处理的线程数，0表示使用CPU核数")
+    parser.add_argument("--target_fps", type=float, default=0,
+                        help="自适应画质的目标帧率，处理跟不上时逐级降低画质，0表示不启用")
+    parser.add_argument("--motion_adaptive", action="store_true",
+                        help="运动自适应：画面静止时复用上一次的合成和特效结果，只重新绘制扫描线")
+    parser.add_argument("--motion_threshold", type=int, default=12,
+                        help="运动检测的像素阈值（缩小后的灰度差，0-255）")
+    add_capture_arguments(parser)
     
     args = parser.parse_args()
     
@@ -451,11 +889,31 @@ def main():
             line_spacing=args.line_spacing,
             animation_type=args.animation,
             display_size=(args.display_width, args.display_height),
-            flip_image=args.flip
+            flip_image=args.flip,
+            low_latency=args.low_latency,
+            capture_size=(args.capture_width, args.capture_height) if args.capture_width and args.capture_height else None,
+            loop_cache_mb=args.loop_cache_mb,
+            loop_cache_encoded=args.loop_cache_encoded,
+            disk_cache=create_disk_cache(args),
+            slit_scan_fpp=args.slit_scan,
+            scan_angle=args.angle,
+            effect_threads=args.effect_threads,
+            target_fps=args.target_fps,
+            idle_when_complete=not args.no_idle,
+            metrics=create_metrics_from_args(args),
+            memory_budget=args.memory_budget,
+            session_record_path=args.record_session,
+            session_compress_level=args.session_compress,
+            replay_speed=args.replay_speed,
+            feather_width=args.feather,
+            motion_adaptive=args.motion_adaptive,
+            motion_threshold=args.motion_threshold
         )
-        scan_effect.run()
+        run_with_args(scan_effect, args)
     except Exception as e:
         print(f"错误: {e}")
+    finally:
+        shutdown_tile_executors()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
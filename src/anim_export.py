@@ -0,0 +1,623 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+动画导出（GIF/WebP）
+在无窗口模式下运行扫描效果，把一次完整扫描导出为可以直接发布到网页的循环动画。
+GIF的调色板只在编码前由抽样帧的颜色直方图计算一次，每帧经缓存的查找表（RGB各取高5位）映射为调色板索引；
+每帧只写入与上一帧相比发生变化的矩形区域，区域内未变化的像素写为透明色，画面不变的帧并入上一帧的延时。
+导出按最大宽度和帧率限制，默认在导出分辨率下运行扫描效果，完整扫描通常在几秒内导出完成
+"""
+
+import argparse
+import os
+import time
+
+import cv2
+import numpy as np
+
+from writers import FFmpegWriter, ffmpeg_available
+
+# 导出格式（按输出文件扩展名选择）
+FORMAT_GIF = "gif"
+FORMAT_WEBP = "webp"
+SUPPORTED_FORMATS = [FORMAT_GIF, FORMAT_WEBP]
+
+def lzw_encode(data, min_code_size=8):
+    """
+    GIF的变长LZW编码
+
+    参数:
+        data: 调色板索引的字节串
+        min_code_size: 最小编码位数（256色调色板为8）
+
+    返回:
+        编码后的字节串（未分块）
+    """
+    clear_code = 1 << min_code_size
+    end_code = clear_code + 1
+    table = {}
+    next_code = end_code + 1
+    code_size = min_code_size + 1
+
+    out = bytearray()
+    bits = clear_code
+    bit_count = code_size
+    if not data:
+        bits |= end_code << bit_count
+        bit_count += code_size
+        return bytes(out) + bits.to_bytes((bit_count + 7) // 8, "little")
+
+    prefix = data[0]
+    for index in range(1, len(data)):
+        value = data[index]
+        key = (prefix << 8) | value
+        code = table.get(key)
+        if code is not None:
+            prefix = code
+            continue
+        bits |= prefix << bit_count
+        bit_count += code_size
+        while bit_count >= 8:
+            out.append(bits & 0xFF)
+            bits >>= 8
+            bit_count -= 8
+        if next_code < 4096:
+            table[key] = next_code
+            next_code += 1
+            if next_code > (1 << code_size) and code_size < 12:
+                code_size += 1
+        else:
+            # 编码表已满：写入清除码，重新开始建表
+            bits |= clear_code << bit_count
+            bit_count += code_size
+            table.clear()
+            next_code = end_code + 1
+            code_size = min_code_size + 1
+        prefix = value
+
+    bits |= prefix << bit_count
+    bit_count += code_size
+    if next_code < 4096 and next_code + 1 > (1 << code_size) and code_size < 12:
+        code_size += 1
+    bits |= end_code << bit_count
+    bit_count += code_size
+    while bit_count > 0:
+        out.append(bits & 0xFF)
+        bits >>= 8
+        bit_count -= 8
+    return bytes(out)
+
+class PaletteQuantizer:
+    """
+    调色板量化器
+    颜色按RGB各取高LUT_BITS位编为直方图的箱号；调色板由抽样帧的直方图按频数抽样后聚类得到，
+    查找表为每个箱预先算好最近的调色板颜色，之后每帧的映射只是一次查表
+    """
+
+    # 查找表每个通道的位数（32×32×32个箱）
+    LUT_BITS = 5
+    # 聚类时按频数抽取的颜色数
+    SAMPLE_COLORS = 8192
+
+    def __init__(self, palette):
+        """
+        参数:
+            palette: 调色板，(N, 3)的uint8 BGR数组，N不超过256
+        """
+        self.palette = np.asarray(palette, dtype=np.uint8).reshape(-1, 3)
+        self.lut = self._build_lut()
+
+    @classmethod
+    def bin_keys(cls, frame):
+        """BGR帧每个像素的直方图箱号（uint16）"""
+        shift = 8 - cls.LUT_BITS
+        b = (frame[:, :, 0] >> shift).astype(np.uint16)
+        g = (frame[:, :, 1] >> shift).astype(np.uint16)
+        r = (frame[:, :, 2] >> shift).astype(np.uint16)
+        return (b << (2 * cls.LUT_BITS)) | (g << cls.LUT_BITS) | r
+
+    @classmethod
+    def bin_colors(cls):
+        """每个箱的中心颜色，(箱数, 3)的BGR数组"""
+        levels = 1 << cls.LUT_BITS
+        keys = np.arange(levels ** 3)
+        shift = 8 - cls.LUT_BITS
+        half = 1 << (shift - 1)
+        b = (keys >> (2 * cls.LUT_BITS)) & (levels - 1)
+        g = (keys >> cls.LUT_BITS) & (levels - 1)
+        r = keys & (levels - 1)
+        return np.stack([b, g, r], axis=1) * (1 << shift) + half
+
+    @classmethod
+    def from_histogram(cls, histogram, colors=255, seed=0):
+        """
+        由颜色直方图计算调色板
+
+        参数:
+            histogram: 每个箱的像素数
+            colors: 调色板颜色数上限
+            seed: 抽样的随机种子（导出结果可复现）
+        """
+        used = np.flatnonzero(histogram)
+        centers = cls.bin_colors()
+        if len(used) <= colors:
+            return cls(centers[used])
+        rng = np.random.default_rng(seed)
+        weights = histogram[used] / histogram[used].sum()
+        samples = centers[rng.choice(used, size=cls.SAMPLE_COLORS, p=weights)].astype(np.float32)
+        cv2.setRNGSeed(seed)
+        criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 8, 1.0)
+        _, _, palette = cv2.kmeans(samples, colors, None, criteria, 1, cv2.KMEANS_PP_CENTERS)
+        return cls(np.clip(np.round(palette), 0, 255))
+
+    def _build_lut(self):
+        """每个箱最近的调色板索引：|c-p|² = |c|² - 2c·p + |p|²，|c|²对同一个箱不变，可以省去"""
+        centers = self.bin_colors().astype(np.float32)
+        palette = self.palette.astype(np.float32)
+        distance = (palette ** 2).sum(axis=1)[None, :] - 2 * centers @ palette.T
+        return distance.argmin(axis=1).astype(np.uint8)
+
+    def quantize_keys(self, keys):
+        """箱号数组映射为调色板索引"""
+        return self.lut[keys]
+
+    def quantize(self, frame):
+        """BGR帧映射为调色板索引"""
+        return self.lut[self.bin_keys(frame)]
+
+class GifWriter:
+    """
+    GIF89a写入器
+    使用256色全局调色板（最后一个索引保留为透明色），每帧可以只写入一个矩形区域，
+    帧之间不清除画面（处置方式1），未写入和透明的像素保留上一帧的内容
+    """
+
+    # 透明色的调色板索引
+    TRANSPARENT_INDEX = 255
+    # 浏览器会把小于2厘秒的帧延时当作10厘秒
+    MIN_DELAY = 2
+
+    def __init__(self, path, size, palette, loop=0):
+        """
+        参数:
+            path: 输出文件路径
+            size: 画面大小，(宽, 高)元组
+            palette: 调色板，(N, 3)的uint8 BGR数组，N不超过255
+            loop: 循环次数，0表示无限循环
+        """
+        if len(palette) > self.TRANSPARENT_INDEX:
+            raise ValueError(f"GIF调色板最多{self.TRANSPARENT_INDEX}种颜色（另有1个透明色）: {len(palette)}")
+        self.path = path
+        self.size = tuple(size)
+        self.frames = 0
+        self.bytes_written = 0
+        self.file = open(path, "wb")
+
+        table = np.zeros((256, 3), dtype=np.uint8)
+        table[:len(palette)] = np.asarray(palette)[:, ::-1]
+        # 逻辑屏幕描述：全局调色板、8位颜色分辨率、256色
+        self._write(b"GIF89a" + self.size[0].to_bytes(2, "little") + self.size[1].to_bytes(2, "little")
+                    + bytes([0xF7, 0, 0]) + table.tobytes())
+        # NETSCAPE2.0应用扩展：循环次数
+        self._write(b"\x21\xFF\x0BNETSCAPE2.0\x03\x01" + loop.to_bytes(2, "little") + b"\x00")
+
+    def _write(self, data):
+        self.file.write(data)
+        self.bytes_written += len(data)
+
+    def write_frame(self, indices, delay, left=0, top=0, transparent=False):
+        """
+        写入一帧
+
+        参数:
+            indices: 调色板索引数组（二维uint8）
+            delay: 显示时长（厘秒）
+            left, top: 区域在画面中的位置
+            transparent: 是否把TRANSPARENT_INDEX作为透明色
+        """
+        height, width = indices.shape
+        delay = max(self.MIN_DELAY, int(delay))
+        packed = (1 << 2) | (1 if transparent else 0)
+        self._write(b"\x21\xF9\x04" + bytes([packed]) + delay.to_bytes(2, "little")
+                    + bytes([self.TRANSPARENT_INDEX, 0]))
+        self._write(b"\x2C" + left.to_bytes(2, "little") + top.to_bytes(2, "little")
+                    + width.to_bytes(2, "little") + height.to_bytes(2, "little") + b"\x00")
+
+        data = lzw_encode(np.ascontiguousarray(indices).tobytes(), 8)
+        blocks = bytearray([8])
+        for start in range(0, len(data), 255):
+            chunk = data[start:start + 255]
+            blocks.append(len(chunk))
+            blocks += chunk
+        blocks.append(0)
+        self._write(bytes(blocks))
+        self.frames += 1
+
+    def close(self):
+        """写入文件结束标记并关闭文件"""
+        if self.file is not None:
+            self._write(b"\x3B")
+            self.file.close()
+            self.file = None
+
+def changed_region(previous, current):
+    """
+    current相对previous发生变化的最小矩形
+
+    返回:
+        (left, top, right, bottom)，没有变化时返回None
+    """
+    changed = previous != current
+    rows = np.flatnonzero(changed.any(axis=1))
+    if len(rows) == 0:
+        return None
+    columns = np.flatnonzero(changed[rows[0]:rows[-1] + 1].any(axis=0))
+    return columns[0], rows[0], columns[-1] + 1, rows[-1] + 1
+
+class AnimationExporter:
+    """
+    动画导出器
+    add()按帧率上限抽取帧并缩小到最大宽度；GIF在save()时计算一次调色板后逐帧编码，
+    WebP在安装了ffmpeg时边添加边交给ffmpeg编码，否则使用Pillow（可选依赖）在save()时编码
+    """
+
+    # GIF延时以厘秒为单位，帧率过高时浏览器不会按原速播放
+    MAX_FPS = 50
+
+    def __init__(self, path, max_width=480, fps=15, colors=255, max_seconds=0, palette_stride=4,
+                 loop=0, webp_quality=80, ffmpeg="ffmpeg"):
+        """
+        参数:
+            path: 输出文件路径，扩展名为.gif或.webp
+            max_width: 导出的最大宽度（像素，高度按比例），0表示不缩小
+            fps: 导出帧率上限（超过的帧丢弃）
+            colors: GIF调色板颜色数（2-255）
+            max_seconds: 导出时长上限（秒），0表示不限制
+            palette_stride: 每隔多少帧抽取一帧统计调色板的颜色直方图
+            loop: 循环次数，0表示无限循环
+            webp_quality: WebP的质量（0-100）
+            ffmpeg: ffmpeg可执行文件
+        """
+        ext = os.path.splitext(path)[1].lower().lstrip(".")
+        if ext not in SUPPORTED_FORMATS:
+            raise ValueError(f"不支持的动画格式: {path}（支持.gif和.webp）")
+        if not 2 <= colors <= 255:
+            raise ValueError(f"调色板颜色数应为2-255: {colors}")
+        self.path = path
+        self.format = ext
+        self.max_width = max_width
+        self.fps = min(float(fps), self.MAX_FPS)
+        self.colors = colors
+        self.max_seconds = max_seconds
+        self.palette_stride = max(1, palette_stride)
+        self.loop = loop
+        self.webp_quality = webp_quality
+        self.ffmpeg = ffmpeg
+
+        self.size = None
+        self.full = False
+        self.received = 0
+        self.skipped = 0
+        self.encode_seconds = 0.0
+        self.palette_seconds = 0.0
+        self.written_frames = 0
+        self.regions_pixels = 0
+        self._start_time = None
+        self._last_slot = -1
+        self._last_source = None
+
+        # 保存的帧：(时间槽, 数据)，GIF为直方图箱号，WebP（Pillow）为缩小后的BGR帧
+        self._frames = []
+        self._histogram = np.zeros(1 << (3 * PaletteQuantizer.LUT_BITS), dtype=np.int64)
+        self._webp_writer = None
+        self._webp_last = None
+        self._webp_ffmpeg = self.format == FORMAT_WEBP and ffmpeg_available(ffmpeg)
+        if self.format == FORMAT_WEBP and not self._webp_ffmpeg:
+            try:
+                import PIL.Image  # noqa: F401
+            except ImportError:
+                raise ValueError("导出WebP动画需要ffmpeg（libwebp）或Pillow")
+
+    def _resize(self, frame):
+        if self.size is None:
+            height, width = frame.shape[:2]
+            if self.max_width and width > self.max_width:
+                self.size = (self.max_width, max(1, round(height * self.max_width / width)))
+            else:
+                self.size = (width, height)
+        if (frame.shape[1], frame.shape[0]) == self.size:
+            return frame
+        return cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+
+    def add(self, frame, timestamp):
+        """
+        添加一帧
+
+        参数:
+            frame: BGR合成结果
+            timestamp: 帧的时刻（秒，视频文件为帧序号/帧率，实时画面为time.perf_counter()）
+
+        返回:
+            是否保留了该帧（帧率上限内的帧保留，达到时长上限后返回False并设置full）
+        """
+        self.received += 1
+        if self._start_time is None:
+            self._start_time = timestamp
+        elapsed = timestamp - self._start_time
+        if self.max_seconds and elapsed >= self.max_seconds:
+            self.full = True
+            return False
+        slot = int(elapsed * self.fps + 1e-6)
+        if slot <= self._last_slot:
+            self.skipped += 1
+            return False
+        self._last_slot = slot
+
+        # 空闲模式下画面不变时效果对象重复返回同一个数组，并入上一帧的延时
+        if frame is self._last_source:
+            return True
+        self._last_source = frame
+
+        small = self._resize(frame)
+        if self.format == FORMAT_GIF:
+            keys = PaletteQuantizer.bin_keys(small)
+            if len(self._frames) % self.palette_stride == 0:
+                self._histogram += np.bincount(keys.ravel(), minlength=len(self._histogram))
+            self._frames.append((slot, keys))
+        elif self._webp_ffmpeg:
+            self._write_webp_ffmpeg(slot, small)
+        else:
+            self._frames.append((slot, small.copy()))
+        return True
+
+    def _write_webp_ffmpeg(self, slot, frame):
+        """按时间槽把帧交给ffmpeg（固定帧率），跳过的时间槽重复上一帧"""
+        start = time.perf_counter()
+        if self._webp_writer is None:
+            self._webp_writer = FFmpegWriter(self.path, self.fps, self.size, codec="libwebp", crf=None,
+                                             pix_fmt="yuv420p", ffmpeg=self.ffmpeg,
+                                             output_args=["-quality", str(self.webp_quality),
+                                                          "-loop", str(self.loop)])
+        if self._webp_last is not None:
+            for _ in range(slot - self._webp_writer.frames):
+                self._webp_writer.write(self._webp_last)
+        self._webp_writer.write(frame)
+        self._webp_last = frame
+        self.written_frames += 1
+        self.encode_seconds += time.perf_counter() - start
+
+    def _delay(self, slot, next_slot):
+        """两个时间槽之间的延时（厘秒），按累计时刻取整，避免误差累积"""
+        return round(next_slot * 100 / self.fps) - round(slot * 100 / self.fps)
+
+    def _write_gif_frame(self, writer, frame, next_slot):
+        slot, patch, left, top, transparent = frame
+        writer.write_frame(patch, self._delay(slot, next_slot), left, top, transparent)
+
+    def _save_gif(self, end_slot):
+        start = time.perf_counter()
+        quantizer = PaletteQuantizer.from_histogram(self._histogram, colors=self.colors)
+        self.palette_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        writer = GifWriter(self.path, self.size, quantizer.palette, loop=self.loop)
+        previous = None
+        # 每帧的延时要等到下一个写入的帧才能确定，只保留一帧待写：(时间槽, 索引区域, 左, 上, 是否透明)
+        pending = None
+        for slot, keys in self._frames:
+            indices = quantizer.quantize_keys(keys)
+            if previous is None:
+                current = (slot, indices, 0, 0, False)
+            else:
+                region = changed_region(previous, indices)
+                if region is None:
+                    continue
+                left, top, right, bottom = region
+                patch = indices[top:bottom, left:right].copy()
+                patch[previous[top:bottom, left:right] == patch] = GifWriter.TRANSPARENT_INDEX
+                current = (slot, patch, int(left), int(top), True)
+            if pending is not None:
+                self._write_gif_frame(writer, pending, slot)
+            pending = current
+            previous = indices
+            self.regions_pixels += current[1].size
+        self._write_gif_frame(writer, pending, end_slot)
+        writer.close()
+        self.written_frames = writer.frames
+        self.encode_seconds = time.perf_counter() - start
+
+    def _save_webp_pillow(self, end_slot):
+        from PIL import Image
+
+        start = time.perf_counter()
+        slots = [slot for slot, _ in self._frames] + [end_slot]
+        durations = [self._delay(slots[i], slots[i + 1]) * 10 for i in range(len(self._frames))]
+        images = [Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)) for _, frame in self._frames]
+        images[0].save(self.path, save_all=True, append_images=images[1:], duration=durations,
+                       loop=self.loop, quality=self.webp_quality)
+        self.written_frames = len(images)
+        self.encode_seconds = time.perf_counter() - start
+
+    def save(self):
+        """编码并写入动画文件"""
+        end_slot = self._last_slot + 1
+        if self._webp_writer is not None:
+            start = time.perf_counter()
+            for _ in range(end_slot - self._webp_writer.frames):
+                self._webp_writer.write(self._webp_last)
+            self._webp_writer.release()
+            self.encode_seconds += time.perf_counter() - start
+        elif not self._frames:
+            raise ValueError("没有可导出的帧")
+        elif self.format == FORMAT_GIF:
+            self._save_gif(end_slot)
+        else:
+            self._save_webp_pillow(end_slot)
+        self._frames = []
+
+    def report(self):
+        """生成导出统计文本"""
+        duration = (self._last_slot + 1) / self.fps if self._last_slot >= 0 else 0.0
+        size = os.path.getsize(self.path) / 1024 if os.path.exists(self.path) else 0.0
+        text = (f"动画导出: {self.path}（{self.size[0]}x{self.size[1]}，{self.fps:g} fps，{duration:.1f}秒）, "
+                f"收到 {self.received}帧，帧率限制跳过 {self.skipped}帧，写入 {self.written_frames}帧，"
+                f"{size:.0f} KB，编码 {self.encode_seconds:.2f}秒")
+        if self.format == FORMAT_GIF and self.written_frames:
+            full = self.written_frames * self.size[0] * self.size[1]
+            text += (f"，调色板 {self.palette_seconds:.2f}秒，"
+                     f"变化区域占整帧的 {self.regions_pixels / full * 100:.0f}%")
+        return text
+
+def export_scan(video_source, path, effect_params=None, max_width=480, fps=15, colors=255, max_seconds=0,
+                hold_seconds=1.0, full_resolution=False, loop=0, webp_quality=80):
+    """
+    无窗口运行一次完整扫描并导出为动画
+
+    参数:
+        video_source: 视频文件路径或摄像头索引（视频短于扫描时长时循环播放）
+        path: 输出文件路径（.gif或.webp）
+        effect_params: 传给AdvancedScanEffect的参数（扫描方向、速度、效果类型等）
+        max_width, fps, colors, max_seconds, loop, webp_quality: 见AnimationExporter
+        hold_seconds: 扫描完成后继续导出的时长（秒），用于在循环播放前停留在完整画面上
+        full_resolution: 是否在视频源的原始分辨率下运行扫描效果（默认缩小到导出宽度后运行，
+                         扫描速度和扫描线宽度按比例缩小，至少为1像素）
+
+    返回:
+        AnimationExporter实例（已保存）
+    """
+    from advanced_scan_effect import AdvancedScanEffect
+
+    params = dict(effect_params or {})
+    flip_image = params.pop("flip_image", False)
+    cap = cv2.VideoCapture(video_source)
+    if not cap.isOpened():
+        raise ValueError(f"无法打开视频源: {video_source}")
+    source_fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    is_file = isinstance(video_source, str)
+
+    size = None
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    if not full_resolution and max_width and width > max_width:
+        scale = max_width / width
+        size = (max_width, max(1, round(height * scale)))
+        for key in ("speed", "line_width", "line_spacing"):
+            if key in params:
+                params[key] = max(1, round(params[key] * scale))
+
+    def read():
+        ret, frame = cap.read()
+        if not ret and is_file:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = cap.read()
+        if not ret:
+            return None
+        if size is not None:
+            frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        return cv2.flip(frame, 1) if flip_image else frame
+
+    exporter = AnimationExporter(path, max_width=max_width, fps=fps, colors=colors, max_seconds=max_seconds,
+                                 loop=loop, webp_quality=webp_quality)
+    try:
+        frame = read()
+        if frame is None:
+            raise ValueError(f"无法读取视频源: {video_source}")
+        effect = AdvancedScanEffect(first_frame=frame, **params)
+
+        index = 0
+        complete_at = None
+        while frame is not None and not exporter.full:
+            timestamp = index / source_fps
+            exporter.add(effect.process_frame(frame), timestamp)
+            if complete_at is None and effect.is_scan_complete():
+                complete_at = timestamp
+            if complete_at is not None and timestamp - complete_at >= hold_seconds:
+                break
+            index += 1
+            frame = read() if not effect.is_idle() else frame
+        exporter.save()
+    finally:
+        cap.release()
+    return exporter
+
+def main():
+    from advanced_scan_effect import AdvancedScanEffect
+    from scan_effect import parse_color
+    from tile_executor import shutdown_tile_executors
+
+    parser = argparse.ArgumentParser(description="把一次完整扫描导出为GIF/WebP动画（无窗口）")
+    parser.add_argument("--video", type=str, default=0,
+                        help="视频文件路径，默认使用摄像头")
+    parser.add_argument("--output", type=str, default="scan.gif",
+                        help="输出文件路径，扩展名为.gif或.webp")
+    parser.add_argument("--max_width", type=int, default=480,
+                        help="导出的最大宽度（像素），0表示不缩小")
+    parser.add_argument("--fps", type=float, default=15,
+                        help="导出帧率上限")
+    parser.add_argument("--colors", type=int, default=255,
+                        help="GIF调色板颜色数（2-255）")
+    parser.add_argument("--max_seconds", type=float, default=0,
+                        help="导出时长上限（秒），0表示导出完整扫描")
+    parser.add_argument("--hold", type=float, default=1.0,
+                        help="扫描完成后停留的时长（秒）")
+    parser.add_argument("--full_resolution", action="store_true",
+                        help="在视频源的原始分辨率下运行扫描效果（更慢，特效细节与实时画面一致）")
+    parser.add_argument("--quality", type=int, default=80,
+                        help="WebP质量（0-100）")
+    parser.add_argument("--direction", type=str, default="left_to_right",
+                        choices=["left_to_right", "right_to_left", "top_to_bottom", "bottom_to_top"],
+                        help="扫描方向")
+    parser.add_argument("--speed", type=int, default=2,
+                        help="扫描速度（视频源分辨率下的像素/帧）")
+    parser.add_argument("--line_width", type=int, default=3,
+                        help="扫描线宽度（视频源分辨率下的像素）")
+    parser.add_argument("--line_color", type=parse_color, default="0,255,0",
+                        help="扫描线颜色，格式为'R,G,B'")
+    parser.add_argument("--effect", type=str, default=AdvancedScanEffect.EFFECT_BASIC,
+                        choices=AdvancedScanEffect.SUPPORTED_EFFECTS,
+                        help="效果类型")
+    parser.add_argument("--animation", type=str, default=AdvancedScanEffect.ANIMATION_NONE,
+                        choices=AdvancedScanEffect.SUPPORTED_ANIMATIONS,
+                        help="动画类型")
+    parser.add_argument("--gradient", action="store_true",
+                        help="启用渐变效果")
+    parser.add_argument("--blur", action="store_true",
+                        help="启用模糊效果")
+    parser.add_argument("--feather", type=int, default=0,
+                        help="静态与动态画面边界的羽化宽度（像素）")
+    parser.add_argument("--flip", action="store_true",
+                        help="水平翻转图像（适用于摄像头）")
+    args = parser.parse_args()
+
+    video_source = args.video
+    if video_source != 0 and not os.path.exists(video_source):
+        print(f"错误: 视频文件不存在: {video_source}")
+        return
+
+    effect_params = {
+        "direction": args.direction,
+        "speed": args.speed,
+        "line_width": args.line_width,
+        "line_color": args.line_color,
+        "effect_type": args.effect,
+        "animation_type": args.animation,
+        "gradient_effect": args.gradient,
+        "blur_effect": args.blur,
+        "feather_width": args.feather,
+        "flip_image": args.flip,
+    }
+    try:
+        start = time.perf_counter()
+        exporter = export_scan(video_source, args.output, effect_params, max_width=args.max_width, fps=args.fps,
+                               colors=args.colors, max_seconds=args.max_seconds, hold_seconds=args.hold,
+                               full_resolution=args.full_resolution, webp_quality=args.quality)
+        print(exporter.report())
+        print(f"总耗时 {time.perf_counter() - start:.2f}秒")
+    except Exception as e:
+        print(f"错误: {e}")
+    finally:
+        shutdown_tile_executors()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+asyncio接口
+以异步迭代器提供合成后的帧，供基于事件循环的控制程序（websocket控制、演出排程等）直接使用。
+读取视频源和扫描合成、特效分别在各自的单线程执行器中运行，事件循环只负责调度；
+参数修改提交到合成线程，在两帧之间生效；阶段之间的有界队列施加背压
+"""
+
+import argparse
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+# 视频源结束的标记
+_END = object()
+
+class _Failure:
+    """工作任务中的异常，经队列传给迭代方重新抛出"""
+
+    def __init__(self, error):
+        self.error = error
+
+class AsyncScanStream:
+    """
+    扫描效果的异步帧流
+
+    用法:
+        async with AsyncScanStream(effect) as stream:
+            async for frame in stream:
+                ...
+                await stream.configure(direction="top_to_bottom", speed=4)
+
+    暂停或扫描完成后的空闲模式下不读取视频源，重复处理最后一帧（画面不变时产出同一个数组）；
+    取消迭代所在的任务或调用aclose()会停止工作任务并等待执行器中正在进行的调用结束
+    """
+
+    def __init__(self, effect, queue_size=2, paced=True, drop_frames=False):
+        """
+        参数:
+            effect: ScanEffect（或子类）实例，由本对象独占使用
+            queue_size: 读取与合成之间、合成与迭代方之间的队列长度
+            paced: 是否按视频源帧率产出（视频文件、暂停和空闲时不会空转），否则尽快产出
+            drop_frames: 迭代方跟不上时是否丢弃最旧的帧（实时预览），否则合成线程等待迭代方（不丢帧）
+        """
+        self.effect = effect
+        self.queue_size = queue_size
+        self.paced = paced
+        self.drop_frames = drop_frames
+
+        self.frames = 0
+        self.dropped = 0
+        self.start_time = None
+
+        # 读取和合成各用一个线程：效果对象的状态只在合成线程中修改，参数修改也提交到该线程
+        self._capture_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="scan-capture")
+        self._process_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="scan-process")
+        # 合成线程重新开始扫描时会读取视频源，与读取线程互斥
+        self._capture_lock = threading.Lock()
+        self._capture_queue = None
+        self._output_queue = None
+        self._tasks = []
+        self._closed = False
+
+    def _start(self):
+        """在当前事件循环中启动读取和合成任务"""
+        if self._tasks or self._closed:
+            return
+        self._capture_queue = asyncio.Queue(maxsize=self.queue_size)
+        self._output_queue = asyncio.Queue(maxsize=self.queue_size)
+        self._tasks = [asyncio.ensure_future(self._capture_loop()),
+                       asyncio.ensure_future(self._process_loop())]
+        self.start_time = time.perf_counter()
+
+    def _read(self):
+        with self._capture_lock:
+            start = time.perf_counter()
+            ret, frame = self.effect._read_frame()
+            if self.effect.telemetry is not None:
+                self.effect.telemetry.observe_stage("capture", start)
+            return ret, frame
+
+    async def _capture_loop(self):
+        """读取任务：在读取线程中读取视频源，暂停或空闲时重复最后一帧"""
+        loop = asyncio.get_running_loop()
+        effect = self.effect
+        interval = 1.0 / effect.fps
+        deadline = time.perf_counter()
+        frame = None
+        try:
+            while True:
+                if frame is None or not (effect.paused or effect.is_idle()):
+                    ret, frame = await loop.run_in_executor(self._capture_executor, self._read)
+                    if not ret:
+                        break
+                if self.paced:
+                    # 按帧率产出：提前时等待，落后时不补偿
+                    deadline = max(deadline + interval, time.perf_counter() - interval)
+                    delay = deadline - time.perf_counter()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                await self._capture_queue.put(frame)
+            await self._capture_queue.put(_END)
+        except Exception as e:
+            await self._capture_queue.put(_Failure(e))
+
+    async def _process_loop(self):
+        """合成任务：在合成线程中处理每一帧，结果放入输出队列"""
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                frame = await self._capture_queue.get()
+                if frame is _END or isinstance(frame, _Failure):
+                    await self._output_queue.put(frame)
+                    return
+                result = await loop.run_in_executor(self._process_executor, self.effect.process_frame, frame)
+                if self.drop_frames and self._output_queue.full():
+                    self._output_queue.get_nowait()
+                    self.dropped += 1
+                    if self.effect.telemetry is not None:
+                        self.effect.telemetry.dropped.inc()
+                await self._output_queue.put(result)
+        except Exception as e:
+            await self._output_queue.put(_Failure(e))
+
+    def __aiter__(self):
+        self._start()
+        return self
+
+    async def __anext__(self):
+        if self._closed:
+            raise StopAsyncIteration
+        self._start()
+        item = await self._output_queue.get()
+        if item is _END:
+            raise StopAsyncIteration
+        if isinstance(item, _Failure):
+            raise item.error
+        self.frames += 1
+        return item
+
+    async def _call(self, func, *args, **kwargs):
+        """在合成线程中调用，与帧处理串行执行（在两帧之间生效）"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._process_executor, partial(func, *args, **kwargs))
+
+    async def configure(self, **params):
+        """
+        修改效果参数（扫描方向、速度、效果类型等，见CONFIGURABLE_PARAMS），在两帧之间生效
+
+        返回:
+            实际发生变化的参数字典
+        """
+        return await self._call(self.effect.configure, **params)
+
+    def _restart(self):
+        with self._capture_lock:
+            self.effect.restart_scan()
+
+    async def restart(self):
+        """重置扫描线，并以视频源的最新一帧重新开始扫描"""
+        await self._call(self._restart)
+
+    async def set_paused(self, paused):
+        """暂停或继续（暂停时不读取视频源）"""
+        def apply():
+            self.effect.paused = paused
+        await self._call(apply)
+
+    async def aclose(self):
+        """停止读取和合成任务，等待执行器中正在进行的调用结束并释放执行器"""
+        if self._closed:
+            return
+        self._closed = True
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        loop = asyncio.get_running_loop()
+        for executor in (self._capture_executor, self._process_executor):
+            await loop.run_in_executor(None, partial(executor.shutdown, wait=True))
+
+    async def __aenter__(self):
+        self._start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
+
+    def report(self):
+        """生成吞吐量统计文本"""
+        elapsed = time.perf_counter() - self.start_time if self.start_time else 0
+        fps = self.frames / elapsed if elapsed > 0 else 0
+        return f"异步帧流: 产出 {self.frames}帧, {fps:.1f} fps, 丢弃 {self.dropped}帧"
+
+async def _measure_loop_lag(interval, lags):
+    """每隔interval秒记录事件循环的调度延迟"""
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - start - interval)
+
+async def _run_demo(effect, duration, paced):
+    """无窗口运行异步帧流，中途修改参数，统计吞吐量和事件循环延迟"""
+    lags = []
+    ticker = asyncio.ensure_future(_measure_loop_lag(0.005, lags))
+    start = time.perf_counter()
+    switched = False
+    async with AsyncScanStream(effect, paced=paced) as stream:
+        async for _ in stream:
+            elapsed = time.perf_counter() - start
+            if not switched and elapsed > duration / 2:
+                changed = await stream.configure(direction=effect.DIRECTION_TOP_TO_BOTTOM, speed=effect.speed * 2)
+                print(f"已修改参数: {changed}")
+                switched = True
+            if elapsed > duration:
+                break
+        print(stream.report())
+    ticker.cancel()
+    if lags:
+        lags.sort()
+        print(f"事件循环调度延迟: 中位数 {lags[len(lags) // 2] * 1000:.2f} ms, 最大 {lags[-1] * 1000:.2f} ms")
+
+def main():
+    from advanced_scan_effect import AdvancedScanEffect
+    from tile_executor import shutdown_tile_executors
+
+    parser = argparse.ArgumentParser(description="异步帧流演示（无窗口）")
+    parser.add_argument("--video", type=str, default=0,
+                        help="视频文件路径，默认使用摄像头")
+    parser.add_argument("--effect", type=str, default=AdvancedScanEffect.EFFECT_NEON,
+                        choices=AdvancedScanEffect.SUPPORTED_EFFECTS,
+                        help="效果类型")
+    parser.add_argument("--duration", type=float, default=10,
+                        help="运行时长（秒）")
+    parser.add_argument("--unpaced", action="store_true",
+                        help="不按视频源帧率产出，尽快处理")
+    args = parser.parse_args()
+
+    video_source = args.video
+    if video_source != 0 and not os.path.exists(video_source):
+        print(f"错误: 视频文件不存在: {video_source}")
+        return
+
+    try:
+        effect = AdvancedScanEffect(video_source=video_source, effect_type=args.effect, idle_when_complete=False)
+        asyncio.run(_run_demo(effect, args.duration, not args.unpaced))
+        if effect.owns_capture:
+            effect.cap.release()
+    except Exception as e:
+        print(f"错误: {e}")
+    finally:
+        shutdown_tile_executors()
+
+if __name__ == "__main__":
+    main()
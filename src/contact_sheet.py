@@ -0,0 +1,324 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+效果对比预览（接触印样）
+一次解码视频帧，同时驱动多组高级扫描效果配置，
+结果以缩略网格显示，或分别写入多个输出文件
+"""
+
+import cv2
+import numpy as np
+import argparse
+import os
+from datetime import datetime
+from scan_effect import ScanEffect, parse_color
+from advanced_scan_effect import AdvancedScanEffect
+from writers import create_writer, add_writer_arguments, writer_options_from_args
+
+def default_configs():
+    """默认配置：每种效果类型各一组"""
+    return [{"effect_type": effect} for effect in AdvancedScanEffect.SUPPORTED_EFFECTS]
+
+def config_label(config):
+    """生成配置的简短标签，用于网格标注和输出文件名"""
+    if "label" in config:
+        return config["label"]
+
+    parts = [config.get("effect_type", AdvancedScanEffect.EFFECT_BASIC)]
+    animation = config.get("animation_type", AdvancedScanEffect.ANIMATION_NONE)
+    if animation != AdvancedScanEffect.ANIMATION_NONE:
+        parts.append(animation)
+    if config.get("gradient_effect"):
+        parts.append("gradient")
+    if config.get("blur_effect"):
+        parts.append("blur")
+    if config.get("multi_line", 1) > 1:
+        parts.append(f"x{config['multi_line']}")
+    return "_".join(parts)
+
+class ContactSheet:
+    """
+    效果对比预览类
+    共享同一个视频捕获对象，每帧只解码一次，解码后的帧以只读方式
+    分发给多个AdvancedScanEffect实例，每个实例保留各自的静态帧和扫描状态
+    """
+
+    def __init__(self, configs=None, video_source=0, columns=None, tile_size=(480, 360),
+                 flip_image=False, output_dir=None, show_labels=True, capture=None, writer_options=None):
+        """
+        初始化效果对比预览
+
+        参数:
+            configs: 效果配置列表，每项为传给AdvancedScanEffect的关键字参数字典（可含label）
+            video_source: 视频源，可以是摄像头索引或视频文件路径
+            columns: 网格列数，默认按配置数量取接近正方形的布局
+            tile_size: 每个缩略图大小，(宽, 高)元组
+            flip_image: 是否水平翻转图像（适用于摄像头）
+            output_dir: 输出目录（可选），设置后每组配置写入一个全分辨率视频文件
+            show_labels: 是否在缩略图上标注配置名称
+            capture: 已打开的视频捕获对象（可选），传入时共享且不会被释放
+            writer_options: 传给writers.create_writer的参数（写入后端、编码器、CRF/码率等）
+        """
+        self.configs = configs if configs else default_configs()
+        self.video_source = video_source
+        self.tile_size = tile_size
+        self.flip_image = flip_image
+        self.output_dir = output_dir
+        self.show_labels = show_labels
+        self.writer_options = writer_options or {}
+
+        # 状态变量
+        self.paused = False
+        self.running = True
+
+        # 网格布局
+        count = len(self.configs)
+        self.columns = columns if columns else int(np.ceil(np.sqrt(count)))
+        self.rows = int(np.ceil(count / self.columns))
+
+        # 打开唯一的视频捕获对象
+        self.owns_capture = capture is None
+        self.cap = cv2.VideoCapture(self.video_source) if capture is None else capture
+        if not self.cap.isOpened():
+            raise ValueError(f"无法打开视频源: {self.video_source}")
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS)
+        if self.fps <= 0:
+            self.fps = 30  # 如果无法获取帧率，使用默认值
+
+        ret, frame = self._read_frame()
+        if not ret:
+            raise ValueError("无法读取第一帧")
+
+        # 每组配置一个效果实例，共享捕获对象，各自复制第一帧作为静态帧
+        self.effects = []
+        for config in self.configs:
+            kwargs = {key: value for key, value in config.items() if key != "label"}
+            kwargs.setdefault("flip_image", self.flip_image)
+            self.effects.append(AdvancedScanEffect(video_source=self.video_source,
+                                                   capture=self.cap,
+                                                   first_frame=frame,
+                                                   **kwargs))
+        self.labels = [config_label(config) for config in self.configs]
+
+        self.current_frame = frame
+        self.current_results = None
+        self.writers = None
+
+    def _read_frame(self):
+        """读取一帧并标记为只读，视频文件到达末尾时从头循环"""
+        ret, frame = self.cap.read()
+        if not ret and isinstance(self.video_source, str):
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.cap.read()
+
+        if ret:
+            if self.flip_image:
+                frame = cv2.flip(frame, 1)
+            # 所有配置共享这一帧，禁止任何配置原地修改
+            frame.flags.writeable = False
+
+        return ret, frame
+
+    def _open_writers(self, frame_size):
+        """为每组配置创建一个视频写入器"""
+        if not os.path.exists(self.output_dir):
+            os.makedirs(self.output_dir)
+
+        # 使用ffmpeg后端时每个输出文件由独立的编码进程并行编码
+        self.writers = []
+        for index, label in enumerate(self.labels):
+            filename = os.path.join(self.output_dir, f"{index:02d}_{label}.mp4")
+            self.writers.append(create_writer(filename, self.fps, frame_size, **self.writer_options))
+            print(f"输出文件: {filename}")
+
+    def process_frame(self, frame):
+        """将一帧分发给所有配置，返回各配置的合成结果列表"""
+        results = []
+        for effect in self.effects:
+            results.append(effect.create_scan_effect(frame))
+            effect.update_scan_position()
+        return results
+
+    def compose_grid(self, results):
+        """将各配置的结果缩小后拼接成网格"""
+        tile_width, tile_height = self.tile_size
+        grid = np.zeros((self.rows * tile_height, self.columns * tile_width, 3), dtype=np.uint8)
+
+        for index, result in enumerate(results):
+            row, col = divmod(index, self.columns)
+            y, x = row * tile_height, col * tile_width
+            grid[y:y+tile_height, x:x+tile_width] = cv2.resize(result, (tile_width, tile_height),
+                                                               interpolation=cv2.INTER_AREA)
+            if self.show_labels:
+                cv2.putText(grid, self.labels[index], (x + 8, y + 24),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+
+        return grid
+
+    def write_results(self, results):
+        """将各配置的全分辨率结果写入对应的输出文件"""
+        if self.writers is None:
+            height, width = results[0].shape[:2]
+            self._open_writers((width, height))
+        for writer, result in zip(self.writers, results):
+            writer.write(result)
+
+    def reset(self):
+        """以当前帧重置所有配置的扫描线和静态帧"""
+        for effect in self.effects:
+            effect.reset_scan_line()
+            effect.static_frame = self.current_frame.copy()
+
+    def save_grid(self, grid):
+        """保存当前网格为图片"""
+        if not os.path.exists("output"):
+            os.makedirs("output")
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename = f"output/contact_sheet_{timestamp}.jpg"
+        cv2.imwrite(filename, grid)
+        print(f"已保存图片: {filename}")
+
+    def render(self, max_frames):
+        """无窗口模式：处理指定帧数并写入输出文件"""
+        if self.output_dir is None:
+            raise ValueError("无窗口模式需要设置输出目录")
+
+        frame = self.current_frame
+        for _ in range(max_frames):
+            self.write_results(self.process_frame(frame))
+            ret, frame = self._read_frame()
+            if not ret:
+                break
+            self.current_frame = frame
+
+        self.release()
+
+    def process_key_event(self, key, grid):
+        """处理键盘事件"""
+        if key == 27:  # ESC键
+            self.running = False
+        elif key == 32:  # 空格键
+            self.paused = not self.paused
+        elif key == ord('r'):  # r键
+            self.reset()
+        elif key == ord('s'):  # s键
+            self.save_grid(grid)
+
+    def run(self):
+        """运行效果对比预览"""
+        window_name = "效果对比预览"
+        cv2.namedWindow(window_name, cv2.WINDOW_NORMAL)
+        cv2.resizeWindow(window_name, self.columns * self.tile_size[0], self.rows * self.tile_size[1])
+
+        grid = None
+        while self.running:
+            if not self.paused or grid is None:
+                self.current_results = self.process_frame(self.current_frame)
+                grid = self.compose_grid(self.current_results)
+                if self.output_dir is not None:
+                    self.write_results(self.current_results)
+
+                ret, frame = self._read_frame()
+                if not ret:
+                    break
+                self.current_frame = frame
+
+            cv2.imshow(window_name, grid)
+
+            # 处理键盘事件
+            key = cv2.waitKey(int(1000/self.fps)) & 0xFF
+            self.process_key_event(key, grid)
+
+        self.release()
+        cv2.destroyAllWindows()
+
+    def release(self):
+        """释放视频捕获对象和输出文件"""
+        if self.writers is not None:
+            for writer in self.writers:
+                writer.release()
+                print(writer.report())
+            self.writers = None
+        if self.owns_capture:
+            self.cap.release()
+
+def parse_list(value):
+    """解析逗号分隔的列表"""
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+def main():
+    parser = argparse.ArgumentParser(description="扫描线效果对比预览（一次解码，多种效果）")
+    parser.add_argument("--video", type=str, default=0,
+                        help="视频文件路径，默认使用摄像头")
+    parser.add_argument("--effects", type=parse_list, default=AdvancedScanEffect.SUPPORTED_EFFECTS,
+                        help="要对比的效果类型，逗号分隔，默认全部")
+    parser.add_argument("--animations", type=parse_list, default=[AdvancedScanEffect.ANIMATION_NONE],
+                        help="要对比的动画类型，逗号分隔，与效果类型两两组合")
+    parser.add_argument("--direction", type=str, default=ScanEffect.DIRECTION_LEFT_TO_RIGHT,
+                        choices=ScanEffect.SUPPORTED_DIRECTIONS,
+                        help="扫描方向")
+    parser.add_argument("--speed", type=int, default=2,
+                        help="扫描速度（像素/帧）")
+    parser.add_argument("--line_width", type=int, default=3,
+                        help="扫描线宽度（像素）")
+    parser.add_argument("--line_color", type=parse_color, default="0,255,0",
+                        help="扫描线颜色，格式为'R,G,B'")
+    parser.add_argument("--columns", type=int, default=None,
+                        help="网格列数")
+    parser.add_argument("--tile_width", type=int, default=480,
+                        help="缩略图宽度")
+    parser.add_argument("--tile_height", type=int, default=360,
+                        help="缩略图高度")
+    parser.add_argument("--output_dir", type=str, default=None,
+                        help="输出目录，设置后每组配置写入一个视频文件")
+    parser.add_argument("--frames", type=int, default=0,
+                        help="无窗口模式下处理的帧数（需设置--output_dir），0表示显示窗口")
+    parser.add_argument("--flip", action="store_true",
+                        help="水平翻转图像（适用于摄像头）")
+    add_writer_arguments(parser)
+
+    args = parser.parse_args()
+
+    for effect in args.effects:
+        if effect not in AdvancedScanEffect.SUPPORTED_EFFECTS:
+            parser.error(f"不支持的效果类型: {effect}")
+    for animation in args.animations:
+        if animation not in AdvancedScanEffect.SUPPORTED_ANIMATIONS:
+            parser.error(f"不支持的动画类型: {animation}")
+
+    # 处理视频源
+    video_source = 0 if args.video in (0, "0") else args.video
+    if video_source != 0 and not os.path.exists(video_source):
+        print(f"错误: 视频文件不存在: {video_source}")
+        return
+
+    line_color = args.line_color if isinstance(args.line_color, tuple) else parse_color(args.line_color)
+    configs = [{
+        "effect_type": effect,
+        "animation_type": animation,
+        "direction": args.direction,
+        "speed": args.speed,
+        "line_width": args.line_width,
+        "line_color": line_color,
+    } for effect in args.effects for animation in args.animations]
+
+    try:
+        sheet = ContactSheet(
+            configs=configs,
+            video_source=video_source,
+            columns=args.columns,
+            tile_size=(args.tile_width, args.tile_height),
+            flip_image=args.flip,
+            output_dir=args.output_dir,
+            writer_options=writer_options_from_args(args)
+        )
+        if args.frames > 0:
+            sheet.render(args.frames)
+        else:
+            sheet.run()
+    except Exception as e:
+        print(f"错误: {e}")
+
+if __name__ == "__main__":
+    main()
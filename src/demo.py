@@ -10,6 +10,7 @@ import os
 import sys
 import time
 from scan_effect import ScanEffect
+from scan_session import get_session, close_sessions
 
 # 通用演示函数
 def print_demo_info(title, description):
@@ -31,9 +32,9 @@ def wait_for_key():
 def create_scan_effect(video_source=0, direction=ScanEffect.DIRECTION_LEFT_TO_RIGHT, 
                       speed=2, line_width=3, line_color=(0, 255, 0), 
                       display_size=(1280, 960), flip_image=True):
-    """创建扫描效果实例"""
-    return ScanEffect(
-        video_source=video_source,
+    """获取扫描效果实例（复用视频源的共享会话，只修改参数）"""
+    return get_session(video_source).get_effect(
+        ScanEffect,
         direction=direction,
         speed=speed,
         line_width=line_width,
@@ -187,6 +188,7 @@ def main():
         else:
             print("无效选项，请重新输入")
     
+    close_sessions()
     print("演示结束")
 
 if __name__ == "__main__":
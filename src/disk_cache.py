@@ -0,0 +1,239 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+磁盘原始帧缓存
+将视频文件一次性解码为原始uint8帧和时间戳，写入按视频路径、修改时间和翻转设置
+区分的缓存目录；之后的运行通过内存映射直接读取，返回零拷贝的NumPy视图
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import cv2
+import numpy as np
+
+# 默认缓存目录
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "scan_effect")
+
+class MemmapVideoCapture:
+    """
+    内存映射的原始帧读取器
+    接口与cv2.VideoCapture兼容（read/set/get/isOpened/release），
+    read()返回映射文件中的只读视图，不复制帧数据
+    """
+
+    def __init__(self, entry_dir):
+        """
+        打开一个缓存条目
+
+        参数:
+            entry_dir: 缓存条目目录（包含meta.json、frames.raw和timestamps.npy）
+        """
+        with open(os.path.join(entry_dir, "meta.json"), "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+
+        count, height, width = self.meta["frame_count"], self.meta["height"], self.meta["width"]
+        self.frames = np.memmap(os.path.join(entry_dir, "frames.raw"), dtype=np.uint8, mode="r",
+                                shape=(count, height, width, 3))
+        self.timestamps = np.load(os.path.join(entry_dir, "timestamps.npy"))
+        self.flipped = self.meta["flip_image"]  # 帧在写入缓存时已按该设置翻转
+        self.position = 0
+
+    def read(self):
+        """读取下一帧的零拷贝视图，到达末尾时返回(False, None)"""
+        if self.frames is None or self.position >= len(self.frames):
+            return False, None
+        frame = self.frames[self.position]
+        self.position += 1
+        return True, frame
+
+    def set(self, prop, value):
+        """设置属性，仅支持CAP_PROP_POS_FRAMES"""
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            self.position = min(max(0, int(value)), self.meta["frame_count"])
+            return True
+        return False
+
+    def get(self, prop):
+        """读取属性"""
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self.meta["width"])
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self.meta["height"])
+        if prop == cv2.CAP_PROP_FPS:
+            return float(self.meta["fps"])
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return float(self.meta["frame_count"])
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            return float(self.position)
+        if prop == cv2.CAP_PROP_POS_MSEC and 0 < self.position <= len(self.timestamps):
+            return float(self.timestamps[self.position - 1])
+        return 0.0
+
+    def isOpened(self):
+        return self.frames is not None
+
+    def release(self):
+        """关闭内存映射"""
+        self.frames = None
+
+class RawFrameCache:
+    """
+    磁盘原始帧缓存目录
+    每个视频源（路径、修改时间、翻转设置）对应一个条目，
+    按生命周期和磁盘大小上限清理，超出上限时优先删除最久未使用的条目
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=4 * 1024 ** 3, max_age_days=7):
+        """
+        初始化磁盘缓存
+
+        参数:
+            cache_dir: 缓存目录
+            max_bytes: 缓存总大小上限（字节）
+            max_age_days: 条目生命周期（天），超过后在打开（重新写入）或清理时删除
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_age_days = max_age_days
+
+    def entry_key(self, video_path, flip_image):
+        """根据视频路径、修改时间、文件大小和翻转设置生成条目键"""
+        stat = os.stat(video_path)
+        source = f"{os.path.abspath(video_path)}|{stat.st_mtime_ns}|{stat.st_size}|{int(bool(flip_image))}"
+        return hashlib.sha1(source.encode("utf-8")).hexdigest()
+
+    def _entry_dir(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def _entries(self):
+        """返回所有完整条目：[(目录, 元数据, 大小, 最后使用时间), ...]"""
+        entries = []
+        if not os.path.isdir(self.cache_dir):
+            return entries
+        for name in os.listdir(self.cache_dir):
+            entry_dir = os.path.join(self.cache_dir, name)
+            meta_path = os.path.join(entry_dir, "meta.json")
+            if not os.path.isfile(meta_path):
+                continue
+            try:
+                with open(meta_path, "r", encoding="utf-8") as f:
+                    meta = json.load(f)
+            except (OSError, ValueError):
+                continue
+            size = sum(os.path.getsize(os.path.join(entry_dir, f)) for f in os.listdir(entry_dir))
+            entries.append((entry_dir, meta, size, os.path.getmtime(meta_path)))
+        return entries
+
+    def _is_expired(self, meta, now=None):
+        """条目是否超过生命周期"""
+        now = time.time() if now is None else now
+        return now - meta["created"] > self.max_age_days * 86400
+
+    def prune(self, reserve_bytes=0):
+        """删除过期条目，并按最久未使用顺序删除条目直到总大小（加上预留空间）不超过上限"""
+        now = time.time()
+        entries = []
+        for entry in self._entries():
+            if self._is_expired(entry[1], now):
+                shutil.rmtree(entry[0], ignore_errors=True)
+            else:
+                entries.append(entry)
+
+        entries.sort(key=lambda entry: entry[3])
+        total = sum(entry[2] for entry in entries)
+        while entries and total + reserve_bytes > self.max_bytes:
+            entry_dir, _, size, _ = entries.pop(0)
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            total -= size
+
+    def open(self, video_path, flip_image=False):
+        """
+        打开视频文件的缓存条目，不存在或已过期时先解码整个文件写入缓存
+
+        返回:
+            MemmapVideoCapture；视频超过缓存大小上限时返回普通的cv2.VideoCapture
+        """
+        entry_dir = self._entry_dir(self.entry_key(video_path, flip_image))
+        meta_path = os.path.join(entry_dir, "meta.json")
+        if os.path.isfile(meta_path):
+            # 过期（或元数据损坏）的条目不再使用，删除后重新写入
+            try:
+                with open(meta_path, "r", encoding="utf-8") as f:
+                    expired = self._is_expired(json.load(f))
+            except (OSError, ValueError, KeyError):
+                expired = True
+            if expired:
+                print(f"磁盘帧缓存已过期，重新写入: {video_path}")
+                shutil.rmtree(entry_dir, ignore_errors=True)
+        if not os.path.isfile(meta_path) and not self.build(video_path, flip_image, entry_dir):
+            return cv2.VideoCapture(video_path)
+
+        # 更新最后使用时间，用于按最久未使用顺序清理
+        os.utime(meta_path)
+        return MemmapVideoCapture(entry_dir)
+
+    def build(self, video_path, flip_image, entry_dir):
+        """
+        解码整个视频文件，写入原始帧和时间戳
+
+        返回:
+            是否成功写入缓存
+        """
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            return False
+
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        estimated_bytes = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) * width * height * 3
+        if estimated_bytes > self.max_bytes:
+            print(f"视频解码后约 {estimated_bytes / 1024 ** 2:.0f} MB，超出磁盘缓存上限，不缓存")
+            cap.release()
+            return False
+
+        self.prune(reserve_bytes=estimated_bytes)
+        print(f"正在写入磁盘帧缓存: {video_path}")
+
+        # 先写入临时目录，完成后再改名，避免留下不完整的条目
+        tmp_dir = entry_dir + ".tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+
+        timestamps = []
+        with open(os.path.join(tmp_dir, "frames.raw"), "wb") as f:
+            while True:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                if flip_image:
+                    frame = cv2.flip(frame, 1)
+                f.write(np.ascontiguousarray(frame).data)
+                timestamps.append(cap.get(cv2.CAP_PROP_POS_MSEC))
+        cap.release()
+
+        if not timestamps:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            return False
+
+        np.save(os.path.join(tmp_dir, "timestamps.npy"), np.asarray(timestamps, dtype=np.float64))
+        meta = {
+            "source": os.path.abspath(video_path),
+            "width": width,
+            "height": height,
+            "fps": fps if fps > 0 else 30,
+            "frame_count": len(timestamps),
+            "flip_image": bool(flip_image),
+            "created": time.time(),
+        }
+        with open(os.path.join(tmp_dir, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        os.replace(tmp_dir, entry_dir)
+        return True
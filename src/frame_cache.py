@@ -0,0 +1,255 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+循环视频的内存帧缓存
+第一遍播放时缓存解码后的帧（或压缩后的编码缓冲区），之后循环播放直接从内存读取，
+避免到达末尾后重新定位和解码
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+import cv2
+
+class FrameCache:
+    """
+    按内存预算限制的LRU帧缓存
+    键为(视频源, 帧序号)。为了避免顺序循环播放时LRU把即将用到的帧挤出，
+    新帧只会挤出其他视频源的条目，同一视频源放不下的帧不再缓存
+    """
+
+    def __init__(self, budget_bytes):
+        """
+        初始化帧缓存
+
+        参数:
+            budget_bytes: 内存预算（字节）
+        """
+        self.budget_bytes = budget_bytes
+        self.entries = OrderedDict()
+        self.used_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """读取条目并标记为最近使用，不存在时返回None"""
+        with self._lock:
+            value = self.entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def peek(self, key):
+        """读取条目但不更新使用顺序和统计"""
+        with self._lock:
+            return self.entries.get(key)
+
+    def put(self, key, value):
+        """
+        写入条目，必要时按LRU顺序淘汰其他视频源的条目
+
+        返回:
+            是否成功写入
+        """
+        nbytes = value.nbytes
+        with self._lock:
+            if key in self.entries:
+                return True
+            if nbytes > self.budget_bytes:
+                return False
+
+            while self.used_bytes + nbytes > self.budget_bytes:
+                victim = next((k for k in self.entries if k[0] != key[0]), None)
+                if victim is None:
+                    return False
+                self.used_bytes -= self.entries.pop(victim).nbytes
+                self.evictions += 1
+
+            self.entries[key] = value
+            self.used_bytes += nbytes
+            return True
+
+    def clear(self, source=None):
+        """清除全部条目，或只清除指定视频源的条目"""
+        with self._lock:
+            if source is None:
+                self.entries.clear()
+                self.used_bytes = 0
+                return
+            for key in [k for k in self.entries if k[0] == source]:
+                self.used_bytes -= self.entries.pop(key).nbytes
+
+    def report(self):
+        """生成缓存统计文本"""
+        return (f"帧缓存: {len(self.entries)}帧, {self.used_bytes / 1024 / 1024:.1f}/"
+                f"{self.budget_bytes / 1024 / 1024:.0f} MB, 命中 {self.hits}, 未命中 {self.misses}, "
+                f"淘汰 {self.evictions}")
+
+class LoopingVideoCapture:
+    """
+    带内存帧缓存的视频文件读取器
+    接口与cv2.VideoCapture兼容（read/set/get/isOpened/release），可直接作为ScanEffect的视频捕获对象。
+    到达末尾时read()返回False，调用方将CAP_PROP_POS_FRAMES设为0后从缓存继续读取，不再定位解码器
+    """
+
+    def __init__(self, video_path, budget_mb=256, encoded=False, encode_ext=".png", prefetch=8, cache=None):
+        """
+        初始化带缓存的视频读取器
+
+        参数:
+            video_path: 视频文件路径
+            budget_mb: 缓存内存预算（MB），传入cache时忽略
+            encoded: 是否以压缩后的编码缓冲区存储（更省内存，由后台线程提前解码）
+            encode_ext: 编码格式扩展名，默认为无损的".png"
+            prefetch: 编码存储时后台线程提前解码的帧数
+            cache: 共享的FrameCache实例（可选）
+        """
+        self.cap = cv2.VideoCapture(video_path)
+        self.key = os.path.abspath(video_path)
+        self.owns_cache = cache is None
+        self.cache = cache if cache is not None else FrameCache(budget_mb * 1024 * 1024)
+        self.encoded = encoded
+        self.encode_ext = encode_ext
+        self.encode_params = [cv2.IMWRITE_PNG_COMPRESSION, 1] if encode_ext == ".png" else []
+        self.prefetch = prefetch
+
+        self.position = 0            # 下一次read()返回的帧序号
+        self.frame_count = None      # 第一遍播放到达末尾后得知的总帧数
+        self._decoder_position = 0   # 解码器下一次read()解码的帧序号
+        self.seeks = 0
+
+        # 编码存储时的后台解码线程
+        self._prefetched = {}
+        self._condition = threading.Condition()
+        self._stopped = False
+        self._worker = None
+        if self.encoded:
+            self._worker = threading.Thread(target=self._prefetch_loop, daemon=True)
+            self._worker.start()
+
+    def _decode_from_video(self, index):
+        """从视频文件解码指定帧，解码器不在该位置时才定位"""
+        if self._decoder_position != index:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, index)
+            self.seeks += 1
+        ret, frame = self.cap.read()
+        self._decoder_position = index + 1 if ret else -1
+        return frame if ret else None
+
+    def _store(self, index, frame):
+        """将新解码的帧写入缓存"""
+        if self.encoded:
+            ok, buffer = cv2.imencode(self.encode_ext, frame, self.encode_params)
+            if ok:
+                self.cache.put((self.key, index), buffer)
+        else:
+            # 缓存中的帧被多次返回，禁止调用方原地修改
+            frame.flags.writeable = False
+            self.cache.put((self.key, index), frame)
+
+    def _prefetch_window(self, start):
+        """返回从start开始需要提前解码的帧序号（循环播放时绕回开头）"""
+        if self.frame_count:
+            return [index % self.frame_count for index in range(start, start + self.prefetch)]
+        return list(range(start, start + self.prefetch))
+
+    def _prefetch_loop(self):
+        """后台线程：提前解码读取位置之后已缓存的编码帧"""
+        with self._condition:
+            while not self._stopped:
+                target = None
+                for index in self._prefetch_window(self.position):
+                    if index not in self._prefetched and self.cache.peek((self.key, index)) is not None:
+                        target = index
+                        break
+                if target is None:
+                    self._condition.wait()
+                    continue
+
+                buffer = self.cache.peek((self.key, target))
+                self._condition.release()
+                try:
+                    frame = cv2.imdecode(buffer, cv2.IMREAD_COLOR)
+                finally:
+                    self._condition.acquire()
+                if frame is not None:
+                    self._prefetched[target] = frame
+                    self._condition.notify_all()
+
+    def _read_cached(self, index, entry):
+        """读取已缓存的帧，编码存储时优先使用后台线程已解码的结果"""
+        if not self.encoded:
+            return entry
+        with self._condition:
+            frame = self._prefetched.pop(index, None)
+            # 丢弃已不在预解码窗口内的帧（例如重新定位之后）
+            window = set(self._prefetch_window(index + 1))
+            for stale in [i for i in self._prefetched if i not in window]:
+                del self._prefetched[stale]
+        if frame is None:
+            frame = cv2.imdecode(entry, cv2.IMREAD_COLOR)
+        return frame
+
+    def read(self):
+        """读取下一帧，返回(ret, frame)"""
+        index = self.position
+        if self.frame_count is not None and index >= self.frame_count:
+            return False, None
+
+        entry = self.cache.get((self.key, index))
+        if entry is not None:
+            frame = self._read_cached(index, entry)
+        else:
+            frame = self._decode_from_video(index)
+            if frame is None:
+                # 第一次到达末尾，记录总帧数
+                self.frame_count = index
+                return False, None
+            self._store(index, frame)
+
+        with self._condition:
+            self.position = index + 1
+            self._condition.notify_all()
+        return True, frame
+
+    def set(self, prop, value):
+        """设置属性，CAP_PROP_POS_FRAMES只移动读取位置，不定位解码器"""
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            with self._condition:
+                self.position = int(value)
+                self._condition.notify_all()
+            return True
+        return self.cap.set(prop, value)
+
+    def get(self, prop):
+        """读取属性"""
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            return float(self.position)
+        if prop == cv2.CAP_PROP_FRAME_COUNT and self.frame_count is not None:
+            return float(self.frame_count)
+        return self.cap.get(prop)
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def report(self):
+        """生成缓存统计文本"""
+        return f"{self.cache.report()}, 解码器定位 {self.seeks}次"
+
+    def release(self):
+        """停止后台线程并释放视频文件"""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        if self._worker is not None:
+            self._worker.join()
+        if self.owns_cache:
+            self.cache.clear()
+        self.cap.release()
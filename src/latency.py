@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+延迟测量工具
+统计从采集到显示的逐帧延迟，并提供屏幕-摄像头回环（glass-to-glass）测试
+"""
+
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+class LatencyMonitor:
+    """
+    采集到显示延迟统计
+    记录每帧的采集时刻和显示时刻，在滑动窗口内计算平均值和分位数
+    """
+
+    def __init__(self, window=300):
+        """
+        初始化延迟统计
+
+        参数:
+            window: 参与统计的最近帧数
+        """
+        self.samples = deque(maxlen=window)
+        self.total_frames = 0
+
+    def record(self, capture_time, display_time=None):
+        """记录一帧的延迟（时刻均为time.perf_counter()）"""
+        if capture_time is None:
+            return
+        display_time = time.perf_counter() if display_time is None else display_time
+        self.samples.append((display_time - capture_time) * 1000)
+        self.total_frames += 1
+
+    def stats(self):
+        """返回延迟统计字典（毫秒），无样本时返回None"""
+        if not self.samples:
+            return None
+        values = np.fromiter(self.samples, dtype=np.float64)
+        return {
+            "frames": self.total_frames,
+            "mean": float(values.mean()),
+            "p50": float(np.percentile(values, 50)),
+            "p95": float(np.percentile(values, 95)),
+            "max": float(values.max()),
+        }
+
+    def report(self):
+        """生成延迟统计文本"""
+        stats = self.stats()
+        if stats is None:
+            return "采集到显示延迟: 无数据"
+        return (f"采集到显示延迟（最近{len(self.samples)}帧）: 平均 {stats['mean']:.1f} ms, "
+                f"P50 {stats['p50']:.1f} ms, P95 {stats['p95']:.1f} ms, 最大 {stats['max']:.1f} ms")
+
+def mean_brightness(frame):
+    """计算帧的平均亮度（三通道均值）"""
+    return sum(cv2.mean(frame)[:3]) / 3
+
+def run_loopback_test(cap, window_name="回环延迟测试", trials=10, frame_size=(640, 480),
+                      threshold=40, timeout=2.0, read_frame=None):
+    """
+    屏幕-摄像头回环延迟测试
+    将摄像头对准显示窗口，窗口在黑白之间切换，测量从显示白屏到摄像头
+    采集到亮度跃变的时间，即包含曝光、传输、解码和显示的完整延迟
+
+    参数:
+        cap: 已打开的视频捕获对象
+        window_name: 测试窗口名称
+        trials: 测试次数
+        frame_size: 测试图案大小，(宽, 高)元组
+        threshold: 判定为亮度跃变的平均亮度增量
+        timeout: 单次测试的超时时间（秒）
+        read_frame: 读取最新帧的函数（可选），返回(ret, frame)，默认使用cap.read
+
+    返回:
+        每次测试的延迟列表（毫秒），超时的测试不计入
+    """
+    read_frame = read_frame or cap.read
+    width, height = frame_size
+    black = np.zeros((height, width, 3), dtype=np.uint8)
+    white = np.full((height, width, 3), 255, dtype=np.uint8)
+
+    cv2.namedWindow(window_name, cv2.WINDOW_NORMAL)
+    cv2.resizeWindow(window_name, width, height)
+
+    results = []
+    for _ in range(trials):
+        # 显示黑屏并等待画面稳定，测量基准亮度
+        cv2.imshow(window_name, black)
+        settle_until = time.perf_counter() + 0.5
+        baseline = None
+        while time.perf_counter() < settle_until:
+            cv2.waitKey(1)
+            ret, frame = read_frame()
+            if ret:
+                baseline = mean_brightness(frame)
+        if baseline is None:
+            break
+
+        # 显示白屏，等待摄像头采集到亮度跃变
+        cv2.imshow(window_name, white)
+        cv2.waitKey(1)
+        flash_time = time.perf_counter()
+        while time.perf_counter() - flash_time < timeout:
+            ret, frame = read_frame()
+            if ret and mean_brightness(frame) > baseline + threshold:
+                results.append((time.perf_counter() - flash_time) * 1000)
+                break
+
+        if cv2.waitKey(1) & 0xFF == 27:
+            break
+
+    cv2.destroyWindow(window_name)
+    return results
@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+内存预算模式
+4K/8K视频源下每个整帧缓冲区有几十到上百MB。内存预算模式下静态帧只保存已扫过的范围（按块分配），
+合成直接写入输入帧，特效按水平条带原地处理，同时存在的整帧缓冲区不超过FULL_FRAME_CAP个；
+缓冲区账本记录各类缓冲区的峰值占用
+"""
+
+import numpy as np
+
+# 内存预算模式下同时存在的整帧缓冲区上限：静态帧存储和工作帧（条带、显示帧等小缓冲区另计）
+FULL_FRAME_CAP = 2
+
+class SweptStaticStore:
+    """
+    静态帧的已扫过区域存储
+    沿扫描轴（水平扫描为列，垂直扫描为行）按固定宽度的块分配，只有扫过的块才占用内存，
+    重置扫描线时全部释放
+    """
+
+    # 每块沿扫描轴的像素数
+    CHUNK = 256
+
+    def __init__(self, width, height, horizontal, chunk=CHUNK):
+        """
+        参数:
+            width, height: 帧大小
+            horizontal: 是否为水平方向扫描（按列分块），否则按行分块
+            chunk: 每块沿扫描轴的像素数
+        """
+        self.width = width
+        self.height = height
+        self.horizontal = horizontal
+        self.chunk = chunk
+        self.length = width if horizontal else height
+        self.chunks = {}  # 块序号 -> 数组
+
+    def _span(self, array, start, end):
+        """数组沿扫描轴[start, end)的视图"""
+        return array[:, start:end] if self.horizontal else array[start:end]
+
+    def _blocks(self, start, end):
+        """与[start, end)相交的各块：(块序号, 块起点, 相交起点, 相交终点)"""
+        for index in range(start // self.chunk, (end - 1) // self.chunk + 1):
+            c0 = index * self.chunk
+            yield index, c0, max(start, c0), min(end, c0 + self.chunk, self.length)
+
+    def write(self, source, start, end):
+        """将source（整帧）沿扫描轴[start, end)的内容写入存储，按需分配块"""
+        for index, c0, s0, s1 in self._blocks(start, end):
+            block = self.chunks.get(index)
+            if block is None:
+                size = min(self.chunk, self.length - c0)
+                shape = (self.height, size, 3) if self.horizontal else (size, self.width, 3)
+                block = np.empty(shape, dtype=np.uint8)
+                self.chunks[index] = block
+            self._span(block, s0 - c0, s1 - c0)[...] = self._span(source, s0, s1)
+
+    def read(self, dst, start, end):
+        """将存储中沿扫描轴[start, end)的内容复制到dst（整帧）"""
+        for index, c0, s0, s1 in self._blocks(start, end):
+            block = self.chunks.get(index)
+            if block is not None:
+                self._span(dst, s0, s1)[...] = self._span(block, s0 - c0, s1 - c0)
+
+    def clear(self):
+        """释放所有块"""
+        self.chunks = {}
+
+    @property
+    def nbytes(self):
+        return sum(block.nbytes for block in self.chunks.values())
+
+class BufferLedger:
+    """
+    缓冲区账本
+    按名称记录各类缓冲区的当前占用，同时跟踪每类的峰值和所有缓冲区合计的峰值
+    """
+
+    def __init__(self, frame_bytes):
+        """
+        参数:
+            frame_bytes: 一个整帧缓冲区的字节数，报告中以整帧为单位换算
+        """
+        self.frame_bytes = frame_bytes
+        self.current = {}
+        self.peaks = {}
+        self.peak_total = 0
+
+    def record(self, name, nbytes):
+        """记录名为name的缓冲区当前占用nbytes字节（0表示已释放）"""
+        self.current[name] = nbytes
+        if nbytes > self.peaks.get(name, 0):
+            self.peaks[name] = nbytes
+        total = sum(self.current.values())
+        if total > self.peak_total:
+            self.peak_total = total
+
+    @property
+    def total(self):
+        return sum(self.current.values())
+
+    def report(self):
+        """生成峰值占用报告文本"""
+        frames = self.peak_total / self.frame_bytes
+        lines = [f"内存预算: 缓冲区合计峰值 {self.peak_total / 1024 / 1024:.1f} MB（{frames:.2f}个整帧，"
+                 f"整帧缓冲区上限 {FULL_FRAME_CAP}个）"]
+        for name, peak in sorted(self.peaks.items(), key=lambda item: -item[1]):
+            lines.append(f"  {name}: 峰值 {peak / 1024 / 1024:.1f} MB（{peak / self.frame_bytes:.2f}帧）")
+        return "\n".join(lines)
@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+运动检测
+把每帧缩小为很小的灰度图，与上一次完整渲染所用的帧逐像素比较，
+变化的像素比例低于阈值时认为画面静止，效果对象可以复用上一次的合成和特效结果
+"""
+
+import cv2
+import numpy as np
+
+class MotionDetector:
+    """
+    低分辨率帧差运动检测器
+    与参考帧（上一次完整渲染所用的帧）而不是紧邻的上一帧比较，缓慢的变化会逐帧累积并最终被检测到；
+    连续复用超过max_reuse帧时强制完整渲染一次
+    """
+
+    # 缩小前先按步长抽取像素，区域平均时每个输出像素约由SAMPLES_PER_AXIS²个采样平均
+    SAMPLES_PER_AXIS = 4
+
+    def __init__(self, width=64, pixel_threshold=12, min_changed_ratio=0.002, max_reuse=90):
+        """
+        参数:
+            width: 缩小后的宽度（高度按比例），缩小时按区域平均，可以抑制摄像头噪点
+            pixel_threshold: 缩小后的灰度差超过该值的像素视为变化（0-255）
+            min_changed_ratio: 变化像素比例超过该值时认为画面有变化
+            max_reuse: 最多连续复用的帧数
+        """
+        self.width = width
+        self.pixel_threshold = pixel_threshold
+        self.min_changed_ratio = min_changed_ratio
+        self.max_reuse = max_reuse
+        self.reference = None
+        self._pending = None
+        self._run = 0
+        self.frames = 0
+        self.reused = 0
+        self.last_ratio = 0.0
+
+    def _downsample(self, frame):
+        height = max(1, round(frame.shape[0] * self.width / frame.shape[1]))
+        step = max(1, frame.shape[1] // (self.width * self.SAMPLES_PER_AXIS))
+        small = cv2.resize(frame[::step, ::step], (self.width, height), interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+
+    def changed(self, frame):
+        """
+        检查frame相对参考帧是否有明显变化（缩小后的灰度图保留到mark_rendered()时作为新的参考帧）
+
+        返回:
+            是否需要完整渲染
+        """
+        self.frames += 1
+        self._pending = self._downsample(frame)
+        if self.reference is None or self.reference.shape != self._pending.shape or self._run >= self.max_reuse:
+            return True
+        diff = cv2.absdiff(self._pending, self.reference)
+        self.last_ratio = np.count_nonzero(diff > self.pixel_threshold) / diff.size
+        return self.last_ratio > self.min_changed_ratio
+
+    def mark_rendered(self):
+        """本帧已完整渲染：作为之后比较的参考帧"""
+        self.reference = self._pending
+        self._run = 0
+
+    def mark_reused(self):
+        """本帧复用了上一次的结果"""
+        self.reused += 1
+        self._run += 1
+
+    def reset(self):
+        """丢弃参考帧（参数变化或扫描重置后，下一帧必须完整渲染）"""
+        self.reference = None
+        self._run = 0
+
+    def report(self):
+        """生成复用统计文本"""
+        ratio = self.reused / self.frames * 100 if self.frames else 0.0
+        return f"运动自适应: 复用 {self.reused}/{self.frames}帧（{ratio:.0f}%）"
@@ -0,0 +1,290 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+流水线运行模式
+解码、扫描合成与特效、缩放、编码各在独立线程中运行，阶段之间用有界队列连接并施加背压，
+显示和键盘处理留在主线程。吞吐量取决于最慢的阶段而不是各阶段耗时之和，
+队列有界使端到端延迟不会无限增长
+"""
+
+import queue
+import threading
+import time
+from collections import deque
+
+import cv2
+
+# 视频源结束的标记
+_END = object()
+
+class StageTimer:
+    """单个阶段的滑动窗口平均耗时"""
+
+    def __init__(self, window=120):
+        self.samples = deque(maxlen=window)
+
+    def record(self, start):
+        """记录从start（time.perf_counter()）到现在的耗时"""
+        self.samples.append((time.perf_counter() - start) * 1000)
+
+    @property
+    def mean_ms(self):
+        return sum(self.samples) / len(self.samples) if self.samples else 0.0
+
+class FramePipeline:
+    """
+    扫描效果的流水线运行器
+    每帧带有递增的序号，各阶段按FIFO顺序传递，主线程只显示序号递增的帧。
+    扫描状态（静态帧、扫描位置、特效参数）由state_lock保护，视频源读取由capture_lock保护，
+    键盘处理同时持有两把锁（顺序固定为先capture_lock后state_lock）
+    """
+
+    def __init__(self, scan_effect, queue_size=2, writer=None, sink_hub=None, window_name="扫描线效果"):
+        """
+        初始化流水线
+
+        参数:
+            scan_effect: ScanEffect（或子类）实例
+            queue_size: 每个阶段之间的队列长度
+            writer: 编码阶段使用的写入对象（可选），需提供write(frame)和release()
+            sink_hub: SinkHub实例（可选），缩放阶段把合成结果分发给各输出，显示窗口共享其缩放结果
+            window_name: 显示窗口名称
+        """
+        self.effect = scan_effect
+        self.telemetry = scan_effect.telemetry
+        self.writer = writer
+        self.sink_hub = sink_hub
+        self.window_name = window_name
+
+        self.decode_queue = queue.Queue(maxsize=queue_size)
+        self.display_queue = queue.Queue(maxsize=queue_size)
+        self.resize_queue = queue.Queue(maxsize=queue_size)
+        self.encode_queue = queue.Queue(maxsize=queue_size) if writer is not None else None
+
+        self.capture_lock = threading.Lock()
+        self.state_lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.timers = {name: StageTimer() for name in ("decode", "process", "resize", "encode", "display")}
+
+        self.frames_displayed = 0
+        self.frames_dropped = 0
+        self.start_time = None
+        self.threads = []
+        self._encode_thread = None
+
+    def _put(self, q, item):
+        """放入队列，队列满时阻塞（背压），停止时放弃"""
+        while not self.stop_event.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q):
+        """从队列取出，停止时返回_END"""
+        while not self.stop_event.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _END
+
+    def _decode_loop(self):
+        """解码阶段：读取视频帧，暂停或扫描完成后的空闲模式下不读取视频源，重复发送最后一帧（不计延迟）"""
+        seq = 0
+        last = None
+        while not self.stop_event.is_set():
+            start = time.perf_counter()
+            if last is not None and (self.effect.paused or self.effect.is_idle()):
+                frame, timestamp = last, None
+            else:
+                with self.capture_lock:
+                    ret, frame = self.effect._read_frame()
+                    timestamp = self.effect.frame_timestamp
+                if self.telemetry is not None:
+                    self.telemetry.observe_stage("capture", start)
+                if not ret:
+                    self._put(self.decode_queue, _END)
+                    return
+                last = frame
+            self.timers["decode"].record(start)
+
+            if not self._put(self.decode_queue, (seq, frame, timestamp)):
+                return
+            seq += 1
+
+    def _process_loop(self):
+        """处理阶段：扫描合成、特效和扫描线（空闲模式下复用最终画面），然后推进扫描位置"""
+        while True:
+            item = self._get(self.decode_queue)
+            if item is _END:
+                break
+            seq, frame, timestamp = item
+            start = time.perf_counter()
+            with self.state_lock:
+                # process_frame自行记录处理耗时指标
+                result = self.effect.process_frame(frame)
+            self.timers["process"].record(start)
+
+            # 先放入编码队列：显示过的帧一定已经交给编码阶段，停止时不会丢失
+            if self.encode_queue is not None and not self._put(self.encode_queue, result):
+                return
+            if not self._put(self.resize_queue, (seq, result, timestamp)):
+                return
+
+        self._put(self.resize_queue, _END)
+        if self.encode_queue is not None:
+            self._put(self.encode_queue, _END)
+
+    def _resize_loop(self):
+        """
+        缩放阶段：缩放到显示窗口大小，画面不变（同一个数组）时复用上一次的结果；
+        启用输出分发时每帧都分发给各输出，由分发器统一缩放
+        """
+        effect = self.effect
+        last_result = last_display = None
+        while True:
+            item = self._get(self.resize_queue)
+            if item is _END:
+                break
+            seq, result, timestamp = item
+            if result is not last_result:
+                start = time.perf_counter()
+                if self.sink_hub is not None:
+                    last_display = self.sink_hub.publish(result, (effect.scaled_width, effect.scaled_height))
+                else:
+                    last_display = effect.resize_frame(result)
+                last_result = result
+                self.timers["resize"].record(start)
+                if self.telemetry is not None:
+                    self.telemetry.observe_stage("resize", start)
+            elif self.sink_hub is not None:
+                self.sink_hub.publish(result)
+            display_frame = last_display
+
+            if not self._put(self.display_queue, (seq, result, display_frame, timestamp)):
+                return
+        self._put(self.display_queue, _END)
+
+    def _encode_loop(self):
+        """编码阶段：将全分辨率的合成结果写入视频，不因停止而提前结束，写完队列中的帧后在_END处结束"""
+        while True:
+            result = self.encode_queue.get()
+            if result is _END:
+                break
+            start = time.perf_counter()
+            self.writer.write(result)
+            self.timers["encode"].record(start)
+            if self.telemetry is not None:
+                self.telemetry.observe_stage("encode", start)
+
+    def _handle_key(self, key):
+        """在主线程处理键盘事件，持有两把锁以免与工作线程同时修改状态"""
+        if key == 0xFF:
+            return
+        with self.capture_lock, self.state_lock:
+            self.effect.process_key_event(key)
+
+    def start(self):
+        """启动工作线程"""
+        stages = [self._decode_loop, self._process_loop, self._resize_loop]
+        if self.encode_queue is not None:
+            stages.append(self._encode_loop)
+        self.threads = [threading.Thread(target=stage, name=stage.__name__.strip("_"), daemon=True)
+                        for stage in stages]
+        self._encode_thread = self.threads[-1] if self.encode_queue is not None else None
+        for thread in self.threads:
+            thread.start()
+        self.start_time = time.perf_counter()
+
+    def stop(self):
+        """停止并等待所有工作线程；编码阶段写完已放入编码队列的帧后才结束"""
+        self.stop_event.set()
+        for thread in self.threads:
+            if thread is not self._encode_thread:
+                thread.join()
+        if self._encode_thread is not None:
+            # 前面的阶段已经停止，不会再放入新的帧；编码线程消费队列，最终取到_END
+            while self._encode_thread.is_alive():
+                try:
+                    self.encode_queue.put(_END, timeout=0.1)
+                    break
+                except queue.Full:
+                    continue
+            self._encode_thread.join()
+            self._encode_thread = None
+        self.threads = []
+
+    def run(self):
+        """在主线程中显示结果并处理键盘事件，直到视频结束或按下ESC"""
+        effect = self.effect
+        cv2.namedWindow(self.window_name, cv2.WINDOW_NORMAL)
+        cv2.resizeWindow(self.window_name, effect.scaled_width, effect.scaled_height)
+
+        frame_interval = 1.0 / effect.fps
+        last_seq = -1
+        last_display = time.perf_counter()
+        shown_frame = None
+        self.start()
+        try:
+            while effect.running:
+                item = self._get(self.display_queue)
+                if item is _END:
+                    break
+                seq, result, display_frame, timestamp = item
+                if seq <= last_seq:
+                    # 序号不递增的帧不再显示
+                    self.frames_dropped += 1
+                    if self.telemetry is not None:
+                        self.telemetry.dropped.inc()
+                    continue
+                last_seq = seq
+
+                effect.current_result_frame = result
+                if display_frame is not shown_frame:
+                    start = time.perf_counter()
+                    cv2.imshow(self.window_name, display_frame)
+                    shown_frame = display_frame
+                    if effect.first_display_time is None:
+                        effect.first_display_time = time.perf_counter()
+                    self.timers["display"].record(start)
+                    if self.telemetry is not None:
+                        self.telemetry.observe_stage("display", start)
+
+                # 低延迟模式下不按帧率等待，否则扣除本帧已用的时间
+                if effect.low_latency:
+                    delay = 1
+                else:
+                    delay = max(1, int((frame_interval - (time.perf_counter() - last_display)) * 1000))
+                key = cv2.waitKey(delay) & 0xFF
+                last_display = time.perf_counter()
+                effect.latency_monitor.record(timestamp)
+                if self.telemetry is not None:
+                    self.telemetry.frame_displayed(frame_interval, timestamp)
+                    self._record_queue_depths()
+                self.frames_displayed += 1
+                self._handle_key(key)
+        finally:
+            self.stop()
+            if self.writer is not None:
+                self.writer.release()
+
+    def _record_queue_depths(self):
+        """记录各阶段队列中的帧数"""
+        queues = {"decode": self.decode_queue, "resize": self.resize_queue,
+                  "display": self.display_queue, "encode": self.encode_queue}
+        for name, q in queues.items():
+            if q is not None:
+                self.telemetry.set_queue_depth(name, q.qsize())
+
+    def report(self):
+        """生成各阶段耗时和吞吐量统计文本"""
+        elapsed = time.perf_counter() - self.start_time if self.start_time else 0
+        fps = self.frames_displayed / elapsed if elapsed > 0 else 0
+        names = {"decode": "解码", "process": "合成与特效", "resize": "缩放", "encode": "编码", "display": "显示"}
+        stages = ", ".join(f"{names[name]} {timer.mean_ms:.1f} ms"
+                           for name, timer in self.timers.items() if timer.samples)
+        return f"流水线: 显示 {self.frames_displayed}帧, {fps:.1f} fps; 各阶段平均耗时: {stages}"
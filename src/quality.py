@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+自适应画质控制
+根据每帧处理耗时与目标帧率的差距，按预先排好的顺序逐级降低画质，
+有余量时再逐级恢复；升降使用不同阈值并在每次调整后冷却一段时间，避免来回振荡
+"""
+
+from collections import deque
+
+class QualityController:
+    """
+    画质等级控制器
+    等级0为完整画质，等级越高降级越多；每个等级的设置在上一等级的基础上叠加
+    """
+
+    # 完整画质的设置（属性名与AdvancedScanEffect中的同名属性对应）
+    FULL_QUALITY = {
+        "gradient_width": 20,      # 渐变宽度（像素）
+        "glow_kernel": 15,         # 霓虹发光模糊核大小
+        "blur_kernel": 5,          # 模糊效果的核大小
+        "max_drawn_lines": None,   # 最多绘制的扫描线条数，None表示不限制
+        "work_scale": 1.0,         # 特效处理分辨率比例
+        "effect_interval": 1,      # 每隔几帧重新计算一次特效
+    }
+
+    # 降级顺序：(名称, 相对上一等级修改的设置)
+    LEVELS = [
+        ("完整画质", {}),
+        ("渐变宽度减半", {"gradient_width": 10}),
+        ("低成本模糊", {"glow_kernel": 7, "blur_kernel": 3}),
+        ("最多3条扫描线", {"max_drawn_lines": 3}),
+        ("单条扫描线", {"max_drawn_lines": 1}),
+        ("75%处理分辨率", {"work_scale": 0.75}),
+        ("50%处理分辨率", {"work_scale": 0.5}),
+        ("隔帧计算特效", {"effect_interval": 2}),
+    ]
+
+    def __init__(self, target_fps, window=30, down_ratio=1.0, up_ratio=0.6, cooldown=30):
+        """
+        初始化画质控制器
+
+        参数:
+            target_fps: 目标帧率
+            window: 计算平均耗时的帧数
+            down_ratio: 平均耗时超过帧预算的该比例时降级
+            up_ratio: 平均耗时低于帧预算的该比例时升级（小于down_ratio，形成滞回区间）
+            cooldown: 每次调整后至少等待的帧数，等新等级的耗时稳定后再判断
+        """
+        self.target_fps = target_fps
+        self.budget = 1.0 / target_fps
+        self.down_ratio = down_ratio
+        self.up_ratio = up_ratio
+        self.cooldown = cooldown
+        self.samples = deque(maxlen=window)
+        self.level = 0
+        self.frames_since_change = 0
+        self.changes = 0
+        self.last_cost = 0.0  # 上次调整时的平均耗时
+
+        # 预先计算每个等级叠加后的完整设置
+        self.level_settings = []
+        settings = dict(self.FULL_QUALITY)
+        for _, overrides in self.LEVELS:
+            settings = dict(settings, **overrides)
+            self.level_settings.append(settings)
+
+    @property
+    def max_level(self):
+        return len(self.LEVELS) - 1
+
+    @property
+    def level_name(self):
+        return self.LEVELS[self.level][0]
+
+    @property
+    def settings(self):
+        """当前等级的完整设置"""
+        return self.level_settings[self.level]
+
+    @property
+    def mean_cost(self):
+        """窗口内的平均每帧耗时（秒）"""
+        return sum(self.samples) / len(self.samples) if self.samples else 0.0
+
+    def update(self, frame_seconds):
+        """
+        记录一帧的处理耗时，必要时调整等级
+
+        返回:
+            等级是否发生变化
+        """
+        self.samples.append(frame_seconds)
+        self.frames_since_change += 1
+        if self.frames_since_change < self.cooldown or len(self.samples) < self.samples.maxlen:
+            return False
+
+        cost = self.mean_cost
+        if cost > self.budget * self.down_ratio and self.level < self.max_level:
+            self._set_level(self.level + 1)
+            return True
+        if cost < self.budget * self.up_ratio and self.level > 0:
+            self._set_level(self.level - 1)
+            return True
+        return False
+
+    def _set_level(self, level):
+        """切换等级并清空耗时样本"""
+        self.last_cost = self.mean_cost
+        self.level = level
+        self.frames_since_change = 0
+        self.samples.clear()
+        self.changes += 1
+
+    def report(self):
+        """生成当前状态文本，用于日志"""
+        return (f"画质等级 {self.level}/{self.max_level}（{self.level_name}），"
+                f"平均处理耗时 {(self.mean_cost or self.last_cost) * 1000:.1f} ms / 预算 {self.budget * 1000:.1f} ms，"
+                f"已调整 {self.changes}次")
@@ -0,0 +1,285 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+采集会话的录制与回放
+运行时把视频源读取到的原始帧（翻转之前）和采集时刻写入紧凑的会话文件，
+之后以回放视频源按原始节奏或尽快地重新提供给扫描效果，
+用于在没有摄像头的情况下以真实画面复现性能问题和做基准测试
+
+会话文件格式（小端序）:
+    文件头: 魔数 b"SCANSESS", 版本(uint16), 宽(uint32), 高(uint32), 帧率(float64)
+    每帧:   采集时刻(float64，相对第一帧的秒数), 标志(uint8，1表示zlib压缩), 数据长度(uint32), 数据
+"""
+
+import os
+import queue
+import struct
+import threading
+import time
+import zlib
+
+import cv2
+import numpy as np
+
+SESSION_MAGIC = b"SCANSESS"
+SESSION_VERSION = 1
+_HEADER = struct.Struct("<8sHIId")
+_RECORD = struct.Struct("<dBI")
+
+# 帧标志：数据经过zlib压缩
+FLAG_ZLIB = 1
+
+# 写入线程结束的标记
+_END = object()
+
+def is_session_file(path):
+    """判断文件是否为采集会话文件（按文件头的魔数）"""
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(SESSION_MAGIC)) == SESSION_MAGIC
+    except OSError:
+        return False
+
+class SessionRecorder:
+    """
+    采集会话录制器
+    write()在调用线程中只复制帧数据（输入帧之后可能被原地修改），
+    压缩和写盘在后台线程中进行，队列满时write()阻塞而不丢帧，保证回放与采集一致
+    """
+
+    def __init__(self, path, width, height, fps, compress_level=0, queue_size=8):
+        """
+        参数:
+            path: 会话文件路径
+            width, height: 帧大小
+            fps: 视频源报告的帧率
+            compress_level: zlib压缩级别（1-9），0表示不压缩；压缩后不变小的帧按原样保存
+            queue_size: 等待写入的最大帧数
+        """
+        self.path = path
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.compress_level = compress_level
+        self.frame_bytes = width * height * 3
+
+        self.frames = 0
+        self.bytes_written = _HEADER.size
+        self.first_timestamp = None
+        self.last_timestamp = None
+        self.error = None
+
+        self.file = open(path, "wb")
+        self.file.write(_HEADER.pack(SESSION_MAGIC, SESSION_VERSION, width, height, float(fps)))
+        self.queue = queue.Queue(maxsize=queue_size)
+        self._thread = threading.Thread(target=self._write_loop, name="session-recorder", daemon=True)
+        self._thread.start()
+
+    def write(self, frame, timestamp):
+        """
+        录制一帧
+
+        参数:
+            frame: 视频源读取到的BGR帧
+            timestamp: 采集时刻（time.perf_counter）
+        """
+        if self.error is not None:
+            raise RuntimeError(f"会话录制失败: {self.error}")
+        if frame.shape != (self.height, self.width, 3) or frame.dtype != np.uint8:
+            raise ValueError(f"帧大小{frame.shape[1]}x{frame.shape[0]}与会话大小{self.width}x{self.height}不一致")
+        if self.first_timestamp is None:
+            self.first_timestamp = timestamp
+        self.last_timestamp = timestamp
+        self.queue.put((timestamp - self.first_timestamp, frame.tobytes()))
+
+    def _write_loop(self):
+        while True:
+            item = self.queue.get()
+            if item is _END:
+                return
+            if self.error is not None:
+                continue
+            offset, payload = item
+            flags = 0
+            if self.compress_level > 0:
+                compressed = zlib.compress(payload, self.compress_level)
+                if len(compressed) < len(payload):
+                    payload, flags = compressed, FLAG_ZLIB
+            try:
+                self.file.write(_RECORD.pack(offset, flags, len(payload)))
+                self.file.write(payload)
+            except OSError as e:
+                self.error = e
+                continue
+            self.frames += 1
+            self.bytes_written += _RECORD.size + len(payload)
+
+    def close(self):
+        """等待写入线程完成并关闭文件"""
+        if self.file is None:
+            return
+        self.queue.put(_END)
+        self._thread.join()
+        self.file.close()
+        self.file = None
+
+    def report(self):
+        """生成录制统计文本"""
+        duration = (self.last_timestamp - self.first_timestamp) if self.first_timestamp is not None else 0.0
+        raw = self.frames * self.frame_bytes
+        ratio = raw / self.bytes_written if self.bytes_written else 0.0
+        fps = (self.frames - 1) / duration if duration > 0 else 0.0
+        return (f"会话录制: {self.frames}帧（{duration:.1f}秒，实际 {fps:.1f} fps）写入 {self.path}, "
+                f"{self.bytes_written / 1024 / 1024:.1f} MB（原始帧的1/{ratio:.1f}）")
+
+class ReplayCapture:
+    """
+    会话回放视频源
+    接口与cv2.VideoCapture兼容（read/grab/retrieve/set/get/isOpened/release）。
+    speed为1时按录制时的采集节奏提供帧（read()等到该帧的原始时刻），
+    大于1时按倍速，0表示不等待、尽快提供
+    """
+
+    # 落后于原始节奏超过该时间（秒，例如暂停后）时重新对齐时钟，不再连续追赶
+    MAX_LAG = 0.5
+
+    def __init__(self, path, speed=1.0):
+        """
+        打开会话文件并建立帧索引
+
+        参数:
+            path: 会话文件路径
+            speed: 回放速度倍数，0表示尽快回放
+        """
+        self.path = path
+        self.speed = speed
+        self.file = open(path, "rb")
+        header = self.file.read(_HEADER.size)
+        if len(header) < _HEADER.size:
+            raise ValueError(f"会话文件不完整: {path}")
+        magic, version, self.width, self.height, self.fps = _HEADER.unpack(header)
+        if magic != SESSION_MAGIC:
+            raise ValueError(f"不是采集会话文件: {path}")
+        if version != SESSION_VERSION:
+            raise ValueError(f"不支持的会话文件版本: {version}")
+
+        # 帧索引：(采集时刻, 标志, 数据长度, 数据偏移)
+        # 录制被中断（崩溃或强制结束）时最后一条记录可能不完整，只索引数据完整的帧
+        self.index = []
+        self.truncated_bytes = 0
+        file_size = os.fstat(self.file.fileno()).st_size
+        offset = _HEADER.size
+        while offset < file_size:
+            self.file.seek(offset)
+            head = self.file.read(_RECORD.size)
+            if len(head) == _RECORD.size:
+                timestamp, flags, length = _RECORD.unpack(head)
+            if len(head) < _RECORD.size or offset + _RECORD.size + length > file_size:
+                self.truncated_bytes = file_size - offset
+                print(f"警告: 会话文件末尾的记录不完整（{self.truncated_bytes}字节），已忽略: {path}")
+                break
+            offset += _RECORD.size + length
+            self.index.append((timestamp, flags, length, offset - length))
+
+        self.flipped = False  # 录制的是翻转之前的原始帧
+        self.position = 0
+        self.late_frames = 0
+        self._clock_start = None
+        self._grabbed = None
+
+    def _decode(self, position):
+        timestamp, flags, length, offset = self.index[position]
+        self.file.seek(offset)
+        payload = self.file.read(length)
+        if flags & FLAG_ZLIB:
+            payload = zlib.decompress(payload)
+        return np.frombuffer(payload, dtype=np.uint8).reshape(self.height, self.width, 3).copy()
+
+    def _wait_for(self, position):
+        """按原始节奏等到该帧的采集时刻"""
+        if self.speed <= 0:
+            return
+        target = self.index[position][0] / self.speed
+        now = time.perf_counter()
+        if self._clock_start is None:
+            self._clock_start = now - target
+            return
+        delay = self._clock_start + target - now
+        if delay > 0:
+            time.sleep(delay)
+        elif delay < -self.MAX_LAG:
+            self._clock_start = now - target
+            self.late_frames += 1
+        elif delay < 0:
+            self.late_frames += 1
+
+    def grab(self):
+        """等到下一帧的时刻并前进一帧，不解码"""
+        if self.file is None or self.position >= len(self.index):
+            self._grabbed = None
+            return False
+        self._wait_for(self.position)
+        self._grabbed = self.position
+        self.position += 1
+        return True
+
+    def retrieve(self):
+        """解码最近一次grab()的帧"""
+        if self._grabbed is None:
+            return False, None
+        return True, self._decode(self._grabbed)
+
+    def read(self):
+        """读取下一帧，到达末尾时返回(False, None)"""
+        if not self.grab():
+            return False, None
+        return self.retrieve()
+
+    def set(self, prop, value):
+        """设置属性，仅支持CAP_PROP_POS_FRAMES（定位后重新对齐回放时钟）"""
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            self.position = min(max(0, int(value)), len(self.index))
+            self._clock_start = None
+            return True
+        return False
+
+    def get(self, prop):
+        """读取属性"""
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self.width)
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self.height)
+        if prop == cv2.CAP_PROP_FPS:
+            return float(self.fps)
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return float(len(self.index))
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            return float(self.position)
+        if prop == cv2.CAP_PROP_POS_MSEC and 0 < self.position <= len(self.index):
+            return self.index[self.position - 1][0] * 1000
+        return 0.0
+
+    def isOpened(self):
+        return self.file is not None
+
+    @property
+    def duration(self):
+        """录制时长（秒）"""
+        return self.index[-1][0] if self.index else 0.0
+
+    def report(self):
+        """生成回放统计文本"""
+        mode = "尽快回放" if self.speed <= 0 else f"{self.speed:g}倍速"
+        text = f"会话回放: {self.path}, {len(self.index)}帧（{self.duration:.1f}秒），{mode}"
+        if self.speed > 0:
+            text += f"，落后于原始节奏 {self.late_frames}帧"
+        if self.truncated_bytes:
+            text += f"，忽略末尾不完整的记录 {self.truncated_bytes}字节"
+        return text
+
+    def release(self):
+        """关闭会话文件"""
+        if self.file is not None:
+            self.file.close()
+            self.file = None
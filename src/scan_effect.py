@@ -4,9 +4,21 @@
 import cv2
 import numpy as np
 import argparse
+import itertools
 import os
 import time
 from datetime import datetime
+from latency import LatencyMonitor, run_loopback_test
+from frame_cache import LoopingVideoCapture
+from disk_cache import RawFrameCache, DEFAULT_CACHE_DIR
+from slit_scan import SlitScanBuffer
+from sweep_map import SweepMap
+from pipeline import FramePipeline
+from telemetry import ScanTelemetry, create_metrics
+from memory_budget import SweptStaticStore, BufferLedger
+from writers import create_writer, add_writer_arguments, writer_options_from_args
+from recording import SessionRecorder, ReplayCapture, is_session_file
+from sinks import SinkHub, add_sink_arguments, create_sinks_from_args
 
 class ScanEffect:
     """
@@ -28,18 +40,78 @@ class ScanEffect:
         DIRECTION_BOTTOM_TO_TOP
     ]
     
-    def __init__(self, video_source=0, direction="left_to_right", speed=2, line_width=3, line_color=(0, 255, 0), display_size=(1280, 960), flip_image=False):
+    # 由扫描时刻图定义的非轴向扫描：任意角度、径向（圆形扩展）和自定义形状
+    DIRECTION_ANGLE = "angle"
+    DIRECTION_RADIAL = "radial"
+    DIRECTION_CUSTOM = "custom"
+    
+    SWEEP_MAP_DIRECTIONS = [
+        DIRECTION_ANGLE,
+        DIRECTION_RADIAL,
+        DIRECTION_CUSTOM
+    ]
+    
+    # 低延迟模式下，grab耗时低于该值（秒）说明取到的是缓冲区中的旧帧，继续丢弃
+    STALE_GRAB_SECONDS = 0.002
+    # 低延迟模式下每次读取最多丢弃的旧帧数
+    MAX_STALE_FRAMES = 4
+    
+    # 可在运行时通过configure修改的参数
+    CONFIGURABLE_PARAMS = (
+        "direction",
+        "speed",
+        "line_width",
+        "line_color",
+        "display_size",
+        "flip_image",
+        "slit_scan_fpp",
+        "scan_angle",
+        "idle_when_complete",
+        "feather_width"
+    )
+    
+    def __init__(self, video_source=0, direction="left_to_right", speed=2, line_width=3, line_color=(0, 255, 0), display_size=(1280, 960), flip_image=False,
+                 capture=None, first_frame=None, low_latency=False, capture_size=None,
+                 loop_cache_mb=0, loop_cache_encoded=False, disk_cache=None, slit_scan_fpp=0,
+                 scan_angle=0, sweep_map=None, idle_when_complete=True, metrics=None, memory_budget=False,
+                 session_record_path=None, session_compress_level=0, replay_speed=1.0, feather_width=0):
         """
         初始化扫描线效果类
         
         参数:
-            video_source: 视频源，可以是摄像头索引或视频文件路径
-            direction: 扫描方向，可选值：left_to_right, right_to_left, top_to_bottom, bottom_to_top
+            video_source: 视频源，可以是摄像头索引、视频文件路径或采集会话文件路径（回放录制的会话）
+            direction: 扫描方向，可选值：left_to_right, right_to_left, top_to_bottom, bottom_to_top,
+                       以及angle（任意角度）、radial（从中心向外扩展的圆）、custom（自定义扫描时刻图）
             speed: 扫描速度（像素/帧）
             line_width: 扫描线宽度（像素）
             line_color: 扫描线颜色，RGB元组
             display_size: 显示窗口大小，(宽, 高)元组
             flip_image: 是否水平翻转图像（适用于摄像头）
+            capture: 已打开的视频捕获对象（可选），传入时与调用方共享，不会在退出时释放
+            first_frame: 初始静态帧（可选，需已按flip_image翻转），传入时不再从视频源读取第一帧；
+                         若未同时传入capture，则不打开任何视频源，由调用方逐帧提供画面
+            low_latency: 是否启用低延迟模式（摄像头）：协商MJPG格式和最小缓冲区，
+                         读取时丢弃缓冲区中的旧帧，始终处理最新一帧
+            capture_size: 向摄像头请求的采集分辨率，(宽, 高)元组（可选）
+            loop_cache_mb: 循环播放视频文件时的内存帧缓存预算（MB），0表示不缓存
+            loop_cache_encoded: 帧缓存是否以压缩后的编码缓冲区存储（更省内存，由后台线程解码）
+            disk_cache: RawFrameCache实例（可选），视频文件解码一次后写入磁盘，之后以内存映射读取
+            slit_scan_fpp: 狭缝扫描模式的延迟（帧/像素），大于0时扫过的区域不再定格，
+                           而是每列（或行）显示按到起始边距离延迟的历史画面
+            scan_angle: angle方向的扫描前进角度（度），0为从左到右，90为从上到下
+            sweep_map: custom方向的逐像素扫描时刻图，(高, 宽)数组，单位为像素距离
+            idle_when_complete: 扫描完成后是否进入空闲模式：停止读取视频源，复用最终画面，
+                                只重新绘制随时间变化的部分，重置后恢复
+            metrics: MetricsRegistry实例（可选），运行时记录帧率、各阶段耗时和读取失败等指标
+            memory_budget: 内存预算模式（适用于4K/8K视频源）：静态帧只保存已扫过的范围，
+                           合成直接写入输入帧（输入帧会被修改，只读帧除外），特效按条带原地处理，
+                           同时存在的整帧缓冲区不超过2个（静态帧存储和工作帧），退出时打印缓冲区峰值报告；
+                           狭缝扫描和非轴向扫描仍使用完整的静态帧；暂停时画面保持不变
+            session_record_path: 采集会话文件路径（可选），运行时把读取到的原始帧（翻转之前）和采集时刻写入该文件
+            session_compress_level: 会话录制的zlib压缩级别（1-9），0表示不压缩
+            replay_speed: 回放采集会话的速度倍数，1为原始节奏，0表示尽快回放
+            feather_width: 静态与动态画面边界的羽化宽度（像素），0表示硬边界；
+                           只在边界已扫过一侧的过渡带内混合（轴向扫描，扫描完成后不再羽化）
         """
         # 基本参数
         self.video_source = video_source
@@ -49,53 +121,324 @@ class ScanEffect:
         self.line_color = line_color
         self.display_size = display_size
         self.flip_image = flip_image
+        self.capture = capture
+        self.first_frame = first_frame
+        self.low_latency = low_latency
+        self.capture_size = capture_size
+        self.loop_cache_mb = loop_cache_mb
+        self.loop_cache_encoded = loop_cache_encoded
+        self.disk_cache = disk_cache
+        self.slit_scan_fpp = slit_scan_fpp
+        self.scan_angle = scan_angle
+        self.sweep_map = sweep_map
+        self.idle_when_complete = idle_when_complete
+        self.metrics = metrics
+        self.telemetry = ScanTelemetry.of(metrics) if metrics is not None else None
+        self.memory_budget = memory_budget
+        self.session_record_path = session_record_path
+        self.session_compress_level = session_compress_level
+        self.replay_speed = replay_speed
+        self.feather_width = feather_width
+        
+        # 羽化过渡带的一维权重（按羽化宽度缓存）
+        self._feather_ramp = None
+        
+        # 扫描完成后缓存的空闲画面
+        self._idle_cache = None
+        
+        # 暂停时缓存的画面：扫描线之下的合成与特效层、对应的输入帧，以及扫描线不变时的最终画面
+        self._pause_layer = None
+        self._pause_source = None
+        self._pause_frame = None
+        
+        # 内存预算模式的静态帧存储、缓冲区账本和已原地合成的输入帧
+        self.static_store = None
+        self.buffer_ledger = None
+        self._consumed_frame = None
+        
+        # 延迟统计
+        self.latency_monitor = LatencyMonitor()
+        self.frame_timestamp = None  # 当前帧的采集时刻（time.perf_counter）
+        self.capture_info = {}
         
         # 状态变量
         self.paused = False
         self.running = True
+        self.first_display_time = None  # 首帧显示时刻（time.perf_counter），用于启动耗时统计
         
         # 初始化视频捕获
         self._init_video_capture()
         
+        # 初始化采集会话录制（在读取第一帧之前，回放时第一帧同为初始静态帧）
+        self.session_recorder = None
+        if self.session_record_path and self.cap is not None:
+            self.session_recorder = SessionRecorder(self.session_record_path, self.width, self.height, self.fps,
+                                                    compress_level=self.session_compress_level)
+        
+        # 初始化非轴向扫描的扫描时刻图
+        self._init_sweep()
+        
         # 初始化扫描线位置
         self.scan_position = 0
         self.reset_scan_line()
         
         # 初始化静态帧
         self._init_static_frame()
+        
+        # 初始化狭缝扫描缓冲区
+        self._init_slit_scan()
+        
+        # 内存预算模式下选择静态帧的存储方式
+        if self.memory_budget:
+            self.buffer_ledger = BufferLedger(self.width * self.height * 3)
+            self._init_static_storage()
     
     def _init_video_capture(self):
         """初始化视频捕获"""
-        self.cap = cv2.VideoCapture(self.video_source)
-        if not self.cap.isOpened():
-            raise ValueError(f"无法打开视频源: {self.video_source}")
+        if self.capture is not None:
+            # 共享调用方的视频捕获对象
+            self.cap = self.capture
+            self.owns_capture = False
+        elif self.first_frame is not None:
+            # 由调用方逐帧提供画面，不打开视频源
+            self.cap = None
+            self.owns_capture = False
+        elif isinstance(self.video_source, str) and is_session_file(self.video_source):
+            # 采集会话文件：回放录制的原始帧
+            self.cap = ReplayCapture(self.video_source, speed=self.replay_speed)
+            self.owns_capture = True
+        elif isinstance(self.video_source, str) and self.disk_cache is not None:
+            # 视频文件：从磁盘原始帧缓存以内存映射读取（首次使用时解码写入）
+            self.cap = self.disk_cache.open(self.video_source, self.flip_image)
+            if not self.cap.isOpened():
+                raise ValueError(f"无法打开视频源: {self.video_source}")
+            self.owns_capture = True
+        elif isinstance(self.video_source, str) and self.loop_cache_mb > 0:
+            # 循环播放的视频文件：第一遍解码的帧缓存在内存中
+            self.cap = LoopingVideoCapture(self.video_source, budget_mb=self.loop_cache_mb,
+                                           encoded=self.loop_cache_encoded)
+            if not self.cap.isOpened():
+                raise ValueError(f"无法打开视频源: {self.video_source}")
+            self.owns_capture = True
+        else:
+            self.cap = cv2.VideoCapture(self.video_source)
+            if not self.cap.isOpened():
+                raise ValueError(f"无法打开视频源: {self.video_source}")
+            self.owns_capture = True
+        
+        if self.cap is not None and not isinstance(self.video_source, str):
+            self._negotiate_capture()
         
         # 获取视频属性
-        self.width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-        self.height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-        self.fps = self.cap.get(cv2.CAP_PROP_FPS)
+        if self.first_frame is not None:
+            self.height, self.width = self.first_frame.shape[:2]
+        else:
+            self.width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+            self.height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) if self.cap is not None else 0
         if self.fps <= 0:
             self.fps = 30  # 如果无法获取帧率，使用默认值
         
-        # 计算缩放比例
+        self._init_display_scale()
+    
+    def _negotiate_capture(self):
+        """向摄像头请求采集格式、分辨率和缓冲区大小，并记录驱动实际接受的值"""
+        if self.capture_size is not None:
+            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.capture_size[0])
+            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.capture_size[1])
+        
+        if self.low_latency:
+            # MJPG可在USB带宽内提供更高帧率，缓冲区设为1避免排队延迟
+            self.cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*"MJPG"))
+            self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        
+        fourcc = int(self.cap.get(cv2.CAP_PROP_FOURCC))
+        self.capture_info = {
+            "fourcc": "".join(chr((fourcc >> (8 * i)) & 0xFF) for i in range(4)) if fourcc > 0 else "",
+            "size": (int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))),
+            "buffer_size": int(self.cap.get(cv2.CAP_PROP_BUFFERSIZE)),
+            "fps": self.cap.get(cv2.CAP_PROP_FPS),
+        }
+        if self.low_latency:
+            print(f"采集协商结果: 格式 {self.capture_info['fourcc'] or '未知'}, "
+                  f"分辨率 {self.capture_info['size'][0]}x{self.capture_info['size'][1]}, "
+                  f"缓冲区 {self.capture_info['buffer_size']}, 帧率 {self.capture_info['fps']:.1f}")
+    
+    def _init_display_scale(self):
+        """根据显示窗口大小计算缩放比例"""
         self.scale_factor = min(self.display_size[0] / self.width, self.display_size[1] / self.height)
         self.scaled_width = int(self.width * self.scale_factor)
         self.scaled_height = int(self.height * self.scale_factor)
     
     def _init_static_frame(self):
         """初始化静态帧"""
-        ret, frame = self.cap.read()
+        if self.memory_budget:
+            # 未扫过的区域不会显示，内存预算模式不保存初始静态帧，存储方式由_init_static_storage决定
+            self.static_frame = None
+            return
+        
+        if self.first_frame is not None:
+            # 复制一份，调用方的帧保持只读
+            self.static_frame = self.first_frame.copy()
+            return
+        
+        ret, frame = self._read_frame()
         if not ret:
             raise ValueError("无法读取第一帧")
         
-        # 如果需要，水平翻转图像
-        if self.flip_image:
+        self._seed_static_frame(frame)
+    
+    def _seed_static_frame(self, frame):
+        """以读取到的帧作为静态帧，帧来自只读缓存时复制一份"""
+        if self.static_store is not None:
+            self.static_store.clear()
+            return
+        self.static_frame = frame if frame.flags.writeable else frame.copy()
+    
+    def _init_static_storage(self):
+        """
+        内存预算模式下选择静态帧的存储方式：轴向扫描只按块保存已扫过的范围；
+        狭缝扫描和非轴向扫描需要完整的静态帧（未扫过的部分不会显示，初始为0）
+        """
+        if self.sweep is None and self.slit_scan is None:
+            self.static_store = SweptStaticStore(self.width, self.height, self.is_horizontal_direction())
+            self.static_frame = None
+        else:
+            self.static_store = None
+            if self.static_frame is None:
+                self.static_frame = np.zeros((self.height, self.width, 3), dtype=np.uint8)
+    
+    def _check_scan_mode(self, direction, slit_scan_fpp):
+        """检查扫描方向与狭缝扫描、扫描时刻图的组合是否可用，不可用时抛出ValueError"""
+        if direction == self.DIRECTION_CUSTOM and (
+                self.sweep_map is None or tuple(np.shape(self.sweep_map)) != (self.height, self.width)):
+            raise ValueError("custom扫描方向需要与帧大小相同的扫描时刻图(sweep_map)")
+        if slit_scan_fpp > 0 and direction in self.SWEEP_MAP_DIRECTIONS:
+            raise ValueError("狭缝扫描模式只支持四个轴向扫描方向")
+    
+    def _init_sweep(self):
+        """为非轴向扫描方向创建扫描时刻图（只在初始化或方向变化时计算一次）"""
+        self._check_scan_mode(self.direction, self.slit_scan_fpp)
+        self.sweep = None
+        if self.direction == self.DIRECTION_ANGLE:
+            self.sweep = SweepMap.angled(self.width, self.height, self.scan_angle)
+        elif self.direction == self.DIRECTION_RADIAL:
+            self.sweep = SweepMap.radial(self.width, self.height)
+        elif self.direction == self.DIRECTION_CUSTOM:
+            self.sweep = SweepMap(self.sweep_map)
+    
+    def _init_slit_scan(self):
+        """根据扫描方向和延迟参数创建狭缝扫描缓冲区"""
+        self._check_scan_mode(self.direction, self.slit_scan_fpp)
+        self.slit_scan = None
+        if self.slit_scan_fpp > 0:
+            self.slit_scan = SlitScanBuffer(
+                self.width, self.height,
+                horizontal=self.is_horizontal_direction(),
+                forward=self.is_forward_direction(),
+                frames_per_pixel=self.slit_scan_fpp
+            )
+    
+    def _read_latest_frame(self):
+        """
+        低延迟读取：grab与retrieve分离，丢弃缓冲区中已排队的旧帧，只解码最新一帧
+        grab发生了等待说明得到的是刚采集的新帧，立即解码；立即返回说明缓冲区中还有排队的帧，继续丢弃
+        """
+        for index in range(self.MAX_STALE_FRAMES + 1):
+            t0 = time.perf_counter()
+            if not self.cap.grab():
+                if index == 0:
+                    return False, None
+                # 已grab到的帧仍然可以解码
+                break
+            if index > 0 and self.telemetry is not None:
+                # 上一次grab的帧被丢弃
+                self.telemetry.dropped.inc()
+            if time.perf_counter() - t0 > self.STALE_GRAB_SECONDS:
+                break
+        
+        self.frame_timestamp = time.perf_counter()
+        return self.cap.retrieve()
+    
+    def _read_frame(self):
+        """从视频源读取一帧，视频文件到达末尾时从头循环，并按需水平翻转"""
+        if self.low_latency and not isinstance(self.video_source, str):
+            ret, frame = self._read_latest_frame()
+        else:
+            ret, frame = self.cap.read()
+            self.frame_timestamp = time.perf_counter()
+        if not ret and isinstance(self.video_source, str):
+            # 如果是视频文件，则循环播放
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.cap.read()
+            if self.telemetry is not None:
+                self.telemetry.loop_restarts.inc()
+        if not ret and self.telemetry is not None:
+            self.telemetry.read_failures.inc()
+        if ret and self.session_recorder is not None:
+            self.session_recorder.write(frame, self.frame_timestamp)
+        
+        # 如果需要，水平翻转图像（磁盘缓存中的帧可能已经翻转）
+        if ret and self.flip_image != getattr(self.cap, "flipped", False):
             frame = cv2.flip(frame, 1)
         
-        self.static_frame = frame
+        return ret, frame
+    
+    def configure(self, **params):
+        """
+        运行时修改参数，仅在参数确实变化时重建派生状态
+        
+        参数:
+            **params: CONFIGURABLE_PARAMS中列出的参数
+        
+        返回:
+            实际发生变化的参数字典
+        """
+        unknown = [name for name in params if name not in self.CONFIGURABLE_PARAMS]
+        if unknown:
+            raise ValueError(f"不支持在运行时修改的参数: {', '.join(unknown)}")
+        
+        if "direction" in params and params["direction"] not in self.SUPPORTED_DIRECTIONS + self.SWEEP_MAP_DIRECTIONS:
+            raise ValueError(f"不支持的扫描方向: {params['direction']}")
+        # 在修改任何属性之前检查组合，拒绝的修改不会留下部分更新的状态
+        self._check_scan_mode(params.get("direction", self.direction),
+                              params.get("slit_scan_fpp", self.slit_scan_fpp))
+        
+        changed = {name: value for name, value in params.items() if getattr(self, name) != value}
+        for name, value in changed.items():
+            setattr(self, name, value)
+        
+        if changed:
+            self._on_params_changed(changed)
+        return changed
+    
+    def _on_params_changed(self, changed):
+        """参数变化后重建相关的派生状态"""
+        # 任何参数变化都可能改变最终画面
+        self._idle_cache = None
+        self._pause_layer = None
+        if "direction" in changed or "scan_angle" in changed:
+            self._init_sweep()
+            self.reset_scan_line()
+        if "display_size" in changed:
+            self._init_display_scale()
+        if "direction" in changed or "slit_scan_fpp" in changed:
+            self._init_slit_scan()
+            if self.memory_budget:
+                self._init_static_storage()
+    
+    def restart_scan(self):
+        """重置扫描线，并以视频源的最新一帧重新初始化静态帧"""
+        self.reset_scan_line()
+        if self.cap is None:
+            return
+        ret, frame = self._read_frame()
+        if ret:
+            self._seed_static_frame(frame)
     
     def reset_scan_line(self):
         """重置扫描线位置到初始位置"""
+        self._pause_layer = None
         if self.direction == self.DIRECTION_LEFT_TO_RIGHT:
             self.scan_position = 0
         elif self.direction == self.DIRECTION_RIGHT_TO_LEFT:
@@ -104,8 +447,14 @@ class ScanEffect:
             self.scan_position = 0
         elif self.direction == self.DIRECTION_BOTTOM_TO_TOP:
             self.scan_position = self.height
+        elif self.direction in self.SWEEP_MAP_DIRECTIONS:
+            self.scan_position = 0
         else:
             raise ValueError(f"不支持的扫描方向: {self.direction}")
+        
+        if self.static_store is not None:
+            # 扫过的范围回到空，释放静态帧存储
+            self.static_store.clear()
     
     def update_scan_position(self):
         """更新扫描线位置"""
@@ -128,10 +477,18 @@ class ScanEffect:
             self.scan_position -= self.speed
             if self.scan_position < 0:
                 self.scan_position = 0
+        elif self.sweep is not None:
+            self.scan_position += self.speed
+            if self.scan_position > self.sweep.length:
+                self.scan_position = self.sweep.length
     
     def draw_scan_line(self, frame):
         """在帧上绘制扫描线"""
-        if self.is_horizontal_direction():
+        if self.sweep is not None:
+            # 非轴向扫描：绘制扫描前沿（斜线、圆或自定义轮廓）
+            if self.scan_position < self.sweep.length:
+                self.sweep.draw_front(frame, self.scan_position, self.line_color, self.line_width)
+        elif self.is_horizontal_direction():
             cv2.line(frame, 
                     (self.scan_position, 0), 
                     (self.scan_position, self.height), 
@@ -148,12 +505,62 @@ class ScanEffect:
         """判断是否为水平方向的扫描"""
         return self.direction in [self.DIRECTION_LEFT_TO_RIGHT, self.DIRECTION_RIGHT_TO_LEFT]
     
+    def is_scan_complete(self):
+        """扫描是否已完成（整帧均为静态帧）；狭缝扫描的画面持续变化，不会完成"""
+        if self.slit_scan is not None:
+            return False
+        if self.sweep is not None:
+            return self.scan_position >= self.sweep.length
+        if self.is_forward_direction():
+            length = self.width if self.is_horizontal_direction() else self.height
+            return self.scan_position >= length
+        return self.scan_position <= 0
+    
+    def is_idle(self):
+        """是否处于扫描完成后的空闲模式"""
+        return self.idle_when_complete and self.is_scan_complete()
+    
     def is_forward_direction(self):
         """判断是否为正向扫描（从左到右或从上到下）"""
         return self.direction in [self.DIRECTION_LEFT_TO_RIGHT, self.DIRECTION_TOP_TO_BOTTOM]
     
+    def _swept_extent(self, position):
+        """轴向扫描在扫描位置处已扫过的范围，沿扫描轴的[起点, 终点)"""
+        length = self.width if self.is_horizontal_direction() else self.height
+        valid_pos = int(min(max(0, position), length))
+        return (0, valid_pos) if self.is_forward_direction() else (valid_pos, length)
+    
     def update_static_frame(self, current_frame, position, speed):
         """更新静态帧中扫描线扫过的区域"""
+        if self.slit_scan is not None:
+            # 狭缝扫描模式：扫过的区域由时间位移后的历史画面组成
+            self.slit_scan.push(current_frame)
+            length = self.width if self.is_horizontal_direction() else self.height
+            valid_pos = int(min(max(0, position), length))
+            if self.is_forward_direction():
+                self.slit_scan.render(self.static_frame, 0, valid_pos)
+            else:
+                self.slit_scan.render(self.static_frame, valid_pos, length)
+            return
+        
+        if self.sweep is not None:
+            # 非轴向扫描：只复制本帧新扫过的像素带
+            self.sweep.update_static(self.static_frame, current_frame, position, speed)
+            return
+        
+        if self.static_store is not None:
+            # 内存预算模式：本帧新扫过的条带写入按块分配的存储
+            # 反向扫描在起始位置也写入：完整静态帧时起始边的条带保留初始静态帧的内容，
+            # 这里不保存初始静态帧，改为取扫描开始时的当前帧
+            length = self.width if self.is_horizontal_direction() else self.height
+            if self.is_forward_direction():
+                start, end = (position, min(position + speed, length)) if 0 <= position < length else (0, 0)
+            else:
+                start, end = (max(position - speed, 0), position) if 0 < position <= length else (0, 0)
+            if end > start:
+                self.static_store.write(current_frame, start, end)
+            return
+        
         if self.is_horizontal_direction():
             # 水平方向（左右）
             if self.is_forward_direction():
@@ -185,6 +592,24 @@ class ScanEffect:
     
     def apply_scan_effect(self, current_frame, position):
         """应用扫描效果，将静态帧和当前帧合并"""
+        if self.sweep is not None:
+            # 非轴向扫描：按已扫过掩码合并
+            return self.sweep.composite(self.static_frame, current_frame, position)
+        
+        if self.static_store is not None:
+            # 内存预算模式：已扫过的范围直接写入输入帧（只读帧复制一份作为工作帧）
+            result = current_frame if current_frame.flags.writeable else current_frame.copy()
+            # 原地合成会覆盖过渡带内的当前画面，先复制这一小段
+            live_band = self._feather_band(current_frame, position)
+            if live_band is not None:
+                live_band = live_band.copy()
+            start, end = self._swept_extent(position)
+            if end > start:
+                self.static_store.read(result, start, end)
+            if live_band is not None:
+                self._blend_feather(self._feather_band(result, position), live_band)
+            return result
+        
         result = current_frame.copy()
         
         if self.direction == self.DIRECTION_LEFT_TO_RIGHT:
@@ -211,8 +636,51 @@ class ScanEffect:
             if valid_pos < self.height:
                 result[valid_pos:, :] = self.static_frame[valid_pos:, :]
         
+        # 羽化：只在边界处的过渡带内与当前帧混合，其余部分保持切片复制
+        band = self._feather_band(result, position)
+        if band is not None:
+            self._blend_feather(band, self._feather_band(current_frame, position))
+        
         return result
     
+    def _feather_band(self, array, position):
+        """
+        羽化过渡带：扫描边界已扫过一侧feather_width个像素的视图（沿扫描轴统一为向边界前进），
+        未启用羽化、非轴向扫描、尚未扫过或扫描已完成时返回None
+        """
+        if self.feather_width <= 0 or self.sweep is not None:
+            return None
+        length = self.width if self.is_horizontal_direction() else self.height
+        valid_pos = int(min(max(0, position), length))
+        edge = valid_pos if self.is_forward_direction() else length - valid_pos
+        if edge >= length:
+            return None
+        n = min(self.feather_width, edge)
+        if n <= 0:
+            return None
+        return self._scan_axis_view(array)[..., edge - n:edge, :]
+    
+    def _get_feather_ramp(self):
+        """
+        羽化过渡带的一维权重（静态画面权重, 当前画面权重），形状为(羽化宽度, 1)的uint16，和为256；
+        静态画面的权重从远离边界处接近1线性降到边界处接近0（仅在羽化宽度变化时重建）
+        """
+        width = self.feather_width
+        if self._feather_ramp is None or len(self._feather_ramp[0]) != width:
+            distance = np.arange(width, 0, -1, dtype=np.float32)
+            weights = np.rint(distance / (width + 1) * 256).astype(np.uint16).reshape(-1, 1)
+            self._feather_ramp = (weights, 256 - weights)
+        return self._feather_ramp
+    
+    def _blend_feather(self, band, live_band):
+        """将过渡带内的静态画面（band，原地修改）按一维权重与当前画面混合，权重沿扫描轴广播"""
+        weights, inverse = self._get_feather_ramp()
+        n = band.shape[-2]
+        blended = band * weights[-n:]
+        blended += live_band * inverse[-n:]
+        blended >>= 8
+        band[...] = blended
+    
     def create_scan_effect(self, current_frame):
         """创建扫描效果"""
         # 更新静态帧中扫描线扫过的区域为当前帧的内容
@@ -221,11 +689,22 @@ class ScanEffect:
         # 应用扫描效果
         result = self.apply_scan_effect(current_frame, self.scan_position)
         
-        # 绘制扫描线
+        return self._render_overlays(result)
+    
+    def _render_effects(self, result):
+        """在合成结果上应用特效（子类实现），返回扫描线之下的画面"""
+        return result
+    
+    def _render_overlays(self, result):
+        """在合成结果上应用特效并绘制扫描线，返回最终帧"""
+        result = self._render_effects(result)
         self.draw_scan_line(result)
-        
         return result
     
+    def _has_animated_overlays(self):
+        """扫描线是否随时间变化（子类的动画扫描线），不变时暂停画面可以整帧复用"""
+        return False
+    
     def save_frame(self, frame):
         """保存当前帧为图片"""
         if not os.path.exists("output"):
@@ -237,7 +716,10 @@ class ScanEffect:
     
     def resize_frame(self, frame):
         """调整帧大小以适应显示窗口"""
-        return cv2.resize(frame, (self.scaled_width, self.scaled_height))
+        display_frame = cv2.resize(frame, (self.scaled_width, self.scaled_height))
+        if self.buffer_ledger is not None:
+            self.buffer_ledger.record("显示帧", display_frame.nbytes)
+        return display_frame
     
     def process_key_event(self, key):
         """处理键盘事件"""
@@ -246,61 +728,377 @@ class ScanEffect:
         elif key == 32:  # 空格键
             self.paused = not self.paused
         elif key == ord('r'):  # r键
-            self.reset_scan_line()
-            ret, self.static_frame = self.cap.read()
-            if self.flip_image and ret:
-                self.static_frame = cv2.flip(self.static_frame, 1)
+            self.restart_scan()
         elif key == ord('s'):  # s键
             self.save_frame(self.current_result_frame)
         elif key == ord('f'):  # f键
             self.flip_image = not self.flip_image
             print(f"图像翻转: {'开启' if self.flip_image else '关闭'}")
+        elif key == ord('l'):  # l键
+            print(self.latency_monitor.report())
+    
+    def process_frames(self, frames):
+        """
+        逐帧生成扫描效果（库接口，不依赖显示窗口和键盘）
+        按需从frames中取帧，每取一帧生成一帧合成结果，扫描状态保存在对象中，
+        可以与调用方自己的读取器和写入器串联，不额外复制帧，也不创建线程
+        
+        参数:
+            frames: 任意帧的可迭代对象（需与静态帧大小相同，已按需翻转）
+        
+        生成:
+            合成后的帧，通常每帧为新的数组，调用方可以直接修改或保存；
+            扫描完成后的空闲模式下画面不变时重复返回同一个只读数组
+        """
+        for frame in frames:
+            yield self.process_frame(frame)
+    
+    def process_frame(self, frame):
+        """
+        处理一帧并推进扫描位置
+        空闲模式下不使用frame，画面不变时返回缓存的同一个只读数组
+        """
+        start = time.perf_counter()
+        if self.is_idle():
+            result = self._render_idle_frame()
+        elif self.paused and frame is self._consumed_frame:
+            # 内存预算模式下输入帧已原地合成为上一次的结果，暂停时视频源重复提供同一帧，直接返回
+            result = frame
+        elif self.paused and not self.memory_budget:
+            result = self._render_paused_frame(frame)
+        else:
+            self._idle_cache = None
+            self._pause_layer = None
+            result = self.create_scan_effect(frame)
+            if self.memory_budget:
+                self._consumed_frame = frame if result is frame else None
+        
+        # 更新扫描线位置（暂停时保持不变）
+        self.update_scan_position()
+        if self.buffer_ledger is not None:
+            self._record_buffers(result)
+        if self.telemetry is not None:
+            self.telemetry.observe_stage("process", start)
+        return result
+    
+    def _record_buffers(self, result):
+        """内存预算模式：在缓冲区账本中记录本帧的整帧缓冲区占用"""
+        ledger = self.buffer_ledger
+        store = self.static_store if self.static_store is not None else self.static_frame
+        ledger.record("静态帧存储", store.nbytes)
+        ledger.record("工作帧", 0 if result is self._idle_cache else result.nbytes)
+        ledger.record("空闲画面缓存", self._idle_cache.nbytes if self._idle_cache is not None else 0)
+        if self.slit_scan is not None:
+            ledger.record("狭缝扫描缓冲区", self.slit_scan.memory_bytes)
+    
+    def _copy_static_frame(self):
+        """静态帧的完整副本；内存预算模式下由已扫过的范围拼出，未扫过的部分为0"""
+        if self.static_store is None:
+            return self.static_frame.copy()
+        frame = np.zeros((self.height, self.width, 3), dtype=np.uint8)
+        start, end = self._swept_extent(self.scan_position)
+        if end > start:
+            self.static_store.read(frame, start, end)
+        return frame
+    
+    def _render_paused_frame(self, frame):
+        """
+        暂停时的画面：同一输入帧的合成与特效只计算一次，作为扫描线之下的图层缓存；
+        扫描线不变时整帧缓存并返回同一个只读数组（无需重新缩放和显示），
+        否则每帧在图层副本上只重新绘制动画扫描线
+        """
+        if self._pause_layer is None or frame is not self._pause_source:
+            self.update_static_frame(frame, self.scan_position, self.speed)
+            layer = self._render_effects(self.apply_scan_effect(frame, self.scan_position))
+            layer.flags.writeable = False
+            self._pause_layer = layer
+            self._pause_source = frame
+            self._pause_frame = None
+        
+        if self._has_animated_overlays():
+            result = self._pause_layer.copy()
+            self.draw_scan_line(result)
+            return result
+        
+        if self._pause_frame is None:
+            result = self._pause_layer.copy()
+            self.draw_scan_line(result)
+            result.flags.writeable = False
+            self._pause_frame = result
+        return self._pause_frame
+    
+    def _render_idle_frame(self):
+        """扫描完成后的画面：合成结果就是静态帧，只在进入空闲模式时合成并绘制一次"""
+        if self._idle_cache is None:
+            frame = self._render_overlays(self._copy_static_frame())
+            frame.flags.writeable = False
+            self._idle_cache = frame
+        return self._idle_cache
+    
+    def get_scan_state(self):
+        """返回当前扫描状态（扫描位置和静态帧的副本），可传给process_batch或set_scan_state"""
+        return {"scan_position": self.scan_position, "static_frame": self._copy_static_frame()}
     
-    def run(self):
-        """运行扫描效果"""
+    def set_scan_state(self, state):
+        """恢复get_scan_state返回的扫描状态"""
+        self.scan_position = state["scan_position"]
+        self._pause_layer = None
+        if self.static_store is not None:
+            # 内存预算模式只保存已扫过的范围
+            self.static_store.clear()
+            start, end = self._swept_extent(self.scan_position)
+            if end > start:
+                self.static_store.write(np.asarray(state["static_frame"], dtype=np.uint8), start, end)
+            return
+        self.static_frame = np.array(state["static_frame"], dtype=np.uint8, copy=True)
+    
+    def process_batch(self, frames, state=None, out=None):
+        """
+        批量生成一组帧的扫描效果
+        轴向扫描时由已知的扫描位置序列一次性算出各帧写入静态帧的条带，
+        用一次索引拼出整组帧之后的静态帧，再按各帧的扫描位置合成；
+        非轴向扫描、狭缝扫描、内存预算模式和暂停时逐帧处理
+        
+        参数:
+            frames: (N, 高, 宽, 3)的uint8数组
+            state: 起始扫描状态（可选），默认从对象当前状态继续
+            out: 与frames形状相同的输出数组（可选），处理多组帧时可重复使用，避免每组重新分配
+        
+        返回:
+            (合成后的(N, 高, 宽, 3)数组, 更新后的扫描状态)
+        """
+        if state is not None:
+            self.set_scan_state(state)
+        frames = np.asarray(frames)
+        if frames.ndim != 4 or frames.shape[1:] != (self.height, self.width, 3):
+            raise ValueError(f"帧数组形状应为(N, {self.height}, {self.width}, 3)")
+        
+        results = np.empty_like(frames) if out is None else out
+        if results.shape != frames.shape:
+            raise ValueError("输出数组形状应与帧数组相同")
+        if (self.sweep is not None or self.slit_scan is not None or self.static_store is not None
+                or self.paused or self.speed <= 0):
+            for i, result in enumerate(self.process_frames(frames)):
+                results[i] = result
+            return results, self.get_scan_state()
+        
+        self._composite_batch(frames, results)
+        
+        # 扫描线和特效依赖逐帧的扫描位置和动画状态，逐帧绘制
+        for i in range(len(frames)):
+            view = results[i]
+            result = self._render_overlays(view)
+            if result is not view:
+                view[...] = result
+            self.update_scan_position()
+        
+        return results, self.get_scan_state()
+    
+    def _scan_axis_view(self, array):
+        """
+        返回把扫描方向统一为"沿倒数第二轴从0向末尾前进"的视图
+        垂直方向交换行列，反向扫描翻转该轴，对视图的写入会反映到原数组
+        """
+        if not self.is_horizontal_direction():
+            array = np.swapaxes(array, -3, -2)
+        if not self.is_forward_direction():
+            array = array[..., ::-1, :]
+        return array
+    
+    def _composite_batch(self, frames, results):
+        """轴向扫描的批量合成：拼出静态帧的演变并写入各帧的合成结果"""
+        n = len(frames)
+        length = self.width if self.is_horizontal_direction() else self.height
+        forward = self.is_forward_direction()
+        
+        # 统一坐标下的扫描位置序列：每帧前进speed，到达末尾后停止
+        start = self.scan_position if forward else length - self.scan_position
+        positions = np.minimum(start + self.speed * np.arange(n), length)
+        
+        # 每帧写入静态帧的条带为[位置, 位置+speed)；反向扫描在起始位置不写入（与update_static_frame一致）
+        writes = positions < length
+        if not forward:
+            writes &= positions > 0
+        
+        # 每列（或行）由哪一帧写入：条带互不重叠，列c属于第(c-start)//speed帧
+        cols = np.arange(max(start, 0), min(start + self.speed * n, length))
+        owners = (cols - start) // self.speed
+        owned = writes[owners]
+        cols, owners = cols[owned], owners[owned]
+        
+        frames_view = self._scan_axis_view(frames)
+        static = self.static_frame.copy()
+        static_view = self._scan_axis_view(static)
+        if len(cols):
+            static_view[:, cols] = frames_view[owners, :, cols].transpose(1, 0, 2)
+        
+        # 第i帧中位置之前的部分取静态帧（这些列不会被之后的帧写入），其余取当前帧
+        results_view = self._scan_axis_view(results)
+        feather = max(self.feather_width, 0)
+        for i, position in enumerate(positions):
+            results_view[i, :, :position] = static_view[:, :position]
+            results_view[i, :, position:] = frames_view[i, :, position:]
+            n = min(feather, position) if position < length else 0
+            if n > 0:
+                self._blend_feather(results_view[i, :, position - n:position],
+                                    frames_view[i, :, position - n:position])
+        
+        self.static_frame = static
+    
+    def _capture_frames(self):
+        """
+        从视频源读取帧的生成器，暂停或空闲时不读取视频源，重复提供最后一帧；
+        视频源结束或停止运行时结束
+        """
+        frame = None
+        while self.running:
+            if frame is None or not (self.paused or self.is_idle()):
+                start = time.perf_counter()
+                ret, frame = self._read_frame()
+                if self.telemetry is not None:
+                    self.telemetry.observe_stage("capture", start)
+                if not ret:
+                    return
+            yield frame
+    
+    def run(self, sinks=None):
+        """
+        运行扫描效果（显示窗口和键盘处理，扫描效果由process_frames生成）
+        
+        参数:
+            sinks: FrameSink列表（可选），合成结果同时分发给这些输出，各输出在自己的线程中处理
+        """
         window_name = "扫描线效果"
         cv2.namedWindow(window_name, cv2.WINDOW_NORMAL)
         cv2.resizeWindow(window_name, self.scaled_width, self.scaled_height)
         
         self.current_result_frame = None
+        sink_hub = SinkHub(sinks) if sinks else None
+        if sink_hub is not None:
+            sink_hub.start()
         
-        while self.running:
-            if not self.paused:
-                ret, current_frame = self.cap.read()
-                if not ret:
-                    # 如果是视频文件，则循环播放
-                    if isinstance(self.video_source, str):
-                        self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
-                        ret, current_frame = self.cap.read()
-                        if not ret:
-                            break
-                    else:
-                        break
-                
-                # 如果需要，水平翻转图像
-                if self.flip_image:
-                    current_frame = cv2.flip(current_frame, 1)
-            
-            # 创建扫描效果
-            self.current_result_frame = self.create_scan_effect(current_frame)
-            
-            # 调整大小以适应显示窗口
-            display_frame = self.resize_frame(self.current_result_frame)
-            
-            # 显示结果
-            cv2.imshow(window_name, display_frame)
+        try:
+            self._display_loop(window_name, sink_hub)
+        finally:
+            if sink_hub is not None:
+                sink_hub.close()
+                print(sink_hub.report())
+        
+        self._finish_run()
+    
+    def _display_frame(self, result, sink_hub):
+        """缩放到显示窗口大小；启用输出分发时由分发器缩放，与同样大小的输出共享结果"""
+        if sink_hub is None:
+            return self.resize_frame(result)
+        return sink_hub.publish(result, (self.scaled_width, self.scaled_height))
+    
+    def _display_loop(self, window_name, sink_hub):
+        """显示和键盘处理的主循环，按ESC或视频源结束时返回"""
+        last_timestamp = None
+        for result in self.process_frames(self._capture_frames()):
+            # 空闲模式下画面不变时返回同一个数组，无需重新缩放和显示
+            unchanged = result is self.current_result_frame
+            self.current_result_frame = result
             
-            # 更新扫描线位置
-            self.update_scan_position()
+            if not unchanged:
+                # 调整大小以适应显示窗口
+                start = time.perf_counter()
+                display_frame = self._display_frame(result, sink_hub)
+                if self.telemetry is not None:
+                    self.telemetry.observe_stage("resize", start)
+                
+                # 显示结果
+                start = time.perf_counter()
+                cv2.imshow(window_name, display_frame)
+                if self.telemetry is not None:
+                    self.telemetry.observe_stage("display", start)
+                if self.first_display_time is None:
+                    self.first_display_time = time.perf_counter()
+            elif sink_hub is not None:
+                # 画面不变时各输出仍按帧接收（复用上一次的缩放结果）
+                sink_hub.publish(result)
             
-            # 处理键盘事件
-            key = cv2.waitKey(int(1000/self.fps)) & 0xFF
+            # 处理键盘事件（低延迟模式下不按帧率等待，由摄像头采集节奏控制）
+            key = cv2.waitKey(1 if self.low_latency else int(1000/self.fps)) & 0xFF
+            new_frame = self.frame_timestamp != last_timestamp
+            if new_frame:
+                # 只统计新采集的帧（暂停和空闲时不读取视频源），waitKey返回时画面已提交显示
+                self.latency_monitor.record(self.frame_timestamp)
+                last_timestamp = self.frame_timestamp
+            if self.telemetry is not None:
+                self.telemetry.frame_displayed(1.0 / self.fps, self.frame_timestamp if new_frame else None)
             self.process_key_event(key)
+    
+    def run_pipeline(self, queue_size=2, record_path=None, writer_options=None, sinks=None):
+        """
+        以流水线方式运行扫描效果：解码、合成与特效、缩放、编码各在独立线程中运行，
+        显示和键盘处理在当前线程
+        
+        参数:
+            queue_size: 阶段之间的队列长度
+            record_path: 录制合成结果的视频文件路径（可选），由编码线程写入
+            writer_options: 传给writers.create_writer的参数（写入后端、编码器、CRF/码率等）
+            sinks: FrameSink列表（可选），由缩放线程分发合成结果，各输出在自己的线程中处理
+        """
+        writer = None
+        if record_path:
+            writer = create_writer(record_path, self.fps, (self.width, self.height), **(writer_options or {}))
+        sink_hub = SinkHub(sinks) if sinks else None
+        if sink_hub is not None:
+            sink_hub.start()
+        
+        self.current_result_frame = None
+        pipeline = FramePipeline(self, queue_size=queue_size, writer=writer, sink_hub=sink_hub)
+        try:
+            pipeline.run()
+        finally:
+            if sink_hub is not None:
+                sink_hub.close()
+        print(pipeline.report())
+        if writer is not None:
+            print(writer.report())
+        if sink_hub is not None:
+            print(sink_hub.report())
         
-        # 释放资源
-        self.cap.release()
+        self._finish_run()
+    
+    def _finish_run(self):
+        """运行结束后打印统计并释放资源"""
+        if self.low_latency:
+            print(self.latency_monitor.report())
+        if isinstance(self.cap, (LoopingVideoCapture, ReplayCapture)):
+            print(self.cap.report())
+        if self.session_recorder is not None:
+            self.session_recorder.close()
+            print(self.session_recorder.report())
+        if self.buffer_ledger is not None:
+            print(self.buffer_ledger.report())
+        
+        # 释放资源（共享的视频捕获对象由调用方负责释放）
+        if self.owns_capture:
+            self.cap.release()
         cv2.destroyAllWindows()
 
+def scan_frames(frames, effect_class=ScanEffect, **params):
+    """
+    对任意帧序列生成扫描效果（库接口）
+    以第一帧作为初始静态帧创建效果对象，之后逐帧生成合成结果
+    
+    参数:
+        frames: 帧的可迭代对象
+        effect_class: 效果类，ScanEffect或其子类
+        **params: 传给效果类构造函数的参数（不含video_source、capture和first_frame）
+    
+    生成:
+        合成后的帧
+    """
+    iterator = iter(frames)
+    first = next(iterator, None)
+    if first is None:
+        return
+    effect = effect_class(first_frame=first, **params)
+    yield from effect.process_frames(itertools.chain([first], iterator))
+
 def parse_color(color_str):
     """解析颜色字符串为RGB元组"""
     try:
@@ -309,13 +1107,109 @@ def parse_color(color_str):
     except:
         raise argparse.ArgumentTypeError("颜色格式应为'R,G,B'")
 
+def add_capture_arguments(parser):
+    """添加采集和运行模式相关的命令行参数（低延迟模式、采集分辨率、回环测试、帧缓存、流水线）"""
+    parser.add_argument("--low_latency", action="store_true",
+                        help="低延迟模式：协商MJPG格式和最小缓冲区，始终处理最新一帧（适用于摄像头）")
+    parser.add_argument("--capture_width", type=int, default=0,
+                        help="向摄像头请求的采集宽度")
+    parser.add_argument("--capture_height", type=int, default=0,
+                        help="向摄像头请求的采集高度")
+    parser.add_argument("--loopback_test", action="store_true",
+                        help="运行屏幕-摄像头回环延迟测试（需将摄像头对准显示窗口）")
+    parser.add_argument("--slit_scan", type=float, default=0,
+                        help="狭缝扫描模式的延迟（帧/像素），大于0时扫过的区域显示时间位移的历史画面")
+    parser.add_argument("--loop_cache_mb", type=int, default=0,
+                        help="循环播放视频文件时的内存帧缓存预算（MB），0表示不缓存")
+    parser.add_argument("--loop_cache_encoded", action="store_true",
+                        help="帧缓存以压缩后的编码缓冲区存储，由后台线程解码")
+    parser.add_argument("--disk_cache", action="store_true",
+                        help="视频文件解码一次后写入磁盘原始帧缓存，之后以内存映射读取")
+    parser.add_argument("--disk_cache_dir", type=str, default=None,
+                        help="磁盘帧缓存目录，默认为~/.cache/scan_effect")
+    parser.add_argument("--disk_cache_max_mb", type=int, default=4096,
+                        help="磁盘帧缓存总大小上限（MB）")
+    parser.add_argument("--disk_cache_max_age_days", type=float, default=7,
+                        help="磁盘帧缓存条目的生命周期（天）")
+    parser.add_argument("--no_idle", action="store_true",
+                        help="扫描完成后仍持续读取和处理每一帧（默认停止读取视频源并复用最终画面）")
+    parser.add_argument("--metrics_file", type=str, default=None,
+                        help="运行指标的JSON行输出文件，定期追加写入")
+    parser.add_argument("--metrics_port", type=int, default=None,
+                        help="在本机该端口以Prometheus文本格式提供运行指标（/metrics）")
+    parser.add_argument("--metrics_interval", type=float, default=10,
+                        help="运行指标写入文件的间隔（秒）")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="流水线模式：解码、合成与特效、缩放、编码在独立线程中并行运行")
+    parser.add_argument("--pipeline_queue", type=int, default=2,
+                        help="流水线阶段之间的队列长度")
+    parser.add_argument("--record", type=str, default=None,
+                        help="录制合成结果的视频文件路径（在流水线的编码线程中写入，隐含--pipeline）")
+    parser.add_argument("--feather", type=int, default=0,
+                        help="静态与动态画面边界的羽化宽度（像素），0表示硬边界")
+    parser.add_argument("--memory_budget", action="store_true",
+                        help="内存预算模式（4K/8K视频源）：静态帧只保存已扫过的范围，原地合成，特效按条带处理")
+    parser.add_argument("--record_session", type=str, default=None,
+                        help="采集会话文件路径：录制读取到的原始帧和采集时刻，之后可用--video回放")
+    parser.add_argument("--session_compress", type=int, default=0,
+                        help="会话录制的zlib压缩级别（1-9），0表示不压缩")
+    parser.add_argument("--replay_speed", type=float, default=1.0,
+                        help="回放采集会话的速度倍数，1为原始节奏，0表示尽快回放")
+    add_writer_arguments(parser)
+    add_sink_arguments(parser)
+
+def create_disk_cache(args):
+    """根据命令行参数创建磁盘帧缓存，未启用时返回None"""
+    if not args.disk_cache:
+        return None
+    return RawFrameCache(
+        cache_dir=args.disk_cache_dir or DEFAULT_CACHE_DIR,
+        max_bytes=args.disk_cache_max_mb * 1024 * 1024,
+        max_age_days=args.disk_cache_max_age_days
+    )
+
+def create_metrics_from_args(args):
+    """根据命令行参数创建指标注册表并启动导出器，未启用时返回None"""
+    return create_metrics(args.metrics_file, args.metrics_port, args.metrics_interval)
+
+def run_with_args(scan_effect, args):
+    """按命令行参数选择回环测试、流水线模式或普通模式运行扫描效果，结束后停止指标导出"""
+    try:
+        writer_options = writer_options_from_args(args)
+        sinks = create_sinks_from_args(args, scan_effect.fps, writer_options)
+        if args.loopback_test:
+            run_capture_loopback_test(scan_effect)
+        elif args.pipeline or args.record:
+            scan_effect.run_pipeline(queue_size=args.pipeline_queue, record_path=args.record,
+                                     writer_options=writer_options, sinks=sinks)
+        else:
+            scan_effect.run(sinks=sinks)
+    finally:
+        if scan_effect.metrics is not None:
+            scan_effect.metrics.close()
+
+def run_capture_loopback_test(scan_effect, trials=10):
+    """对扫描效果的视频源运行回环延迟测试并打印结果"""
+    print("回环延迟测试：请将摄像头对准测试窗口，按ESC可提前结束")
+    results = run_loopback_test(scan_effect.cap, trials=trials,
+                                read_frame=scan_effect._read_frame)
+    if results:
+        print(f"回环延迟（{len(results)}/{trials}次成功）: 平均 {np.mean(results):.1f} ms, "
+              f"最小 {np.min(results):.1f} ms, 最大 {np.max(results):.1f} ms")
+    else:
+        print("回环延迟测试未检测到亮度变化，请确认摄像头对准了测试窗口")
+    if scan_effect.owns_capture:
+        scan_effect.cap.release()
+
 def main():
     parser = argparse.ArgumentParser(description="视频扫描线效果")
     parser.add_argument("--video", type=str, default=0,
                         help="视频文件路径，默认使用摄像头")
     parser.add_argument("--direction", type=str, default=ScanEffect.DIRECTION_LEFT_TO_RIGHT,
-                        choices=ScanEffect.SUPPORTED_DIRECTIONS,
+                        choices=ScanEffect.SUPPORTED_DIRECTIONS + [ScanEffect.DIRECTION_ANGLE, ScanEffect.DIRECTION_RADIAL],
                         help="扫描方向")
+    parser.add_argument("--angle", type=float, default=30,
+                        help="angle扫描方向的前进角度（度），0为从左到右，90为从上到下")
     parser.add_argument("--speed", type=int, default=2,
                         help="扫描速度（像素/帧）")
     parser.add_argument("--line_width", type=int, default=3,
@@ -328,6 +1222,7 @@ def main():
                         help="显示窗口高度")
     parser.add_argument("--flip", action="store_true",
                         help="水平翻转图像（适用于摄像头）")
+    add_capture_arguments(parser)
     
     args = parser.parse_args()
     
@@ -346,9 +1241,23 @@ def main():
             line_width=args.line_width,
             line_color=args.line_color if isinstance(args.line_color, tuple) else parse_color(args.line_color),
             display_size=(args.display_width, args.display_height),
-            flip_image=args.flip
+            flip_image=args.flip,
+            low_latency=args.low_latency,
+            capture_size=(args.capture_width, args.capture_height) if args.capture_width and args.capture_height else None,
+            loop_cache_mb=args.loop_cache_mb,
+            loop_cache_encoded=args.loop_cache_encoded,
+            disk_cache=create_disk_cache(args),
+            slit_scan_fpp=args.slit_scan,
+            scan_angle=args.angle,
+            idle_when_complete=not args.no_idle,
+            metrics=create_metrics_from_args(args),
+            memory_budget=args.memory_budget,
+            session_record_path=args.record_session,
+            session_compress_level=args.session_compress,
+            replay_speed=args.replay_speed,
+            feather_width=args.feather
         )
-        scan_effect.run()
+        run_with_args(scan_effect, args)
     except Exception as e:
         print(f"错误: {e}")
 
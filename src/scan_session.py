@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+扫描会话
+保持视频源打开，在多次运行之间复用同一个视频捕获对象和效果实例，
+运行时修改参数而无需重新打开摄像头
+"""
+
+import cv2
+from recording import ReplayCapture, is_session_file
+from advanced_scan_effect import AdvancedScanEffect
+
+# 按视频源缓存的会话，供演示脚本和启动脚本共享
+_sessions = {}
+
+class ScanSession:
+    """
+    扫描会话类
+    视频源只打开一次（包括摄像头预热和读取第一帧），
+    每种效果类只创建一个实例，之后通过configure在运行时修改参数
+    """
+
+    def __init__(self, video_source=0, flip_image=False, warmup_frames=0, capture=None):
+        """
+        初始化扫描会话
+
+        参数:
+            video_source: 视频源，可以是摄像头索引、视频文件路径或采集会话文件路径
+            flip_image: 默认是否水平翻转图像（适用于摄像头）
+            warmup_frames: 打开后丢弃的预热帧数（部分摄像头的前几帧曝光不正常）
+            capture: 已打开的视频捕获对象（可选），传入时会话接管其生命周期
+        """
+        self.video_source = video_source
+        self.flip_image = flip_image
+
+        if capture is not None:
+            self.cap = capture
+        elif isinstance(video_source, str) and is_session_file(video_source):
+            self.cap = ReplayCapture(video_source)
+        else:
+            self.cap = cv2.VideoCapture(video_source)
+        if not self.cap.isOpened():
+            raise ValueError(f"无法打开视频源: {video_source}")
+
+        for _ in range(warmup_frames):
+            self.cap.read()
+
+        # 按效果类缓存的效果实例
+        self.effects = {}
+
+    def _read_first_frame(self, flip_image):
+        """读取用于初始化静态帧的一帧"""
+        ret, frame = self.cap.read()
+        if not ret and isinstance(self.video_source, str):
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.cap.read()
+        if not ret:
+            raise ValueError("无法读取第一帧")
+        if flip_image:
+            frame = cv2.flip(frame, 1)
+        return frame
+
+    def get_effect(self, effect_class=AdvancedScanEffect, **params):
+        """
+        获取指定类型的效果实例并应用参数，扫描线和静态帧重新开始
+
+        参数:
+            effect_class: 效果类，ScanEffect或其子类
+            **params: 效果参数，首次创建时传给构造函数，之后通过configure修改
+
+        返回:
+            可直接调用run()的效果实例
+        """
+        params.setdefault("flip_image", self.flip_image)
+        effect = self.effects.get(effect_class)
+
+        if effect is None:
+            # 首次使用：共享视频捕获对象创建效果实例
+            effect = effect_class(
+                video_source=self.video_source,
+                capture=self.cap,
+                first_frame=self._read_first_frame(params["flip_image"]),
+                **params
+            )
+            self.effects[effect_class] = effect
+        else:
+            # 复用已有实例：只修改变化的参数，再以最新一帧重新开始扫描
+            effect.configure(**params)
+            effect.restart_scan()
+
+        effect.running = True
+        effect.paused = False
+        return effect
+
+    def configure(self, effect_class=AdvancedScanEffect, **params):
+        """在运行时修改已创建的效果实例的参数，不重新开始扫描"""
+        effect = self.effects.get(effect_class)
+        if effect is None:
+            raise ValueError(f"尚未创建效果实例: {effect_class.__name__}")
+        return effect.configure(**params)
+
+    def run(self, effect_class=AdvancedScanEffect, **params):
+        """以指定参数运行扫描效果，退出后视频源保持打开"""
+        effect = self.get_effect(effect_class, **params)
+        effect.run()
+        return effect
+
+    def release(self):
+        """释放视频捕获对象"""
+        self.effects.clear()
+        self.cap.release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+def get_session(video_source=0, flip_image=False, warmup_frames=0, capture=None):
+    """
+    获取指定视频源的共享会话，不存在时创建
+
+    参数:
+        capture: 已打开的视频捕获对象（可选），仅在创建会话时使用，例如后台预热好的摄像头
+    """
+    session = _sessions.get(video_source)
+    if session is None:
+        session = ScanSession(video_source, flip_image=flip_image, warmup_frames=warmup_frames,
+                              capture=capture)
+        _sessions[video_source] = session
+    elif capture is not None and capture is not session.cap:
+        capture.release()
+    return session
+
+def get_session_effects():
+    """返回所有共享会话中已创建的效果实例"""
+    return [effect for session in _sessions.values() for effect in session.effects.values()]
+
+def close_sessions():
+    """释放所有共享会话"""
+    for session in _sessions.values():
+        session.release()
+    _sessions.clear()
@@ -0,0 +1,325 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+输出分发
+同一路合成画面同时送往多个输出（预览窗口、全分辨率录制、定时快照等），
+每个输出声明自己的分辨率和像素格式。分发器每帧对每种不同的分辨率只缩放一次、
+每种格式只转换一次，交给各输出的只读帧在各自线程中处理；
+输出队列有界，队列满时丢弃最旧的帧，慢的输出不会拖慢渲染循环
+"""
+
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+import cv2
+
+from writers import create_writer
+
+# 输出的像素格式
+FORMAT_BGR = "bgr"
+FORMAT_RGB = "rgb"
+FORMAT_GRAY = "gray"
+SUPPORTED_FORMATS = [FORMAT_BGR, FORMAT_RGB, FORMAT_GRAY]
+
+# 输出线程结束的标记
+_END = object()
+
+def parse_size(size_str):
+    """解析"宽x高"格式的分辨率字符串，空字符串表示全分辨率（None）"""
+    if not size_str:
+        return None
+    try:
+        width, height = map(int, size_str.lower().split("x"))
+    except ValueError:
+        raise ValueError(f"分辨率格式应为'宽x高': {size_str}")
+    return (width, height)
+
+class FrameSink:
+    """
+    输出基类
+    子类实现consume(frame)，在输出自己的线程中调用，frame为只读数组；
+    队列满时丢弃最旧的帧，保证分发不阻塞
+    """
+
+    name = "输出"
+
+    def __init__(self, size=None, fmt=FORMAT_BGR, queue_size=2):
+        """
+        参数:
+            size: 输出分辨率，(宽, 高)元组，None表示全分辨率
+            fmt: 像素格式：bgr、rgb或gray
+            queue_size: 等待处理的最大帧数
+        """
+        if fmt not in SUPPORTED_FORMATS:
+            raise ValueError(f"不支持的像素格式: {fmt}")
+        self.size = tuple(size) if size is not None else None
+        self.format = fmt
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.frames = 0
+        self.dropped = 0
+        self.busy_seconds = 0.0
+        self.error = None
+        self._thread = None
+
+    def start(self):
+        """启动输出线程"""
+        self._thread = threading.Thread(target=self._loop, name=f"sink-{self.name}", daemon=True)
+        self._thread.start()
+
+    def offer(self, frame):
+        """放入一帧，队列满时丢弃最旧的一帧，从不阻塞"""
+        while True:
+            try:
+                self.queue.put_nowait(frame)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def _loop(self):
+        while True:
+            frame = self.queue.get()
+            if frame is _END:
+                break
+            if self.error is not None:
+                continue
+            start = time.perf_counter()
+            try:
+                self.consume(frame)
+            except Exception as e:
+                # 出错的输出停止处理，不影响渲染循环和其他输出
+                self.error = e
+                print(f"{self.name}出错，已停止: {e}")
+                continue
+            self.busy_seconds += time.perf_counter() - start
+            self.frames += 1
+
+    def consume(self, frame):
+        raise NotImplementedError
+
+    def stop(self):
+        """处理完队列中剩余的帧后停止线程，并释放输出的资源"""
+        if self._thread is not None:
+            while True:
+                try:
+                    self.queue.put(_END, timeout=0.1)
+                    break
+                except queue.Full:
+                    if not self._thread.is_alive():
+                        break
+            self._thread.join()
+            self._thread = None
+        self.close()
+
+    def close(self):
+        """释放资源（子类按需实现）"""
+
+    def report(self):
+        """生成输出统计文本"""
+        size = f"{self.size[0]}x{self.size[1]}" if self.size is not None else "全分辨率"
+        busy = self.busy_seconds / self.frames * 1000 if self.frames else 0.0
+        return f"{self.name}（{size}，{self.format}）: 处理 {self.frames}帧，丢弃 {self.dropped}帧，平均 {busy:.1f} ms/帧"
+
+class WriterSink(FrameSink):
+    """录制输出：收到第一帧时按实际大小创建视频写入器"""
+
+    name = "录制"
+
+    def __init__(self, path, fps, size=None, writer_options=None, queue_size=8):
+        """
+        参数:
+            path: 输出视频文件路径
+            fps: 帧率
+            size: 录制分辨率，None表示全分辨率
+            writer_options: 传给writers.create_writer的参数（写入后端、编码器、CRF/码率等）
+            queue_size: 等待编码的最大帧数
+        """
+        super().__init__(size=size, fmt=FORMAT_BGR, queue_size=queue_size)
+        self.path = path
+        self.fps = fps
+        self.writer_options = writer_options or {}
+        self.writer = None
+
+    def consume(self, frame):
+        if self.writer is None:
+            self.writer = create_writer(self.path, self.fps, (frame.shape[1], frame.shape[0]),
+                                        **self.writer_options)
+        self.writer.write(frame)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.release()
+
+    def report(self):
+        text = super().report()
+        if self.writer is not None:
+            text += "\n  " + self.writer.report()
+        return text
+
+class SnapshotSink(FrameSink):
+    """快照输出：每隔interval秒保存一张图片，也可以用request()请求保存下一帧"""
+
+    name = "快照"
+
+    def __init__(self, directory="output", interval=10.0, size=None, ext=".jpg"):
+        """
+        参数:
+            directory: 图片保存目录
+            interval: 自动保存的间隔（秒），0表示只在request()后保存
+            size: 快照分辨率，None表示全分辨率
+            ext: 图片格式扩展名
+        """
+        super().__init__(size=size, fmt=FORMAT_BGR, queue_size=1)
+        self.directory = directory
+        self.interval = interval
+        self.ext = ext
+        self.saved = []
+        self._last_save = None
+        self._requested = threading.Event()
+
+    def request(self):
+        """请求保存下一帧"""
+        self._requested.set()
+
+    def consume(self, frame):
+        now = time.perf_counter()
+        due = self.interval > 0 and (self._last_save is None or now - self._last_save >= self.interval)
+        if not due and not self._requested.is_set():
+            return
+        self._requested.clear()
+        self._last_save = now
+        os.makedirs(self.directory, exist_ok=True)
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename = os.path.join(self.directory, f"snapshot_{timestamp}_{len(self.saved):04d}{self.ext}")
+        cv2.imwrite(filename, frame)
+        self.saved.append(filename)
+
+    def report(self):
+        return super().report() + f"，保存 {len(self.saved)}张快照"
+
+class CallbackSink(FrameSink):
+    """回调输出：在输出线程中以只读帧调用callback(frame)，用于库调用方接入自己的处理"""
+
+    name = "回调"
+
+    def __init__(self, callback, size=None, fmt=FORMAT_BGR, queue_size=2):
+        super().__init__(size=size, fmt=fmt, queue_size=queue_size)
+        self.callback = callback
+
+    def consume(self, frame):
+        self.callback(frame)
+
+class SinkHub:
+    """
+    输出分发器
+    publish()在渲染线程中调用：每种分辨率只缩放一次、每种（分辨率, 格式）只转换一次，
+    结果设为只读后放入各输出的队列；同一个数组重复发布时（暂停、空闲）复用上一次的结果
+    """
+
+    def __init__(self, sinks, interpolation=cv2.INTER_LINEAR):
+        """
+        参数:
+            sinks: FrameSink列表
+            interpolation: 缩放插值方法，默认与显示窗口的缩放一致
+        """
+        self.sinks = list(sinks)
+        self.interpolation = interpolation
+        self.resizes = 0
+        self.conversions = 0
+        self._last_frame = None
+        self._outputs = {}
+
+    def start(self):
+        """启动所有输出线程"""
+        for sink in self.sinks:
+            sink.start()
+
+    def _scaled(self, frame, size):
+        """frame缩放到size（None为原大小）的只读结果，本帧内每种分辨率只计算一次"""
+        key = (size, FORMAT_BGR)
+        output = self._outputs.get(key)
+        if output is None:
+            if size is None or size == (frame.shape[1], frame.shape[0]):
+                output = frame.view()
+            else:
+                output = cv2.resize(frame, size, interpolation=self.interpolation)
+                self.resizes += 1
+            output.flags.writeable = False
+            self._outputs[key] = output
+        return output
+
+    def _formatted(self, frame, size, fmt):
+        """缩放并转换格式后的只读结果，本帧内每种（分辨率, 格式）只计算一次"""
+        if fmt == FORMAT_BGR:
+            return self._scaled(frame, size)
+        output = self._outputs.get((size, fmt))
+        if output is None:
+            scaled = self._scaled(frame, size)
+            code = cv2.COLOR_BGR2RGB if fmt == FORMAT_RGB else cv2.COLOR_BGR2GRAY
+            output = cv2.cvtColor(scaled, code)
+            self.conversions += 1
+            output.flags.writeable = False
+            self._outputs[(size, fmt)] = output
+        return output
+
+    def publish(self, frame, display_size=None):
+        """
+        把一帧合成结果分发给所有输出
+
+        参数:
+            frame: 全分辨率的BGR合成结果（之后不应再修改）
+            display_size: 显示窗口的大小（可选），与输出共享缩放结果
+
+        返回:
+            缩放到display_size的只读帧，未指定display_size时返回None
+        """
+        if frame is not self._last_frame:
+            self._outputs = {}
+            self._last_frame = frame
+        for sink in self.sinks:
+            sink.offer(self._formatted(frame, sink.size, sink.format))
+        return self._scaled(frame, tuple(display_size)) if display_size is not None else None
+
+    def close(self):
+        """等待各输出处理完队列中的帧并释放资源"""
+        for sink in self.sinks:
+            sink.stop()
+        self._last_frame = None
+        self._outputs = {}
+
+    def report(self):
+        """生成各输出的统计文本"""
+        lines = [f"输出分发: {len(self.sinks)}个输出，缩放 {self.resizes}次，格式转换 {self.conversions}次"]
+        lines += ["  " + sink.report().replace("\n", "\n  ") for sink in self.sinks]
+        return "\n".join(lines)
+
+def add_sink_arguments(parser):
+    """添加输出分发相关的命令行参数"""
+    parser.add_argument("--sink_record", type=str, default=None,
+                        help="在独立的输出线程中录制合成结果的视频文件路径（队列满时丢帧，不拖慢渲染）")
+    parser.add_argument("--sink_record_size", type=str, default="",
+                        help="输出线程录制的分辨率，格式为'宽x高'，默认为全分辨率")
+    parser.add_argument("--snapshot_dir", type=str, default=None,
+                        help="定时快照的保存目录，设置后启用快照输出")
+    parser.add_argument("--snapshot_interval", type=float, default=10,
+                        help="定时快照的间隔（秒）")
+    parser.add_argument("--snapshot_size", type=str, default="",
+                        help="快照的分辨率，格式为'宽x高'，默认为全分辨率")
+
+def create_sinks_from_args(args, fps, writer_options=None):
+    """根据命令行参数创建输出列表"""
+    sinks = []
+    if args.sink_record:
+        sinks.append(WriterSink(args.sink_record, fps, size=parse_size(args.sink_record_size),
+                                writer_options=writer_options))
+    if args.snapshot_dir:
+        sinks.append(SnapshotSink(args.snapshot_dir, interval=args.snapshot_interval,
+                                  size=parse_size(args.snapshot_size)))
+    return sinks
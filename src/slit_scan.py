@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+狭缝扫描（时间位移）缓冲区
+沿扫描方向的每一列（或行）显示不同时刻的历史帧，延迟帧数与到扫描起始边的距离成正比。
+只保存之后仍会显示的条带：延迟为d的条带只保留最近d+1帧，而不是保存完整的历史帧
+"""
+
+import numpy as np
+
+class SlitScanBuffer:
+    """
+    狭缝扫描条带环形缓冲区
+    延迟相同的相邻列（或行）合并为一个条带，每个条带有独立的环形缓冲区，
+    总内存约为保存同样延迟所需完整帧的一半
+    """
+
+    def __init__(self, width, height, horizontal=True, forward=True, frames_per_pixel=0.1, max_delay=None):
+        """
+        初始化狭缝扫描缓冲区
+
+        参数:
+            width: 帧宽度
+            height: 帧高度
+            horizontal: 是否为水平方向扫描（按列延迟），否则按行延迟
+            forward: 是否为正向扫描（从左到右或从上到下），决定延迟从哪一边开始增加
+            frames_per_pixel: 每像素距离对应的延迟帧数
+            max_delay: 最大延迟帧数（可选），用于限制内存占用
+        """
+        self.width = width
+        self.height = height
+        self.horizontal = horizontal
+        self.frames_per_pixel = frames_per_pixel
+
+        # 每个列（或行）索引的延迟帧数，延迟从扫描起始边开始递增
+        length = width if horizontal else height
+        distance = np.arange(length) if forward else np.arange(length)[::-1]
+        delays = np.floor(distance * frames_per_pixel).astype(np.int64)
+        if max_delay is not None:
+            delays = np.minimum(delays, max_delay)
+
+        # 合并延迟相同的相邻索引为条带：[(起始, 结束, 延迟), ...]
+        boundaries = np.flatnonzero(np.diff(delays)) + 1
+        starts = np.concatenate(([0], boundaries))
+        ends = np.concatenate((boundaries, [length]))
+        self.strips = [(int(start), int(end), int(delays[start])) for start, end in zip(starts, ends)]
+        self.max_delay = int(delays.max()) if length else 0
+
+        self.rings = None
+        self.frame_index = -1
+
+    def _strip(self, frame, start, end):
+        """取出帧中的一个条带（视图）"""
+        if self.horizontal:
+            return frame[:, start:end]
+        return frame[start:end]
+
+    @property
+    def memory_bytes(self):
+        """环形缓冲区占用的内存（字节）"""
+        if self.horizontal:
+            return sum((delay + 1) * self.height * (end - start) * 3 for start, end, delay in self.strips)
+        return sum((delay + 1) * (end - start) * self.width * 3 for start, end, delay in self.strips)
+
+    def push(self, frame):
+        """写入最新一帧的所有条带"""
+        if self.rings is None:
+            # 第一帧填满所有历史槽位，历史不足时显示最早的画面
+            self.rings = []
+            for start, end, delay in self.strips:
+                strip = self._strip(frame, start, end)
+                ring = np.empty((delay + 1,) + strip.shape, dtype=frame.dtype)
+                ring[:] = strip
+                self.rings.append(ring)
+            self.frame_index = 0
+            return
+
+        self.frame_index += 1
+        for (start, end, delay), ring in zip(self.strips, self.rings):
+            ring[self.frame_index % (delay + 1)] = self._strip(frame, start, end)
+
+    def render(self, out, lo=0, hi=None):
+        """
+        将时间位移后的画面写入out中[lo, hi)范围内的列（或行）
+
+        参数:
+            out: 输出帧，原地写入
+            lo: 起始列（或行）
+            hi: 结束列（或行），默认为末尾
+        """
+        if self.rings is None:
+            return
+        if hi is None:
+            hi = self.width if self.horizontal else self.height
+
+        for (start, end, delay), ring in zip(self.strips, self.rings):
+            if end <= lo or start >= hi:
+                continue
+            # 延迟d帧的画面位于下一个写入槽位
+            delayed = ring[(self.frame_index + 1) % (delay + 1)]
+            clip_start, clip_end = max(start, lo), min(end, hi)
+            if clip_start == start and clip_end == end:
+                self._strip(out, start, end)[:] = delayed
+            elif self.horizontal:
+                out[:, clip_start:clip_end] = delayed[:, clip_start - start:clip_end - start]
+            else:
+                out[clip_start:clip_end] = delayed[clip_start - start:clip_end - start]
@@ -0,0 +1,360 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+长时间运行（浸泡）测试
+用合成视频源在无窗口模式下持续驱动AdvancedScanEffect的运行循环，轮换扫描方向、效果、动画，
+定期重置扫描线和切换图像翻转；按固定间隔采样进程常驻内存、tracemalloc跟踪的内存和帧耗时，
+与预热结束时的基准比较，增长或变慢超过阈值时以非零状态退出
+"""
+
+import argparse
+import itertools
+import json
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+
+import cv2
+import numpy as np
+
+from scan_effect import ScanEffect
+from advanced_scan_effect import AdvancedScanEffect
+from telemetry import MetricsRegistry, process_rss_bytes
+from tile_executor import shutdown_tile_executors
+
+class SyntheticCapture:
+    """
+    合成视频源
+    接口与cv2.VideoCapture兼容，每次read()返回一帧新的画面（渐变背景上移动的白色方块），
+    不依赖摄像头和视频文件
+    """
+
+    def __init__(self, width=1280, height=720, fps=30):
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.index = 0
+
+        # 预先生成的渐变背景
+        xs = np.linspace(0, 255, width).astype(np.uint8)
+        ys = np.linspace(0, 255, height).astype(np.uint8)
+        self.background = np.empty((height, width, 3), dtype=np.uint8)
+        self.background[:, :, 0] = xs[None, :]
+        self.background[:, :, 1] = ys[:, None]
+        self.background[:, :, 2] = 128
+        self.block_size = max(8, min(width, height) // 6)
+
+    def read(self):
+        frame = self.background.copy()
+        size = self.block_size
+        x = (self.index * 7) % max(1, self.width - size)
+        y = (self.index * 3) % max(1, self.height - size)
+        frame[y:y + size, x:x + size] = 255
+        self.index += 1
+        return True, frame
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self.width)
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self.height)
+        if prop == cv2.CAP_PROP_FPS:
+            return float(self.fps)
+        return 0.0
+
+    def set(self, prop, value):
+        return False
+
+    def isOpened(self):
+        return True
+
+    def release(self):
+        pass
+
+class SoakTest:
+    """
+    浸泡测试
+    预热结束后的第一次采样作为基准（预热期间建立的缓存和线程池不计入增长），
+    测试结束时以最后一次采样与基准比较：常驻内存增长、tracemalloc跟踪的内存增长，
+    以及各参数组合的帧耗时中位数相对该组合参考值的变慢比例
+    """
+
+    # 轮换的扫描方向
+    DIRECTIONS = ScanEffect.SUPPORTED_DIRECTIONS + [ScanEffect.DIRECTION_ANGLE, ScanEffect.DIRECTION_RADIAL]
+
+    def __init__(self, duration=600, width=1280, height=720, sample_interval=30, warmup=30,
+                 cycle_frames=150, reset_frames=400, flip_frames=1000, effect_threads=1, memory_budget=False,
+                 max_rss_growth_mb=50, max_traced_growth_mb=20, max_slowdown=1.25,
+                 top_allocators=10, trace_frames=1):
+        """
+        初始化浸泡测试
+
+        参数:
+            duration: 测试时长（秒）
+            width, height: 合成视频源的分辨率
+            sample_interval: 采样间隔（秒）
+            warmup: 预热时长（秒）
+            cycle_frames: 每隔多少帧切换一次方向、效果和动画组合
+            reset_frames: 每隔多少帧重置一次扫描线（两次重置之间扫描完成后进入空闲模式）
+            flip_frames: 每隔多少帧切换一次图像翻转和模糊效果
+            effect_threads: 特效分块处理的线程数
+            memory_budget: 是否以内存预算模式运行
+            max_rss_growth_mb: 常驻内存增长上限（MB）
+            max_traced_growth_mb: tracemalloc跟踪的内存增长上限（MB）
+            max_slowdown: 帧耗时中位数相对参考值的最大比例
+            top_allocators: 报告中列出的内存增长最多的分配位置数
+            trace_frames: tracemalloc记录的调用栈深度
+        """
+        self.duration = duration
+        self.sample_interval = sample_interval
+        self.warmup = warmup
+        self.cycle_frames = cycle_frames
+        self.reset_frames = reset_frames
+        self.flip_frames = flip_frames
+        self.max_rss_growth_mb = max_rss_growth_mb
+        self.max_traced_growth_mb = max_traced_growth_mb
+        self.max_slowdown = max_slowdown
+        self.top_allocators = top_allocators
+        self.trace_frames = trace_frames
+
+        self.capture = SyntheticCapture(width, height)
+        self.effect = AdvancedScanEffect(
+            capture=self.capture,
+            speed=max(2, width // 120),
+            multi_line=3,
+            gradient_effect=True,
+            effect_threads=effect_threads,
+            metrics=MetricsRegistry(),
+            memory_budget=memory_budget
+        )
+        self.configs = itertools.cycle(itertools.product(
+            self.DIRECTIONS,
+            AdvancedScanEffect.SUPPORTED_EFFECTS,
+            AdvancedScanEffect.SUPPORTED_ANIMATIONS
+        ))
+
+        self.samples = []
+        self.reference_times = {}  # 参数组合 -> 参考帧耗时中位数
+        self.baseline = None
+        self.baseline_snapshot = None
+        self.top_growth = []
+        self.failures = []
+
+    def _cycle(self, frame_index):
+        """按帧序号轮换参数、重置扫描线和切换翻转"""
+        effect = self.effect
+        if frame_index % self.cycle_frames == 0:
+            direction, effect_type, animation_type = next(self.configs)
+            effect.configure(direction=direction, effect_type=effect_type, animation_type=animation_type)
+        if frame_index % self.reset_frames == 0:
+            effect.reset_scan_line()
+        if frame_index % self.flip_frames == 0:
+            effect.configure(flip_image=not effect.flip_image, blur_effect=not effect.blur_effect)
+
+    def _state_key(self):
+        """当前参数组合，帧耗时按组合分别统计（不同效果和空闲模式的耗时相差很大）"""
+        effect = self.effect
+        return (effect.direction, effect.effect_type, effect.animation_type,
+                effect.flip_image, effect.blur_effect, effect.is_idle())
+
+    def _sample(self, elapsed, frames, frame_times):
+        """
+        采样一次内存和帧耗时
+        每个参数组合在预热后第一次出现时的耗时中位数作为该组合的参考值，
+        之后出现时与参考值相比，各组合比例的中位数即本次采样的变慢比例
+        """
+        ratios = []
+        for key, times in frame_times.items():
+            median = float(np.median(times))
+            reference = self.reference_times.get(key)
+            if reference is None:
+                self.reference_times[key] = median
+            else:
+                ratios.append(median / reference)
+
+        traced, traced_peak = tracemalloc.get_traced_memory()
+        sample = {
+            "elapsed": round(elapsed, 1),
+            "frames": frames,
+            "rss_mb": (process_rss_bytes() or 0) / 1024 / 1024,
+            "traced_mb": traced / 1024 / 1024,
+            "traced_peak_mb": traced_peak / 1024 / 1024,
+            "frame_ms": float(np.median(np.concatenate(list(frame_times.values())))) * 1000 if frame_times else 0.0,
+            "slowdown": float(np.median(ratios)) if ratios else None,
+        }
+        self.samples.append(sample)
+        slowdown = f"{sample['slowdown']:.2f}" if ratios else "-"
+        print(f"[{sample['elapsed']:7.1f}s] 帧数 {frames}, 常驻内存 {sample['rss_mb']:.1f} MB, "
+              f"跟踪内存 {sample['traced_mb']:.2f} MB（峰值 {sample['traced_peak_mb']:.1f} MB）, "
+              f"帧耗时中位数 {sample['frame_ms']:.2f} ms, 相对参考 {slowdown}")
+        return sample
+
+    def run(self):
+        """
+        运行浸泡测试
+
+        返回:
+            是否通过
+        """
+        print(f"浸泡测试: {self.duration}秒, {self.capture.width}x{self.capture.height}, "
+              f"预热 {self.warmup}秒, 每 {self.sample_interval}秒采样")
+        tracemalloc.start(self.trace_frames)
+        try:
+            self._loop()
+        finally:
+            self.capture.release()
+            shutdown_tile_executors()
+        if self.baseline_snapshot is not None:
+            self.top_growth = self._top_growth(tracemalloc.take_snapshot())
+        tracemalloc.stop()
+
+        self._check()
+        self.report()
+        return not self.failures
+
+    def _loop(self):
+        """与run()相同的读取和处理生成器，只是不显示；每次迭代的耗时包括读取、处理和缩放"""
+        frames = 0
+        frame_times = defaultdict(list)
+        key = self._state_key()
+        start = last = time.perf_counter()
+        next_sample = start + self.warmup
+        for result in self.effect.process_frames(self.effect._capture_frames()):
+            self.effect.resize_frame(result)
+            frames += 1
+            now = time.perf_counter()
+            frame_times[key].append(now - last)
+
+            if now >= next_sample:
+                if self.baseline is None:
+                    # 预热期间的耗时不作为参考值
+                    frame_times.clear()
+                    self.baseline = self._sample(now - start, frames, frame_times)
+                    self.baseline_snapshot = tracemalloc.take_snapshot()
+                else:
+                    self._sample(now - start, frames, frame_times)
+                frame_times = defaultdict(list)
+                next_sample = now + self.sample_interval
+            if now - start >= self.duration:
+                break
+
+            # 下一帧按切换后的参数处理
+            self._cycle(frames)
+            key = self._state_key()
+            # 采样和切换参数的耗时不计入帧耗时
+            last = time.perf_counter()
+
+    def _top_growth(self, snapshot):
+        """相对基准快照内存增长最多的分配位置"""
+        # 不计tracemalloc和测试本身的分配
+        filters = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+        stats = snapshot.filter_traces(filters).compare_to(
+            self.baseline_snapshot.filter_traces(filters), "lineno")
+        return [stat for stat in stats if stat.size_diff > 0][:self.top_allocators]
+
+    def _check(self):
+        """以最后一次采样与基准比较，记录超过阈值的项"""
+        if self.baseline is None or len(self.samples) < 2:
+            self.failures.append("测试时长不足，预热后没有可比较的采样")
+            return
+        final = self.samples[-1]
+        rss_growth = final["rss_mb"] - self.baseline["rss_mb"]
+        traced_growth = final["traced_mb"] - self.baseline["traced_mb"]
+        slowdowns = [sample["slowdown"] for sample in self.samples if sample["slowdown"] is not None]
+        slowdown = slowdowns[-1] if slowdowns else 1.0
+
+        if rss_growth > self.max_rss_growth_mb:
+            self.failures.append(f"常驻内存增长 {rss_growth:.1f} MB，超过上限 {self.max_rss_growth_mb} MB")
+        if traced_growth > self.max_traced_growth_mb:
+            self.failures.append(f"跟踪内存增长 {traced_growth:.2f} MB，超过上限 {self.max_traced_growth_mb} MB")
+        if slowdown > self.max_slowdown:
+            self.failures.append(f"帧耗时变为参考值的 {slowdown:.2f} 倍，超过上限 {self.max_slowdown} 倍")
+
+    def report(self):
+        """打印内存增长最多的分配位置和测试结论"""
+        if self.top_growth:
+            print("内存增长最多的分配位置:")
+            for stat in self.top_growth:
+                print(f"  {stat}")
+        if self.failures:
+            print("浸泡测试未通过:")
+            for failure in self.failures:
+                print(f"  {failure}")
+        else:
+            print("浸泡测试通过")
+
+    def to_dict(self):
+        """测试结果（可JSON序列化）"""
+        return {
+            "passed": not self.failures,
+            "failures": self.failures,
+            "baseline": self.baseline,
+            "samples": self.samples,
+            "top_growth": [{"location": str(stat.traceback), "size_diff": stat.size_diff,
+                            "count_diff": stat.count_diff} for stat in self.top_growth],
+        }
+
+def main():
+    parser = argparse.ArgumentParser(description="扫描线效果浸泡测试（内存增长与帧耗时漂移）")
+    parser.add_argument("--duration", type=float, default=600,
+                        help="测试时长（秒），默认为600")
+    parser.add_argument("--width", type=int, default=1280,
+                        help="合成视频源宽度")
+    parser.add_argument("--height", type=int, default=720,
+                        help="合成视频源高度")
+    parser.add_argument("--sample_interval", type=float, default=30,
+                        help="采样间隔（秒）")
+    parser.add_argument("--warmup", type=float, default=30,
+                        help="预热时长（秒），预热结束时的采样作为基准")
+    parser.add_argument("--cycle_frames", type=int, default=150,
+                        help="每隔多少帧切换一次方向、效果和动画")
+    parser.add_argument("--reset_frames", type=int, default=400,
+                        help="每隔多少帧重置一次扫描线")
+    parser.add_argument("--flip_frames", type=int, default=1000,
+                        help="每隔多少帧切换一次图像翻转和模糊效果")
+    parser.add_argument("--effect_threads", type=int, default=1,
+                        help="特效分块处理的线程数，0表示使用CPU核数")
+    parser.add_argument("--memory_budget", action="store_true",
+                        help="以内存预算模式运行")
+    parser.add_argument("--max_rss_growth_mb", type=float, default=50,
+                        help="常驻内存增长上限（MB）")
+    parser.add_argument("--max_traced_growth_mb", type=float, default=20,
+                        help="tracemalloc跟踪的内存增长上限（MB）")
+    parser.add_argument("--max_slowdown", type=float, default=1.25,
+                        help="帧耗时中位数相对参考值的最大比例（按参数组合分别比较）")
+    parser.add_argument("--top", type=int, default=10,
+                        help="报告中列出的内存增长最多的分配位置数")
+    parser.add_argument("--trace_frames", type=int, default=1,
+                        help="tracemalloc记录的调用栈深度")
+    parser.add_argument("--report", type=str, default=None,
+                        help="将采样和结论写入JSON文件")
+
+    args = parser.parse_args()
+
+    soak = SoakTest(
+        duration=args.duration,
+        width=args.width,
+        height=args.height,
+        sample_interval=args.sample_interval,
+        warmup=args.warmup,
+        cycle_frames=args.cycle_frames,
+        reset_frames=args.reset_frames,
+        flip_frames=args.flip_frames,
+        effect_threads=args.effect_threads,
+        memory_budget=args.memory_budget,
+        max_rss_growth_mb=args.max_rss_growth_mb,
+        max_traced_growth_mb=args.max_traced_growth_mb,
+        max_slowdown=args.max_slowdown,
+        top_allocators=args.top,
+        trace_frames=args.trace_frames
+    )
+    passed = soak.run()
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(soak.to_dict(), f, ensure_ascii=False, indent=2)
+    sys.exit(0 if passed else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+启动优化工具
+延迟导入重型模块、在后台预先打开并预热摄像头，并输出启动耗时报告。
+本模块只依赖标准库中的轻量模块，可在显示菜单前导入
+"""
+
+import importlib
+import os
+import subprocess
+import sys
+import threading
+import time
+
+# 显示菜单前允许的导入耗时预算（毫秒）
+IMPORT_BUDGET_MS = 50
+
+class StartupTimer:
+    """
+    启动计时器
+    以进程启动时刻为基准记录各阶段耗时（导入、菜单显示、摄像头打开、首帧显示等）
+    """
+
+    def __init__(self, start_time=None):
+        """
+        初始化启动计时器
+
+        参数:
+            start_time: 基准时刻（time.perf_counter()），默认为创建时刻
+        """
+        self.start_time = time.perf_counter() if start_time is None else start_time
+        self.marks = []
+        self.imports = []
+        self._lock = threading.Lock()
+
+    def elapsed_ms(self, timestamp=None):
+        """返回指定时刻（默认为当前）相对基准时刻的毫秒数"""
+        timestamp = time.perf_counter() if timestamp is None else timestamp
+        return (timestamp - self.start_time) * 1000
+
+    def mark(self, name, timestamp=None):
+        """记录一个阶段的完成时刻"""
+        with self._lock:
+            self.marks.append((name, self.elapsed_ms(timestamp)))
+
+    def timed_import(self, name):
+        """导入模块并记录耗时（已导入的模块耗时接近0）"""
+        t0 = time.perf_counter()
+        module = importlib.import_module(name)
+        with self._lock:
+            self.imports.append((name, (time.perf_counter() - t0) * 1000))
+        return module
+
+    def report(self, budget_ms=IMPORT_BUDGET_MS, menu_mark="菜单显示"):
+        """生成启动耗时报告文本"""
+        lines = ["启动耗时报告", "-" * 40]
+        with self._lock:
+            marks = list(self.marks)
+            imports = list(self.imports)
+
+        if imports:
+            lines.append("模块导入（按导入顺序，不含已缓存部分）:")
+            for name, ms in imports:
+                lines.append(f"  {name:<28}{ms:9.1f} ms")
+
+        for name, ms in marks:
+            lines.append(f"{name:<30}{ms:9.1f} ms")
+
+        menu_ms = dict(marks).get(menu_mark)
+        if menu_ms is not None and menu_ms > budget_ms:
+            lines.append(f"警告: {menu_mark}耗时 {menu_ms:.1f} ms，超出导入预算 {budget_ms} ms")
+
+        return "\n".join(lines)
+
+def importtime_breakdown(modules, top=15, python=None, extra_path=None):
+    """
+    以 python -X importtime 的方式在子进程中导入模块，返回累计耗时最高的模块
+
+    参数:
+        modules: 要导入的模块名列表
+        top: 返回的模块数量
+        python: Python解释器路径，默认为当前解释器
+        extra_path: 追加到子进程PYTHONPATH的目录（可选）
+
+    返回:
+        [(模块名, 自身耗时毫秒, 累计耗时毫秒), ...]，按累计耗时降序排列
+    """
+    code = "; ".join(f"import {name}" for name in modules)
+    env = dict(os.environ)
+    if extra_path:
+        env["PYTHONPATH"] = os.pathsep.join(filter(None, [extra_path, env.get("PYTHONPATH")]))
+    completed = subprocess.run([python or sys.executable, "-X", "importtime", "-c", code],
+                               capture_output=True, text=True, env=env)
+
+    entries = []
+    for line in completed.stderr.splitlines():
+        # 格式: "import time:   self [us] |  cumulative | imported package"
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3:
+            continue
+        try:
+            self_us, cumulative_us = int(fields[0]), int(fields[1])
+        except ValueError:
+            continue
+        entries.append((fields[2].strip(), self_us / 1000, cumulative_us / 1000))
+
+    entries.sort(key=lambda entry: entry[2], reverse=True)
+    return entries[:top]
+
+def format_importtime(entries):
+    """格式化importtime_breakdown的结果"""
+    lines = [f"{'模块':<36}{'自身(ms)':>10}{'累计(ms)':>10}"]
+    for name, self_ms, cumulative_ms in entries:
+        lines.append(f"{name:<36}{self_ms:10.1f}{cumulative_ms:10.1f}")
+    return "\n".join(lines)
+
+class CameraPrewarmer(threading.Thread):
+    """
+    摄像头预热线程
+    在用户浏览菜单时于后台导入OpenCV、打开摄像头并读取预热帧，
+    之后通过take()把已打开的视频捕获对象交给扫描会话
+    """
+
+    def __init__(self, video_source=0, warmup_frames=5, timer=None):
+        """
+        初始化摄像头预热线程
+
+        参数:
+            video_source: 摄像头索引
+            warmup_frames: 丢弃的预热帧数
+            timer: StartupTimer实例（可选），用于记录导入和打开摄像头的耗时
+        """
+        super().__init__(daemon=True)
+        self.video_source = video_source
+        self.warmup_frames = warmup_frames
+        self.timer = timer
+        self.cap = None
+        self.error = None
+        self._taken = False
+        # 预热完成前请求释放时，由预热线程在打开摄像头后立即释放
+        self._lock = threading.Lock()
+
+    def run(self):
+        """后台导入模块并打开摄像头"""
+        try:
+            if self.timer is not None:
+                self.timer.timed_import("numpy")
+                cv2 = self.timer.timed_import("cv2")
+                self.timer.timed_import("scan_effect")
+                self.timer.timed_import("advanced_scan_effect")
+            else:
+                cv2 = importlib.import_module("cv2")
+
+            cap = cv2.VideoCapture(self.video_source)
+            if not cap.isOpened():
+                raise ValueError(f"无法打开视频源: {self.video_source}")
+            if self.timer is not None:
+                self.timer.mark("摄像头打开")
+
+            for index in range(self.warmup_frames):
+                cap.read()
+                if index == 0 and self.timer is not None:
+                    self.timer.mark("摄像头首帧读取")
+            with self._lock:
+                if self._taken:
+                    cap.release()
+                else:
+                    self.cap = cap
+        except Exception as e:
+            self.error = e
+
+    def take(self, timeout=None):
+        """
+        等待预热完成并取走视频捕获对象（只能取走一次）
+
+        返回:
+            已打开的视频捕获对象；预热失败或已被取走时返回None
+        """
+        self.join(timeout)
+        with self._lock:
+            if self.is_alive() or self._taken:
+                return None
+            self._taken = True
+            return self.cap
+
+    def release(self):
+        """释放未被取走的视频捕获对象；预热仍在进行时，摄像头在打开后立即释放，不等待"""
+        with self._lock:
+            if not self._taken and self.cap is not None:
+                self.cap.release()
+            self._taken = True
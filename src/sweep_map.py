@@ -0,0 +1,164 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+任意形状的扫描前沿
+每种形状由逐像素的"扫描时刻"图定义（扫描位置到达该值时像素被扫过），初始化时只计算一次。
+静态帧更新只处理本帧新扫过的像素带，合成时用持久的已扫过掩码做一次cv2.copyTo，
+开销与轴向扫描的切片复制相当
+"""
+
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+class SweepMap:
+    """
+    扫描时刻图
+    像素按扫描时刻排序后，任意位置区间内被扫过的像素是排序数组中的一段连续范围，
+    用二分查找即可得到本帧新扫过的像素
+    """
+
+    # 扫描前沿形状
+    SHAPE_ANGLE = "angle"
+    SHAPE_RADIAL = "radial"
+    SHAPE_CUSTOM = "custom"
+
+    # 自定义形状缓存的前沿轮廓数（按扫描位置，渐变效果每帧在扫描线两侧绘制多条前沿）
+    FRONT_CACHE_SIZE = 128
+    # 前沿轮廓折线化的最大偏差（像素），逐像素的轮廓点很多，绘制开销随点数增长
+    FRONT_APPROX_EPSILON = 1.0
+
+    def __init__(self, times, shape=SHAPE_CUSTOM, angle=0.0, center=None):
+        """
+        初始化扫描时刻图
+
+        参数:
+            times: 逐像素扫描时刻，(高, 宽)数组，单位为像素距离，最小值会被平移到0
+            shape: 前沿形状，用于选择绘制扫描线的方式
+            angle: 角度扫描的方向（度）
+            center: 径向扫描的圆心，(x, y)元组
+        """
+        times = np.asarray(times, dtype=np.float32)
+        self.origin = float(times.min())
+        self.times = times - self.origin
+        self.height, self.width = self.times.shape
+        self.shape = shape
+        self.angle = angle
+        self.center = center
+
+        # 扫描结束位置：所有像素都被扫过
+        self.length = int(np.ceil(self.times.max())) + 1
+
+        # 按扫描时刻排序的像素索引
+        flat = self.times.ravel()
+        self.order = np.argsort(flat, kind="stable").astype(np.int32)
+        self.sorted_times = flat[self.order]
+
+        # 持久的已扫过掩码（uint8，供cv2.copyTo使用）及其对应的扫描位置
+        self.swept_mask = np.zeros((self.height, self.width), dtype=np.uint8)
+        self.mask_position = 0
+
+        # 自定义形状的前沿轮廓缓存；每行、每列的最小扫描时刻用于把轮廓提取限制在已扫过区域的外接矩形内
+        self._front_cache = OrderedDict()
+        self.row_min = self.times.min(axis=1)
+        self.col_min = self.times.min(axis=0)
+
+    @classmethod
+    def angled(cls, width, height, angle):
+        """
+        创建任意角度的直线扫描
+
+        参数:
+            angle: 扫描前进方向（度），0为从左到右，90为从上到下（图像坐标）
+        """
+        theta = np.deg2rad(angle)
+        ys, xs = np.mgrid[0:height, 0:width].astype(np.float32)
+        times = xs * np.cos(theta) + ys * np.sin(theta)
+        return cls(times, cls.SHAPE_ANGLE, angle=angle)
+
+    @classmethod
+    def radial(cls, width, height, center=None):
+        """创建从圆心向外扩展的圆形扫描，默认圆心为画面中心"""
+        if center is None:
+            center = (width / 2, height / 2)
+        ys, xs = np.mgrid[0:height, 0:width].astype(np.float32)
+        times = np.hypot(xs - center[0], ys - center[1])
+        return cls(times, cls.SHAPE_RADIAL, center=center)
+
+    def _count_below(self, position):
+        """扫描时刻小于position的像素数"""
+        # 以float32查找，避免把整个排序数组转换为float64
+        return int(np.searchsorted(self.sorted_times, np.float32(position), side="left"))
+
+    def band(self, lo, hi):
+        """扫描时刻位于[lo, hi)内的像素的展平索引"""
+        return self.order[self._count_below(lo):self._count_below(hi)]
+
+    def update_static(self, static_frame, current_frame, position, speed):
+        """将本帧新扫过的像素带（扫描时刻位于[position, position+speed)）从当前帧复制到静态帧"""
+        index = self.band(position, position + speed)
+        if len(index):
+            static_frame.reshape(-1, 3)[index] = current_frame.reshape(-1, 3)[index]
+
+    def _update_mask(self, position):
+        """把已扫过掩码增量更新到指定位置，位置回退（重置）时重建"""
+        if position < self.mask_position:
+            self.swept_mask[:] = 0
+            self.mask_position = 0
+        if position > self.mask_position:
+            self.swept_mask.reshape(-1)[self.band(self.mask_position, position)] = 1
+            self.mask_position = position
+
+    def composite(self, static_frame, current_frame, position):
+        """已扫过的像素取静态帧，其余取当前帧"""
+        self._update_mask(position)
+        result = current_frame.copy()
+        if self.mask_position > 0:
+            cv2.copyTo(static_frame, self.swept_mask, result)
+        return result
+
+    def draw_front(self, frame, position, color, width):
+        """在帧上绘制扫描位置处的前沿"""
+        if self.shape == self.SHAPE_ANGLE:
+            theta = np.deg2rad(self.angle)
+            direction = np.array([np.cos(theta), np.sin(theta)])
+            normal = np.array([-np.sin(theta), np.cos(theta)])
+
+            # 前沿上的一点：沿前进方向的投影为(扫描位置+原始最小扫描时刻)
+            point = direction * (position + self.origin)
+            extent = self.width + self.height
+            p1 = tuple(int(v) for v in point - normal * extent)
+            p2 = tuple(int(v) for v in point + normal * extent)
+            cv2.line(frame, p1, p2, color, width)
+        elif self.shape == self.SHAPE_RADIAL:
+            center = (int(self.center[0]), int(self.center[1]))
+            cv2.circle(frame, center, int(position), color, width)
+        else:
+            cv2.drawContours(frame, self._front_contours(position), -1, color, width)
+
+    def _front_contours(self, position):
+        """
+        自定义形状在扫描位置处的前沿轮廓（扫描时刻小于position的区域的外轮廓，折线化后），按位置缓存；
+        外接矩形以外的掩码全为0，只在矩形内阈值化和提取轮廓，结果与整帧提取相同
+        """
+        contours = self._front_cache.get(position)
+        if contours is not None:
+            self._front_cache.move_to_end(position)
+            return contours
+        rows = np.flatnonzero(self.row_min < position)
+        if len(rows) == 0:
+            contours = ()
+        else:
+            cols = np.flatnonzero(self.col_min < position)
+            top, bottom = rows[0], rows[-1] + 1
+            left, right = cols[0], cols[-1] + 1
+            mask = (self.times[top:bottom, left:right] < position).astype(np.uint8)
+            contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE,
+                                           offset=(int(left), int(top)))
+            contours = [cv2.approxPolyDP(contour, self.FRONT_APPROX_EPSILON, True) for contour in contours]
+        self._front_cache[position] = contours
+        if len(self._front_cache) > self.FRONT_CACHE_SIZE:
+            self._front_cache.popitem(last=False)
+        return contours
@@ -0,0 +1,323 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+运行指标统计与导出
+提供计数器、仪表和固定分桶直方图，热路径上的记录只是一次二分查找和加法；
+指标可以定期以JSON行写入文件，也可以通过本机的HTTP端口以Prometheus文本格式读取
+"""
+
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 默认的耗时分桶上限（秒）
+DEFAULT_LATENCY_BUCKETS = (0.001, 0.002, 0.005, 0.01, 0.016, 0.033, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+def _format_key(name, labels):
+    """生成带标签的指标键，例如 scan_stage_seconds{stage="process"}"""
+    if not labels:
+        return name
+    return name + "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+def _format_number(value):
+    """Prometheus文本格式的数值"""
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    """单调递增的计数器"""
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+class Gauge:
+    """可任意设置的仪表"""
+
+    def __init__(self):
+        self.value = 0.0
+
+    def set(self, value):
+        self.value = value
+
+class Histogram:
+    """固定分桶的直方图，每个分桶独立计数，导出时再累加"""
+
+    def __init__(self, buckets=DEFAULT_LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # 最后一个分桶为+Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def snapshot(self):
+        """返回累积分桶计数、总和与样本数"""
+        cumulative = []
+        total = 0
+        for count in list(self.counts):
+            total += count
+            cumulative.append(total)
+        return {"buckets": list(self.buckets) + [float("inf")], "cumulative": cumulative,
+                "sum": self.sum, "count": self.count}
+
+class MetricsRegistry:
+    """
+    指标注册表
+    同名同标签的指标只创建一次；导出前会先调用注册的采集函数（例如刷新进程内存占用）
+    """
+
+    def __init__(self):
+        self._metrics = {}   # (名称, 标签) -> (类型, 说明, 指标)
+        self._collectors = []
+        self._lock = threading.Lock()
+        self.exporters = []
+
+    def _get(self, kind, factory, name, help_text, labels):
+        key = (name, tuple(sorted((labels or {}).items())))
+        with self._lock:
+            entry = self._metrics.get(key)
+            if entry is None:
+                entry = (kind, help_text, factory())
+                self._metrics[key] = entry
+            elif entry[0] != kind:
+                raise ValueError(f"指标{name}已注册为{entry[0]}")
+        return entry[2]
+
+    def counter(self, name, help_text="", labels=None):
+        return self._get("counter", Counter, name, help_text, labels)
+
+    def gauge(self, name, help_text="", labels=None):
+        return self._get("gauge", Gauge, name, help_text, labels)
+
+    def histogram(self, name, help_text="", labels=None, buckets=DEFAULT_LATENCY_BUCKETS):
+        return self._get("histogram", lambda: Histogram(buckets), name, help_text, labels)
+
+    def add_collector(self, collector):
+        """注册导出前调用的采集函数collector(registry)"""
+        self._collectors.append(collector)
+
+    def _collect(self):
+        for collector in self._collectors:
+            collector(self)
+        with self._lock:
+            return sorted(self._metrics.items())
+
+    def snapshot(self):
+        """返回所有指标的当前值（可JSON序列化）"""
+        result = {"time": time.time(), "counters": {}, "gauges": {}, "histograms": {}}
+        for (name, labels), (kind, _, metric) in self._collect():
+            key = _format_key(name, labels)
+            if kind == "counter":
+                result["counters"][key] = metric.value
+            elif kind == "gauge":
+                result["gauges"][key] = metric.value
+            else:
+                snapshot = metric.snapshot()
+                snapshot["buckets"] = snapshot["buckets"][:-1]  # JSON不支持Infinity，+Inf分桶即为count
+                result["histograms"][key] = snapshot
+        return result
+
+    def to_prometheus(self):
+        """生成Prometheus文本格式"""
+        lines = []
+        described = set()
+        for (name, labels), (kind, help_text, metric) in self._collect():
+            if name not in described:
+                described.add(name)
+                if help_text:
+                    lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+            if kind in ("counter", "gauge"):
+                lines.append(f"{_format_key(name, labels)} {_format_number(metric.value)}")
+                continue
+            snapshot = metric.snapshot()
+            for bound, count in zip(snapshot["buckets"], snapshot["cumulative"]):
+                bucket_labels = labels + (("le", _format_number(bound)),)
+                lines.append(f"{_format_key(name + '_bucket', bucket_labels)} {count}")
+            lines.append(f"{_format_key(name + '_sum', labels)} {_format_number(snapshot['sum'])}")
+            lines.append(f"{_format_key(name + '_count', labels)} {snapshot['count']}")
+        return "\n".join(lines) + "\n"
+
+    def close(self):
+        """停止所有导出器（JSON行导出器会在停止前写入最后一次快照）"""
+        for exporter in self.exporters:
+            exporter.stop()
+        self.exporters = []
+
+class JsonLinesExporter:
+    """定期将指标快照以JSON行追加写入文件的后台线程"""
+
+    def __init__(self, registry, path, interval=10.0):
+        """
+        参数:
+            registry: MetricsRegistry实例
+            path: 输出文件路径
+            interval: 导出间隔（秒）
+        """
+        self.registry = registry
+        self.path = path
+        self.interval = interval
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="metrics-jsonl", daemon=True)
+        self._thread.start()
+        registry.exporters.append(self)
+
+    def export(self):
+        """写入一次快照"""
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(self.registry.snapshot(), ensure_ascii=False) + "\n")
+
+    def _loop(self):
+        while not self._stopped.wait(self.interval):
+            self.export()
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+        self.export()
+
+class PrometheusExporter:
+    """在本机HTTP端口上以Prometheus文本格式提供指标（GET /metrics）"""
+
+    def __init__(self, registry, port, host="127.0.0.1"):
+        """
+        参数:
+            registry: MetricsRegistry实例
+            port: 监听端口，0表示由系统分配
+            host: 监听地址，默认只监听本机
+        """
+        self.registry = registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(handler):
+                if handler.path.split("?")[0] not in ("/metrics", "/"):
+                    handler.send_error(404)
+                    return
+                body = registry.to_prometheus().encode("utf-8")
+                handler.send_response(200)
+                handler.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                handler.send_header("Content-Length", str(len(body)))
+                handler.end_headers()
+                handler.wfile.write(body)
+
+            def log_message(handler, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        self._thread = threading.Thread(target=self.server.serve_forever, name="metrics-http", daemon=True)
+        self._thread.start()
+        registry.exporters.append(self)
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self._thread.join()
+
+def process_rss_bytes():
+    """当前进程的常驻内存（字节），无法获取时返回None"""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        return None
+
+class ScanTelemetry:
+    """
+    扫描效果运行循环使用的指标集合
+    指标对象在创建时注册好，运行循环中只做计数和分桶记录
+    """
+
+    STAGES = ("capture", "process", "resize", "display", "encode")
+
+    def __init__(self, registry):
+        self.registry = registry
+        self.frames = registry.counter("scan_frames_total", "已显示的帧数")
+        self.dropped = registry.counter("scan_frames_dropped_total", "丢弃的帧数（低延迟模式跳过的旧帧、流水线乱序帧）")
+        self.late = registry.counter("scan_frames_late_total", "显示间隔超过1.5倍帧间隔的帧数")
+        self.read_failures = registry.counter("scan_capture_read_failures_total", "视频源读取失败次数")
+        self.loop_restarts = registry.counter("scan_loop_restarts_total", "视频文件从头循环的次数")
+        self.fps = registry.gauge("scan_fps", "最近的显示帧率")
+        self.rss = registry.gauge("process_resident_memory_bytes", "进程常驻内存（字节）")
+        self.stages = {stage: registry.histogram("scan_stage_seconds", "各阶段每帧耗时（秒）", {"stage": stage})
+                       for stage in self.STAGES}
+        self.latency = registry.histogram("scan_capture_to_display_seconds", "采集到显示的延迟（秒）")
+        self.queue_depths = {}
+        self._last_frame_time = None
+        registry.add_collector(self._collect_rss)
+
+    @classmethod
+    def of(cls, registry):
+        """获取注册表对应的指标集合，同一注册表的多个效果实例共用一份"""
+        telemetry = getattr(registry, "_scan_telemetry", None)
+        if telemetry is None:
+            telemetry = cls(registry)
+            registry._scan_telemetry = telemetry
+        return telemetry
+
+    def _collect_rss(self, registry):
+        rss = process_rss_bytes()
+        if rss is not None:
+            self.rss.set(rss)
+
+    def observe_stage(self, stage, start):
+        """记录从start（time.perf_counter()）到现在的阶段耗时"""
+        self.stages[stage].observe(time.perf_counter() - start)
+
+    def frame_displayed(self, frame_interval, capture_time=None):
+        """记录一帧显示：更新帧率、迟到帧和采集到显示延迟"""
+        now = time.perf_counter()
+        self.frames.inc()
+        if self._last_frame_time is not None:
+            elapsed = now - self._last_frame_time
+            if elapsed > 0:
+                # 指数平滑的帧率
+                self.fps.set(self.fps.value * 0.9 + 0.1 / elapsed if self.fps.value else 1.0 / elapsed)
+            if elapsed > frame_interval * 1.5:
+                self.late.inc()
+        self._last_frame_time = now
+        if capture_time is not None:
+            self.latency.observe(now - capture_time)
+
+    def set_queue_depth(self, name, depth):
+        gauge = self.queue_depths.get(name)
+        if gauge is None:
+            gauge = self.registry.gauge("scan_queue_depth", "流水线队列中的帧数", {"queue": name})
+            self.queue_depths[name] = gauge
+        gauge.set(depth)
+
+def create_metrics(metrics_file=None, metrics_port=None, interval=10.0):
+    """
+    创建指标注册表并启动导出器，两者都未设置时返回None
+
+    参数:
+        metrics_file: JSON行输出文件（可选）
+        metrics_port: Prometheus文本格式的本机HTTP端口（可选）
+        interval: JSON行导出间隔（秒）
+    """
+    if not metrics_file and metrics_port is None:
+        return None
+    registry = MetricsRegistry()
+    if metrics_file:
+        JsonLinesExporter(registry, metrics_file, interval)
+    if metrics_port is not None:
+        exporter = PrometheusExporter(registry, metrics_port)
+        print(f"指标地址: http://127.0.0.1:{exporter.port}/metrics")
+    return registry
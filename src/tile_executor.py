@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+分块多线程执行器
+把帧按行切分为水平条带，在线程池中并行处理各条带。OpenCV和NumPy的大部分调用会释放GIL，
+因此条带可以真正并行；需要邻域的操作（模糊）在条带上下各多处理若干halo行，保证结果与整帧处理一致
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+
+class TileExecutor:
+    """
+    水平条带线程池
+    创建时同时调整cv2.setNumThreads，使线程池线程数×OpenCV内部线程数不超过CPU核数，
+    避免两层并行互相抢占
+    """
+
+    # 每个条带的最少行数，帧太小时减少条带数
+    MIN_BAND_ROWS = 32
+
+    def __init__(self, num_threads=0):
+        """
+        初始化分块执行器
+
+        参数:
+            num_threads: 线程数，0表示使用CPU核数
+        """
+        cpu_count = os.cpu_count() or 1
+        self.num_threads = num_threads if num_threads > 0 else cpu_count
+        self.pool = ThreadPoolExecutor(max_workers=self.num_threads, thread_name_prefix="tile")
+
+        # 每个条带线程内OpenCV只使用剩余的核
+        self.previous_cv_threads = cv2.getNumThreads()
+        self.cv_threads = max(1, cpu_count // self.num_threads)
+        cv2.setNumThreads(self.cv_threads)
+
+    def bands(self, height, halo=0):
+        """
+        计算条带划分
+
+        返回:
+            [(y0, y1, ey0, ey1), ...]，[y0, y1)为条带负责输出的行，[ey0, ey1)为加上halo后需要处理的行
+        """
+        count = max(1, min(self.num_threads, height // self.MIN_BAND_ROWS))
+        bounds = [height * i // count for i in range(count + 1)]
+        return [(y0, y1, max(0, y0 - halo), min(height, y1 + halo))
+                for y0, y1 in zip(bounds[:-1], bounds[1:])]
+
+    def map_bands(self, func, height, halo=0):
+        """
+        在线程池中对每个条带调用func(y0, y1, ey0, ey1)，等待全部完成
+
+        func负责把条带结果写入各自的输出行，不同条带的输出行互不重叠；
+        任一条带抛出的异常会在这里重新抛出
+        """
+        bands = self.bands(height, halo)
+        if len(bands) == 1:
+            func(*bands[0])
+            return
+        futures = [self.pool.submit(func, *band) for band in bands]
+        for future in futures:
+            future.result()
+
+    def shutdown(self):
+        """关闭线程池并恢复OpenCV线程数"""
+        self.pool.shutdown(wait=True)
+        cv2.setNumThreads(self.previous_cv_threads)
+
+# 按线程数共享的执行器，多个效果实例（如效果对比预览）共用同一个线程池
+_executors = {}
+
+def get_tile_executor(num_threads=0):
+    """获取共享的分块执行器，不存在时创建"""
+    executor = _executors.get(num_threads)
+    if executor is None:
+        executor = TileExecutor(num_threads)
+        _executors[num_threads] = executor
+    return executor
+
+def shutdown_tile_executors():
+    """关闭所有共享的分块执行器"""
+    # 按创建的逆序关闭，最终恢复为最初的OpenCV线程数
+    for executor in reversed(list(_executors.values())):
+        executor.shutdown()
+    _executors.clear()
@@ -0,0 +1,269 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+视频写入器
+统一的写入接口（write、release、report），后端可选OpenCV的VideoWriter，
+或通过管道把原始帧交给本机ffmpeg进程编码：编码在另一个进程中并行运行，
+帧数据以memoryview直接写入管道，不额外复制；可设置编码器、CRF/码率和像素格式
+"""
+
+import shutil
+import subprocess
+import threading
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+# 可选的写入后端
+BACKEND_AUTO = "auto"
+BACKEND_OPENCV = "opencv"
+BACKEND_FFMPEG = "ffmpeg"
+SUPPORTED_BACKENDS = [BACKEND_AUTO, BACKEND_OPENCV, BACKEND_FFMPEG]
+
+def ffmpeg_available(binary="ffmpeg"):
+    """本机是否安装了ffmpeg"""
+    return shutil.which(binary) is not None
+
+class FrameWriter:
+    """
+    写入器基类
+    统计写入帧数、字节数和write()调用中阻塞的时间：OpenCV后端的阻塞即编码耗时，
+    ffmpeg后端的阻塞说明编码进程跟不上、管道已满（背压）
+    """
+
+    name = "写入器"
+
+    def __init__(self, path, fps, size):
+        """
+        参数:
+            path: 输出文件路径
+            fps: 帧率
+            size: 帧大小，(宽, 高)元组
+        """
+        self.path = path
+        self.fps = fps
+        self.size = tuple(size)
+        self.frames = 0
+        self.bytes_written = 0
+        self.blocked_seconds = 0.0
+        self.start_time = None
+        self.end_time = None
+
+    def _check_frame(self, frame):
+        if frame.shape[:2] != (self.size[1], self.size[0]):
+            raise ValueError(f"帧大小{frame.shape[1]}x{frame.shape[0]}与输出大小{self.size[0]}x{self.size[1]}不一致")
+
+    def write(self, frame):
+        """写入一帧BGR图像"""
+        self._check_frame(frame)
+        start = time.perf_counter()
+        if self.start_time is None:
+            self.start_time = start
+        self._write(frame)
+        self.blocked_seconds += time.perf_counter() - start
+        self.frames += 1
+        self.bytes_written += frame.nbytes
+
+    def _write(self, frame):
+        raise NotImplementedError
+
+    def release(self):
+        """结束写入并等待编码完成"""
+        if self.end_time is None:
+            self._release()
+            self.end_time = time.perf_counter()
+
+    def _release(self):
+        raise NotImplementedError
+
+    def stats(self):
+        """写入统计：帧数、编码吞吐（帧/秒，包括等待编码结束的时间）和写入阻塞时间"""
+        end = self.end_time if self.end_time is not None else time.perf_counter()
+        elapsed = end - self.start_time if self.start_time is not None else 0.0
+        return {
+            "frames": self.frames,
+            "elapsed": elapsed,
+            "fps": self.frames / elapsed if elapsed > 0 else 0.0,
+            "mb_per_second": self.bytes_written / elapsed / 1024 / 1024 if elapsed > 0 else 0.0,
+            "blocked_ms_per_frame": self.blocked_seconds / self.frames * 1000 if self.frames else 0.0,
+            "blocked_ratio": self.blocked_seconds / elapsed if elapsed > 0 else 0.0,
+        }
+
+    def report(self):
+        """生成写入统计文本"""
+        stats = self.stats()
+        return (f"{self.name}: 写入 {stats['frames']}帧到 {self.path}, "
+                f"编码吞吐 {stats['fps']:.1f} fps（{stats['mb_per_second']:.1f} MB/s 原始帧）, "
+                f"写入阻塞 {stats['blocked_ms_per_frame']:.1f} ms/帧（占 {stats['blocked_ratio'] * 100:.0f}%）")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+
+class OpenCVWriter(FrameWriter):
+    """OpenCV VideoWriter后端，在调用write()的线程中编码"""
+
+    name = "OpenCV写入器"
+
+    def __init__(self, path, fps, size, codec="mp4v"):
+        """
+        参数:
+            path: 输出文件路径
+            fps: 帧率
+            size: 帧大小，(宽, 高)元组
+            codec: 四字符编码（FourCC），例如mp4v、MJPG、XVID、avc1
+        """
+        super().__init__(path, fps, size)
+        self.codec = codec
+        self.writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*codec), fps, self.size)
+        if not self.writer.isOpened():
+            raise ValueError(f"无法创建视频文件: {path}（编码 {codec}）")
+
+    def _write(self, frame):
+        self.writer.write(frame)
+
+    def _release(self):
+        self.writer.release()
+
+class FFmpegWriter(FrameWriter):
+    """
+    ffmpeg管道后端
+    原始BGR帧通过标准输入管道写入ffmpeg进程，编码与调用方并行；
+    管道写满时write()阻塞，阻塞时间计入背压统计
+    """
+
+    name = "ffmpeg写入器"
+
+    # 支持-preset参数的编码器
+    PRESET_CODECS = ("libx264", "libx265")
+
+    def __init__(self, path, fps, size, codec="libx264", crf=23, bitrate=None, pix_fmt="yuv420p",
+                 preset=None, ffmpeg="ffmpeg", output_args=None):
+        """
+        参数:
+            path: 输出文件路径
+            fps: 帧率
+            size: 帧大小，(宽, 高)元组
+            codec: ffmpeg编码器名称，例如libx264、libx265、libvpx-vp9、mpeg4、libwebp
+            crf: 恒定质量参数（越小质量越高），设置了bitrate时不使用
+            bitrate: 目标码率（可选），例如"8M"
+            pix_fmt: 输出像素格式，例如yuv420p、yuv444p
+            preset: 编码速度预设（可选，仅libx264/libx265），例如veryfast、slow
+            ffmpeg: ffmpeg可执行文件
+            output_args: 附加在输出文件之前的ffmpeg参数列表（可选），例如["-loop", "0"]
+        """
+        super().__init__(path, fps, size)
+        self.codec = codec
+        self.command = [
+            ffmpeg, "-y", "-loglevel", "error",
+            "-f", "rawvideo", "-pix_fmt", "bgr24", "-s", f"{self.size[0]}x{self.size[1]}", "-r", str(fps),
+            "-i", "-", "-an", "-c:v", codec,
+        ]
+        if bitrate:
+            self.command += ["-b:v", str(bitrate)]
+        elif crf is not None:
+            self.command += ["-crf", str(crf)]
+        if preset and codec in self.PRESET_CODECS:
+            self.command += ["-preset", preset]
+        self.command += ["-pix_fmt", pix_fmt] + list(output_args or []) + [path]
+
+        # bufsize=0：标准输入不经过Python的缓冲区，memoryview直接写入管道
+        self.process = subprocess.Popen(self.command, stdin=subprocess.PIPE, stderr=subprocess.PIPE, bufsize=0)
+
+        # 持续读取错误输出，避免ffmpeg因错误输出管道写满而阻塞
+        self.errors = deque(maxlen=20)
+        self._stderr_thread = threading.Thread(target=self._drain_stderr, name="ffmpeg-stderr", daemon=True)
+        self._stderr_thread.start()
+
+    def _drain_stderr(self):
+        for line in self.process.stderr:
+            self.errors.append(line.decode("utf-8", "replace").rstrip())
+
+    def _error_text(self):
+        return "; ".join(self.errors) or f"退出码 {self.process.returncode}"
+
+    def _write(self, frame):
+        if not frame.flags.c_contiguous:
+            frame = np.ascontiguousarray(frame)
+        view = memoryview(frame).cast("B")
+        try:
+            while view:
+                written = self.process.stdin.write(view)
+                view = view[written:]
+        except BrokenPipeError:
+            self.process.wait()
+            self._stderr_thread.join()
+            raise RuntimeError(f"ffmpeg编码进程已退出: {self._error_text()}")
+
+    def _release(self):
+        try:
+            self.process.stdin.close()
+        except BrokenPipeError:
+            pass
+        self.process.wait()
+        self._stderr_thread.join()
+        if self.process.returncode != 0:
+            raise RuntimeError(f"ffmpeg编码失败: {self._error_text()}")
+
+def create_writer(path, fps, size, backend=BACKEND_AUTO, codec=None, crf=None, bitrate=None,
+                  pix_fmt="yuv420p", preset=None, ffmpeg="ffmpeg"):
+    """
+    创建视频写入器
+
+    参数:
+        path: 输出文件路径
+        fps: 帧率
+        size: 帧大小，(宽, 高)元组
+        backend: auto（安装了ffmpeg时使用ffmpeg，否则使用OpenCV）、opencv或ffmpeg
+        codec: 编码器，默认ffmpeg为libx264、OpenCV为mp4v
+        crf, bitrate, pix_fmt, preset: ffmpeg的质量、码率、像素格式和速度预设（OpenCV后端不支持）
+        ffmpeg: ffmpeg可执行文件
+    """
+    if backend not in SUPPORTED_BACKENDS:
+        raise ValueError(f"不支持的写入后端: {backend}")
+    if backend == BACKEND_AUTO:
+        backend = BACKEND_FFMPEG if ffmpeg_available(ffmpeg) else BACKEND_OPENCV
+
+    if backend == BACKEND_FFMPEG:
+        if not ffmpeg_available(ffmpeg):
+            raise ValueError(f"未找到ffmpeg: {ffmpeg}")
+        return FFmpegWriter(path, fps, size, codec=codec or "libx264", crf=23 if crf is None else crf,
+                            bitrate=bitrate, pix_fmt=pix_fmt, preset=preset, ffmpeg=ffmpeg)
+
+    if crf is not None or bitrate:
+        print("提示: OpenCV写入后端不支持CRF和码率设置，已忽略")
+    return OpenCVWriter(path, fps, size, codec=codec or "mp4v")
+
+def add_writer_arguments(parser):
+    """添加视频写入后端相关的命令行参数"""
+    parser.add_argument("--writer", type=str, default=BACKEND_AUTO, choices=SUPPORTED_BACKENDS,
+                        help="视频写入后端：auto（安装了ffmpeg时使用ffmpeg）、opencv、ffmpeg")
+    parser.add_argument("--codec", type=str, default=None,
+                        help="编码器，默认ffmpeg为libx264、OpenCV为mp4v")
+    parser.add_argument("--crf", type=int, default=None,
+                        help="ffmpeg恒定质量参数（越小质量越高），默认为23")
+    parser.add_argument("--bitrate", type=str, default=None,
+                        help="ffmpeg目标码率，例如8M，设置后不使用CRF")
+    parser.add_argument("--pix_fmt", type=str, default="yuv420p",
+                        help="ffmpeg输出像素格式，默认为yuv420p")
+    parser.add_argument("--preset", type=str, default=None,
+                        help="ffmpeg编码速度预设（libx264/libx265），例如veryfast、slow")
+    parser.add_argument("--ffmpeg", type=str, default="ffmpeg",
+                        help="ffmpeg可执行文件路径")
+
+def writer_options_from_args(args):
+    """由命令行参数生成create_writer的关键字参数"""
+    return {
+        "backend": args.writer,
+        "codec": args.codec,
+        "crf": args.crf,
+        "bitrate": args.bitrate,
+        "pix_fmt": args.pix_fmt,
+        "preset": args.preset,
+        "ffmpeg": args.ffmpeg,
+    }